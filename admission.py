@@ -0,0 +1,205 @@
+"""
+admission.py - Admission control for expensive AI decisions
+
+Simulating and drawing ZidanAI's circuits is CPU-bound, so running many at
+once only makes every one of them slower. The controller lets a fixed
+number run concurrently and queues the rest. Waiting requests are admitted
+round-robin across keys (one key per game or client), so a single busy
+session cannot starve the others. A request is refused straight away with
+Overloaded when the queue is full or its key already has too many waiting,
+and after max_wait seconds in the queue; callers turn that into
+503 Service Unavailable with a Retry-After estimate.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+# Smoothing of the running service time used for Retry-After
+SERVICE_SMOOTHING = 0.2
+MAX_RETRY_AFTER = 30
+
+
+class Overloaded(Exception):
+    """No capacity for the request; retry after retry_after seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    def __init__(self, key, notify=None):
+        self.key = key
+        self.granted = False
+        self.event = threading.Event()
+        self.notify = notify or self.event.set
+
+
+class AdmissionController:
+    """Concurrency limit with a bounded, per-key fair waiting queue."""
+
+    def __init__(self, concurrency=2, max_queue=32, max_wait=2.0, per_key=2, clock=time.monotonic):
+        """
+        concurrency: decisions allowed to run at once
+        max_queue: requests allowed to wait for a slot
+        max_wait: seconds a request may wait before it is refused
+        per_key: requests one key may have waiting at a time
+        """
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.per_key = per_key
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queued = 0
+        self._waiting = OrderedDict()  # key -> deque of waiters, in round-robin order
+        self._service = 0.2            # running mean of slot hold time (seconds)
+        self._waits = deque(maxlen=1000)
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def acquire(self, key=None):
+        """Wait for a slot and return a ticket for release().
+        Raises Overloaded when the queue is full or the wait exceeds max_wait.
+        """
+        start = self.clock()
+        with self._lock:
+            waiter = self._enqueue(key, start)
+            if not isinstance(waiter, _Waiter):
+                return waiter
+        waiter.event.wait(self.max_wait)
+        return self._settle(waiter, start)
+
+    async def acquire_async(self, key=None):
+        """acquire() for asyncio code: queued requests wait on a future, not a thread."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def notify():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        start = self.clock()
+        with self._lock:
+            waiter = self._enqueue(key, start, notify)
+            if not isinstance(waiter, _Waiter):
+                return waiter
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    self._running -= 1
+                    self._grant_next()
+                else:
+                    self._remove(waiter)
+            raise
+        return self._settle(waiter, start)
+
+    def try_acquire(self):
+        """A ticket if a slot is free and nobody is waiting, else None (never
+        queues). For optional background work, which must not delay requests;
+        it is left out of the admitted count and wait times.
+        """
+        with self._lock:
+            if self._running < self.concurrency and not self._queued:
+                self._running += 1
+                return self.clock()
+            return None
+
+    def _enqueue(self, key, start, notify=None):
+        """With the lock held: a ticket if a slot is free, else a queued _Waiter."""
+        if self._running < self.concurrency and not self._queued:
+            self._running += 1
+            return self._admit(start, start)
+        waiting = self._waiting.get(key)
+        if self._queued >= self.max_queue or (waiting is not None and len(waiting) >= self.per_key):
+            self.rejected += 1
+            raise Overloaded("Server busy, try again shortly", self._retry_after())
+        waiter = _Waiter(key, notify)
+        self._waiting.setdefault(key, deque()).append(waiter)
+        self._queued += 1
+        return waiter
+
+    def _settle(self, waiter, start):
+        """After waiting: the ticket if the waiter was granted a slot, else Overloaded."""
+        with self._lock:
+            if waiter.granted:
+                return self._admit(start, self.clock())
+            self._remove(waiter)
+            self.timed_out += 1
+            raise Overloaded("Timed out waiting for a slot", self._retry_after())
+
+    def release(self, ticket):
+        """Free the slot taken at ticket (the admission time) and admit the next waiter."""
+        with self._lock:
+            held = self.clock() - ticket
+            self._service += SERVICE_SMOOTHING * (held - self._service)
+            self._running -= 1
+            self._grant_next()
+
+    @contextmanager
+    def slot(self, key=None):
+        """Hold a slot for the duration of a with-block."""
+        ticket = self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def _admit(self, queued, now):
+        # Called with the lock held once the slot is counted in _running
+        self._waits.append(now - queued)
+        self.admitted += 1
+        return now
+
+    def _grant_next(self):
+        """Hand free slots to waiters, taking keys in round-robin order."""
+        while self._running < self.concurrency and self._waiting:
+            key, waiters = next(iter(self._waiting.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                self._waiting.move_to_end(key)
+            else:
+                del self._waiting[key]
+            self._queued -= 1
+            self._running += 1
+            waiter.granted = True
+            waiter.notify()
+
+    def _remove(self, waiter):
+        waiters = self._waiting.get(waiter.key)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            self._queued -= 1
+            if not waiters:
+                del self._waiting[waiter.key]
+
+    def _retry_after(self):
+        """Seconds until the queue ahead of a new request has likely drained."""
+        backlog = (self._queued + self._running) / max(self.concurrency, 1)
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(backlog * self._service)))
+
+    def stats(self):
+        """Slots in use, queue depth, outcomes and recent wait/service times (milliseconds)."""
+        with self._lock:
+            waits = list(self._waits)
+            return {
+                'running': self._running,
+                'concurrency': self.concurrency,
+                'queue_depth': self._queued,
+                'max_queue': self.max_queue,
+                'waiting_keys': len(self._waiting),
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'avg_wait_ms': round(1000 * sum(waits) / len(waits), 1) if waits else 0.0,
+                'max_wait_ms': round(1000 * max(waits), 1) if waits else 0.0,
+                'avg_service_ms': round(1000 * self._service, 1)
+            }
@@ -4,18 +4,363 @@ app.py - Flask web application for Quantum Go
 import warnings
 warnings.filterwarnings('ignore')
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import (Flask, render_template, request, jsonify, session, url_for, abort,
+                   make_response, Response, stream_with_context, copy_current_request_context, g)
+import hashlib
+import hmac
+import json
 import os
 import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache, wraps
 from game import GameState, ZIDAN_AI, RULES_AI, HUMAN
-from zidan_ai import ZidanAI
+from zidan_ai import ZidanAI, images_skipped, stage_stats
 from rules_ai import RuleBasedAI
+from pondering import Ponderer
+from game_store import create_store
+import memdiag
+import metrics
+import profiler
+import visuals
+import wire
+from jobs import JobQueue, QueueFull, JobPending
+from admission import AdmissionController, Overloaded
+from gamelocks import GameLocks
 
 app = Flask(__name__)
 app.secret_key = 'quantum_go_secret_key_2025'
 
-# Global game state storage (in production, use database or Redis)
-games = {}
+# Game storage: 'memory' (per process) or 'sqlite:///path.db' (shared by workers).
+# With QGO_HIBERNATE_AFTER set, idle in-memory games are moved to disk.
+games = create_store(os.environ.get('QGO_STORE', 'memory'),
+                     max_games=int(os.environ.get('QGO_MAX_GAMES', '10000')),
+                     ttl=float(os.environ.get('QGO_GAME_TTL', '3600')),
+                     hibernate_after=(float(os.environ['QGO_HIBERNATE_AFTER'])
+                                      if os.environ.get('QGO_HIBERNATE_AFTER') else None),
+                     hibernate_dir=os.environ.get('QGO_HIBERNATE_DIR'))
+
+# Admission control for ZidanAI decisions: at most QGO_ZIDAN_CONCURRENCY run at
+# once; others wait (round-robin across games) or are refused with 503
+admission = AdmissionController(concurrency=int(os.environ.get('QGO_ZIDAN_CONCURRENCY', '2')),
+                                max_queue=int(os.environ.get('QGO_ZIDAN_QUEUE', '32')),
+                                max_wait=float(os.environ.get('QGO_ZIDAN_MAX_WAIT', '2.0')))
+
+# Background AI decisions: Mode B replies computed while the human thinks,
+# and the next Mode A ply prefetched while the spectator reads the last one
+# (ZidanAI's only while an admission slot is free)
+ponderer = Ponderer(enabled=os.environ.get('QGO_PONDER', '1') != '0',
+                    max_moves=int(os.environ.get('QGO_PONDER_MOVES', '25')),
+                    admission=admission)
+
+# Asynchronous moves: a bounded pool computes /play and /ai-step in the
+# background while clients poll /jobs/<id> for the result
+jobs = JobQueue(workers=int(os.environ.get('QGO_JOB_WORKERS', '4')),
+                max_queue=int(os.environ.get('QGO_JOB_QUEUE', '64')))
+
+# gzip/brotli for JSON and MessagePack responses (set to 0 when a proxy compresses)
+COMPRESS = os.environ.get('QGO_COMPRESS', '1') != '0'
+
+# Seconds a move request may spend before ZidanAI degrades its decision
+# (fewer shots, exact probabilities, no images, heuristic only); 0 disables
+MOVE_BUDGET = float(os.environ.get('QGO_MOVE_BUDGET', '1.0'))
+
+def move_deadline(start=None):
+    """ZidanAI deadline for a move begun at start (default: the start of this
+    request), or None without a budget.
+    """
+    if not MOVE_BUDGET:
+        return None
+    if start is None:
+        start = g.get('request_start') or time.perf_counter()
+    return start + MOVE_BUDGET
+
+# Moves on a game run one at a time; identical requests arriving while a move
+# is in progress share its response
+game_locks = GameLocks()
+
+# Token required by the /debug endpoints; unset disables them
+ADMIN_TOKEN = os.environ.get('QGO_ADMIN_TOKEN')
+
+# Allocation tracing (QGO_TRACEMALLOC=<frames>); /debug/memory and the periodic
+# memory log line each measure growth since their own previous report
+allocations = memdiag.AllocationTracker()
+logged_allocations = memdiag.AllocationTracker()
+if os.environ.get('QGO_TRACEMALLOC', '0') != '0':
+    allocations.start(int(os.environ['QGO_TRACEMALLOC']))
+
+def wire_format(req=None):
+    """Response encoding for this request (or req): 'json', 'compact' or 'msgpack'.
+    Clients opt into the compact format (see wire.py) with compact=1 in the
+    query string or "compact": true in the JSON body; clients that prefer
+    application/msgpack in Accept get the compact format as MessagePack.
+    """
+    req = request if req is None else req
+    if wire.msgpack is not None and req.accept_mimetypes.best_match(
+            ['application/json', wire.MSGPACK_MIMETYPE]) == wire.MSGPACK_MIMETYPE:
+        return 'msgpack'
+    compact = req.args.get('compact')
+    if compact is None:
+        body = req.get_json(silent=True)
+        compact = body.get('compact') if isinstance(body, dict) else None
+    return 'compact' if compact in (True, 1, '1', 'true') else 'json'
+
+def reply(payload):
+    """Game response in the format the client asked for."""
+    fmt = wire_format()
+    if fmt == 'json':
+        return jsonify(payload)
+    data, mimetype = wire.dumps(wire.compact_payload(payload), use_msgpack=fmt == 'msgpack')
+    return Response(data, mimetype=mimetype)
+
+@app.after_request
+def compress_response(response):
+    """Compress JSON, MessagePack and HTML bodies as negotiated by Accept-Encoding."""
+    if (not COMPRESS or response.direct_passthrough or response.is_streamed
+            or response.mimetype not in wire.COMPRESSIBLE_MIMETYPES
+            or response.status_code < 200 or response.status_code == 304
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < wire.MIN_COMPRESS_SIZE:
+        return response
+    encoding = wire.choose_encoding(request.accept_encodings)
+    if encoding is not None:
+        response.set_data(wire.compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        # A strong validator names exact bytes; the compressed ones differ
+        tag, weak = response.get_etag()
+        if tag is not None and not weak:
+            response.set_etag(tag, weak=True)
+    return response
+
+# Operational metrics, exposed at /metrics in the Prometheus text format
+REQUEST_SECONDS = metrics.Histogram('qgo_http_request_duration_seconds', 'HTTP request latency',
+                                    ['route', 'method', 'status'])
+GAMES_CREATED = metrics.Counter('qgo_games_created_total', 'Games started', ['mode'])
+GAMES_FINISHED = metrics.Counter('qgo_games_finished_total', 'Games played to the end', ['mode', 'winner'])
+STATE_CACHE_LOOKUPS = metrics.Counter('qgo_state_cache_lookups_total', 'Serialised /get_state cache lookups', ['result'])
+metrics.Gauge('qgo_games_active', 'Unfinished games held in process memory (hibernated and SQLite games are not counted)',
+              callback=lambda: sum(not game.game_over for _, game in games.resident_games()))
+metrics.Gauge('qgo_game_store', 'Game store statistics', ['stat'],
+              callback=lambda: {(name,): value for name, value in games.stats().items()})
+metrics.Gauge('qgo_jobs', 'Asynchronous move jobs by state', ['state'],
+              callback=lambda: {('queued',): jobs.stats()['queue_depth'], ('running',): jobs.stats()['running']})
+metrics.Counter('qgo_jobs_total', 'Asynchronous move jobs by outcome', ['outcome'],
+                callback=lambda: {(outcome,): jobs.stats()[outcome] for outcome in ('completed', 'failed', 'rejected')})
+metrics.Gauge('qgo_job_wait_seconds_avg', 'Mean queue wait of recent jobs',
+              callback=lambda: jobs.stats()['avg_wait_ms'] / 1000)
+
+metrics.Gauge('qgo_admission', 'ZidanAI admission control by state', ['state'],
+              callback=lambda: {(state,): admission.stats()[key]
+                                for state, key in (('running', 'running'), ('queued', 'queue_depth'))})
+metrics.Counter('qgo_admission_total', 'ZidanAI admission outcomes', ['outcome'],
+                callback=lambda: {(outcome,): admission.stats()[outcome]
+                                  for outcome in ('admitted', 'rejected', 'timed_out')})
+
+metrics.Counter('qgo_game_locks_total', 'Move requests that shared an identical move in progress '
+                '(coalesced) or waited for another move on their game (contended)', ['outcome'],
+                callback=lambda: {(outcome,): game_locks.stats()[outcome] for outcome in ('coalesced', 'contended')})
+
+metrics.Counter('qgo_zidan_stage_seconds_total', 'Wall time of ZidanAI decision and render stages '
+                '(QGO_ZIDAN_TIMING=1)', ['stage'],
+                callback=lambda: {(stage,): totals['wall_s'] for stage, totals in stage_stats().items()})
+
+def _cache_lookups():
+    """Hits and misses of the in-process caches."""
+    lookups = {('ponder', 'hit'): ponderer.hits, ('ponder', 'miss'): ponderer.misses}
+    for name, cached in (('image_circuit', visuals.circuit_png), ('image_histogram', visuals.histogram_png),
+                         ('api_move', evaluate_position)):
+        info = cached.cache_info()
+        lookups[(name, 'hit')] = info.hits
+        lookups[(name, 'miss')] = info.misses
+    return lookups
+
+metrics.Counter('qgo_cache_lookups_total', 'In-process cache lookups', ['cache', 'result'], callback=_cache_lookups)
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+    if request.url_rule is not None:
+        profiler.request_started(request.url_rule.rule)
+
+@app.teardown_request
+def finish_profiling(exc):
+    profiler.request_finished()
+
+# WSGI environ key of a slot already taken for the request by the async
+# front end (asgi.py), which waits for slots without holding a thread
+PREADMITTED = 'qgo.zidan_slot'
+# ... and of a pondered decision it claimed for the request instead
+PONDERED = 'qgo.pondered'
+
+@app.teardown_request
+def release_zidan_slot(exc):
+    for ticket in (g.pop('zidan_slot', None), request.environ.pop(PREADMITTED, None)):
+        if ticket is not None:
+            admission.release(ticket)
+
+def zidan_decides(game):
+    """Whether a move request on this game makes ZidanAI decide."""
+    return not game.game_over and (game.current_player == ZIDAN_AI or
+                                   (game.mode == 'B' and game.current_player == HUMAN))
+
+def claim_pondered(game_id, game, data):
+    """ZidanAI's decision for this move request if pondering has already
+    computed it (see Ponderer.claim), else None.
+    """
+    human_move = None
+    if game.current_player == HUMAN:
+        human_move = (data.get('row'), data.get('col'))
+        if not all(isinstance(v, int) for v in human_move):
+            return None
+    return ponderer.claim(game_id, game, human_move)
+
+def admit_zidan(game_id, game):
+    """Prepare a move request that makes ZidanAI decide: use the decision
+    pondering already computed, if any (g.pondered), or else take a ZidanAI
+    slot for the rest of the request (released at teardown). Done before the
+    game changes, so a refusal leaves it untouched. Raises Overloaded.
+    """
+    if not zidan_decides(game) or g.get('zidan_slot') is not None or g.get('pondered') is not None:
+        return
+    g.pondered = request.environ.pop(PONDERED, None) or \
+        claim_pondered(game_id, game, request.get_json(silent=True) or {})
+    if g.pondered is None:
+        ticket = request.environ.pop(PREADMITTED, None)
+        g.zidan_slot = ticket if ticket is not None else admission.acquire(game_id)
+
+def serialized_move(view):
+    """Run a move view under its game's lock. A request with the same route,
+    body and response format as a move still in progress on the game (a
+    double-click or retry) waits for that move and gets a copy of its response.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        game_id = session.get('game_id')
+        if not game_id:
+            return view(*args, **kwargs)
+        body = request.get_json(silent=True)
+        key = (request.path, json.dumps(body, sort_keys=True), wire_format())
+        
+        def run():
+            response = app.make_response(view(*args, **kwargs))
+            return response.get_data(), response.status_code, list(response.headers.items())
+        
+        (data, status, headers), shared = game_locks.run(game_id, key, run)
+        response = Response(data, status=status, headers=headers)
+        if shared:
+            response.headers['X-Coalesced'] = '1'
+        return response
+    return wrapper
+
+def overloaded(e):
+    """503 reply for a refused request."""
+    response = reply({'error': str(e), 'retry_after': e.retry_after, **admission.stats()})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+@app.after_request
+def record_request(response):
+    """Observe request latency by route pattern (streams: time to first byte)."""
+    start = g.get('request_start')
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - start, route=route,
+                                method=request.method, status=response.status_code)
+    return response
+
+def game_finished(game_id, game):
+    """Bookkeeping when a move ends a game."""
+    ponderer.cancel(game_id)
+    GAMES_FINISHED.inc(mode=game.mode, winner=game.winner)
+
+def log_cursor(game, since=None):
+    """Index of the first log entry the client has not seen yet.
+    Clients pass since=<number of entries they already hold> in the query
+    string or JSON body; without it (or if it is out of range) it is 0.
+    """
+    if since is None:
+        since = request.args.get('since', type=int)
+    if since is None:
+        data = request.get_json(silent=True) or {}
+        since = data.get('since')
+    if not isinstance(since, int) or not 0 <= since <= len(game.game_log):
+        since = 0
+    return since
+
+def log_since(game, since=None):
+    """Return the part of the game log the client has not seen yet (see log_cursor).
+    Returns: dict with game_log, log_start and log_length
+    """
+    since = log_cursor(game, since)
+    return {
+        'game_log': game.log_view(since),
+        'log_start': since,
+        'log_length': len(game.game_log)
+    }
+
+def image_signature(kind, params):
+    """Signature of image parameters issued by this server. Renders are slow
+    and serialized, so the /images routes only draw signed parameters.
+    """
+    message = f"{kind}:{','.join(map(str, params))}".encode('ascii')
+    return hmac.new(app.secret_key.encode(), message, hashlib.sha256).hexdigest()[:16]
+
+def image_url(kind, params):
+    """Signed URL of a circuit or histogram image."""
+    return url_for(f'{kind}_image', params=','.join(map(str, params)), sig=image_signature(kind, params))
+
+def image_urls(result):
+    """URLs of the circuit and histogram images for a ZidanAI result.
+    The images are rendered on request by the /images routes; decisions
+    degraded past images get none.
+    """
+    if images_skipped(result['degradation']):
+        return {}
+    return {
+        'circuit_image_url': image_url('circuit', visuals.circuit_params(result['features'])),
+        'histogram_image_url': image_url('histogram', visuals.histogram_params(result['bell_counts']))
+    }
+
+def send_image(kind, params, render, check):
+    """Serve a rendered PNG as an immutable resource with a strong ETag.
+    Conditional requests are answered with 304 without rendering; parameters
+    without a valid signature (see image_urls) are not drawn at all.
+    """
+    try:
+        params = tuple(int(value) for value in params.split(','))
+        check(params)
+    except ValueError:
+        abort(404)
+    if not hmac.compare_digest(request.args.get('sig', ''), image_signature(kind, params)):
+        abort(404)
+    tag = visuals.etag(kind, params)
+    if request.if_none_match.contains_weak(tag):
+        response = make_response('', 304)
+    else:
+        try:
+            png = render(params)
+        except visuals.RenderError:
+            abort(500)  # not cached: a later request draws it again
+        response = make_response(png)
+        response.mimetype = 'image/png'
+    response.set_etag(tag)
+    response.headers['Cache-Control'] = visuals.CACHE_CONTROL
+    return response
+
+@app.route('/images/circuit/<params>.png')
+def circuit_image(params):
+    """Circuit diagram for a comma-separated feature triple."""
+    return send_image('circuit', params, visuals.circuit_png, visuals.check_circuit_params)
+
+@app.route('/images/histogram/<params>.png')
+def histogram_image(params):
+    """Measurement histogram for comma-separated Bell counts (00,01,10,11)."""
+    return send_image('histogram', params, visuals.histogram_png, visuals.check_histogram_params)
 
 @app.route('/')
 def index():
@@ -30,12 +375,11 @@ def start_game():
         mode = data.get('mode', 'A')
         
         if mode not in ['A', 'B']:
-            return jsonify({'error': 'Invalid mode'}), 400
+            return reply({'error': 'Invalid mode'}), 400
         
         # Create new game
-        game_id = len(games) + 1
+        game_id = games.new_id()
         game = GameState(mode=mode)
-        games[game_id] = game
         
         # Store game_id in session
         session['game_id'] = game_id
@@ -44,26 +388,31 @@ def start_game():
         log_entry = {
             'turn': 0,
             'player': 'System',
-            'message': f'Game started in Mode {mode}',
-            'board': game.print_board()
+            'message': f'Game started in Mode {mode}'
         }
         game.game_log.append(log_entry)
+        games.put(game_id, game)
+        GAMES_CREATED.inc(mode=mode)
+        
+        # Start thinking about the first move (or the human's possible moves)
+        ponderer.start(game_id, game)
         
         response = {
             'game_id': game_id,
             'mode': mode,
             'board': game.board,
             'current_player': game.get_player_name(game.current_player),
-            'game_log': game.game_log,
+            **log_since(game),
             'game_over': game.game_over
         }
         
-        return jsonify(response)
+        return reply(response)
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return reply({'error': str(e)}), 500
 
 @app.route('/play', methods=['POST'])
+@serialized_move
 def play_turn():
     """
     Execute a turn:
@@ -73,14 +422,15 @@ def play_turn():
     try:
         data = request.get_json()
         game_id = session.get('game_id')
+        game = games.get(game_id) if game_id else None
         
-        if game_id not in games:
-            return jsonify({'error': 'Game not found'}), 404
-        
-        game = games[game_id]
+        if game is None:
+            return reply({'error': 'Game not found'}), 404
         
         if game.game_over:
-            return jsonify({'error': 'Game already over', 'winner': game.winner}), 400
+            return reply({'error': 'Game already over', 'winner': game.winner}), 400
+        
+        admit_zidan(game_id, game)
         
         # Handle human move in Mode B
         if game.mode == 'B' and game.current_player == HUMAN:
@@ -88,7 +438,7 @@ def play_turn():
             col = data.get('col')
             
             if row is None or col is None:
-                return jsonify({'error': 'Row and col required for human move'}), 400
+                return reply({'error': 'Row and col required for human move'}), 400
             
             # Try to apply move with suicide checking
             success, captured, is_suicide, message = game.try_move(row, col, HUMAN)
@@ -103,29 +453,20 @@ def play_turn():
                         'suicideRejected': True
                     }
                     game.game_log.append(log_entry)
+                    games.put(game_id, game)
                 
-                return jsonify({
+                return reply({
                     'error': message,
                     'suicideRejected': is_suicide,
                     'board': game.board,
-                    'game_log': game.game_log
+                    **log_since(game)
                 }), 400
             
-            # Calculate scores after move
-            opponent = ZIDAN_AI
-            human_score = game.get_score_breakdown(HUMAN)
-            ai_score = game.get_score_breakdown(opponent)
-            
             log_entry = {
                 'turn': game.turn_count + 1,
                 'player': 'Human',
                 'move': f'({row}, {col})',
                 'rationale': 'Human player move',
-                'board': game.print_board(),
-                'scores': {
-                    'Human': human_score,
-                    'ZidanAI': ai_score
-                },
                 'captures': captured if captured else []
             }
             game.game_log.append(log_entry)
@@ -134,10 +475,12 @@ def play_turn():
             
             # Check game over after human move
             if game.check_game_over():
-                return jsonify({
+                games.put(game_id, game)
+                game_finished(game_id, game)
+                return reply({
                     'board': game.board,
                     'current_player': None,
-                    'game_log': game.game_log,
+                    **log_since(game),
                     'game_over': True,
                     'winner': game.winner,
                     'turn_count': game.turn_count
@@ -147,9 +490,12 @@ def play_turn():
         
         # AI turn (executes for Mode A always, and for Mode B after human move)
         if game.current_player == ZIDAN_AI:
-            # ZidanAI move
-            zidan = ZidanAI(game)
-            result = zidan.choose_move()
+            # ZidanAI move (may already have been computed in the background)
+            result = g.pop('pondered', None) or ponderer.take(game_id, game)
+            if result is None:
+                with metrics.AI_DECISION_SECONDS.time(player='ZidanAI', source='request'):
+                    zidan = ZidanAI(game)
+                    result = zidan.choose_move(render_images=False, deadline=move_deadline())
             
             row, col = result['row'], result['col']
             
@@ -160,50 +506,53 @@ def play_turn():
                     'turn': game.turn_count + 1,
                     'player': 'ZidanAI',
                     'move': 'Pass',
-                    'rationale': result['rationale'],
-                    'board': game.print_board()
+                    'rationale': result['rationale']
                 }
             else:
-                # Apply move
-                game.apply_move(row, col, ZIDAN_AI)
-                
-                # Check for captures
-                captured = game.check_captures(ZIDAN_AI)
+                # Try move with suicide checking
+                success, captured, is_suicide, message = game.try_move(row, col, ZIDAN_AI)
                 
-                # Calculate scores after move
-                if game.mode == 'A':
-                    player1_score = game.get_score_breakdown(ZIDAN_AI)
-                    player2_score = game.get_score_breakdown(RULES_AI)
-                    scores = {'ZidanAI': player1_score, 'RuleBasedAI': player2_score}
+                if not success:
+                    # Pass instead of the rejected suicide
+                    game.pass_turn()
+                    log_entry = {
+                        'turn': game.turn_count + 1,
+                        'player': 'ZidanAI',
+                        'move': 'Pass',
+                        'message': f'Attempted suicide move rejected: {message}',
+                        'rationale': result['rationale'],
+                        'suicideRejected': True,
+                        'captures': []
+                    }
                 else:
-                    player1_score = game.get_score_breakdown(HUMAN)
-                    player2_score = game.get_score_breakdown(ZIDAN_AI)
-                    scores = {'Human': player1_score, 'ZidanAI': player2_score}
-                
-                log_entry = {
-                    'turn': game.turn_count + 1,
-                    'player': 'ZidanAI',
-                    'move': f'({row}, {col})',
-                    'rationale': result['rationale'],
-                    'features': result['features'],
-                    'classification': result['classification'],
-                    'confidence': f"{result['confidence']:.1f}%",
-                    'entanglement_score': f"{result['entanglement_score']:.3f}",
-                    'bell_counts': result['bell_counts'],
-                    'circuit_image': result['circuit_image'],
-                    'histogram_image': result['histogram_image'],
-                    'board': game.print_board(),
-                    'scores': scores,
-                    'captures': captured if captured else []
-                }
+                    log_entry = {
+                        'turn': game.turn_count + 1,
+                        'player': 'ZidanAI',
+                        'move': f'({row}, {col})',
+                        'rationale': result['rationale'],
+                        'features': result['features'],
+                        'classification': result['classification'],
+                        'confidence': f"{result['confidence']:.1f}%",
+                        'entanglement_score': f"{result['entanglement_score']:.3f}",
+                        'bell_counts': result['bell_counts'],
+                        **image_urls(result),
+                        'captures': captured
+                    }
+            log_entry['degradation'] = result['degradation']
+            if 'timings' in result:
+                log_entry['timings'] = result['timings']
             
             game.game_log.append(log_entry)
             game.next_turn()
         
         elif game.current_player == RULES_AI:
-            # RuleBasedAI move
-            rules = RuleBasedAI(game)
-            row, col, rationale = rules.choose_move()
+            # RuleBasedAI move (may already have been computed in the background)
+            decision = ponderer.take(game_id, game)
+            if decision is None:
+                with metrics.AI_DECISION_SECONDS.time(player='RuleBasedAI', source='request'):
+                    rules = RuleBasedAI(game)
+                    decision = rules.choose_move()
+            row, col, rationale = decision
             
             if row is None:
                 # Pass
@@ -212,32 +561,32 @@ def play_turn():
                     'turn': game.turn_count + 1,
                     'player': 'RuleBasedAI',
                     'move': 'Pass',
-                    'rationale': rationale,
-                    'board': game.print_board()
+                    'rationale': rationale
                 }
             else:
-                # Apply move
-                game.apply_move(row, col, RULES_AI)
-                
-                # Check for captures
-                captured = game.check_captures(RULES_AI)
-                
-                # Calculate scores after move
-                player1_score = game.get_score_breakdown(ZIDAN_AI)
-                player2_score = game.get_score_breakdown(RULES_AI)
+                # Try move with suicide checking
+                success, captured, is_suicide, message = game.try_move(row, col, RULES_AI)
                 
-                log_entry = {
-                    'turn': game.turn_count + 1,
-                    'player': 'RuleBasedAI',
-                    'move': f'({row}, {col})',
-                    'rationale': rationale,
-                    'board': game.print_board(),
-                    'scores': {
-                        'ZidanAI': player1_score,
-                        'RuleBasedAI': player2_score
-                    },
-                    'captures': captured if captured else []
-                }
+                if not success:
+                    # Pass instead of the rejected suicide
+                    game.pass_turn()
+                    log_entry = {
+                        'turn': game.turn_count + 1,
+                        'player': 'RuleBasedAI',
+                        'move': 'Pass',
+                        'message': f'Attempted suicide move rejected: {message}',
+                        'rationale': rationale,
+                        'suicideRejected': True,
+                        'captures': []
+                    }
+                else:
+                    log_entry = {
+                        'turn': game.turn_count + 1,
+                        'player': 'RuleBasedAI',
+                        'move': f'({row}, {col})',
+                        'rationale': rationale,
+                        'captures': captured
+                    }
             
             game.game_log.append(log_entry)
             game.next_turn()
@@ -245,6 +594,14 @@ def play_turn():
         # Check game over
         game.check_game_over()
         
+        games.put(game_id, game)
+        
+        # Work on the next decision while the client handles this response
+        if game.game_over:
+            game_finished(game_id, game)
+        else:
+            ponderer.start(game_id, game)
+        
         # Calculate current scores
         if game.mode == 'A':
             player1_scores = game.get_score_breakdown(ZIDAN_AI)
@@ -264,217 +621,612 @@ def play_turn():
         response = {
             'board': game.board,
             'current_player': game.get_player_name(game.current_player) if not game.game_over else None,
-            'game_log': game.game_log,
+            **log_since(game),
             'game_over': game.game_over,
             'winner': game.winner if game.game_over else None,
             'turn_count': game.turn_count,
             'scores': scores
         }
         
-        return jsonify(response)
+        return reply(response)
     
+    except Overloaded as e:
+        return overloaded(e)
     except Exception as e:
         import traceback
-        return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
+        return reply({'error': str(e), 'trace': traceback.format_exc()}), 500
 
-@app.route('/ai-step', methods=['POST'])
-def ai_step():
-    """Execute exactly one AI move in Mode A (AI vs AI).
-    Advances the game by one move, respecting passes, captures, and suicide.
+def mode_a_state(game, since=None):
+    """Board, log delta, scores and status of a Mode A game for a response."""
+    return {
+        'board': game.board,
+        'current_player': game.get_player_name(game.current_player) if not game.game_over else None,
+        **log_since(game, since),
+        'game_over': game.game_over,
+        'winner': game.winner if game.game_over else None,
+        'turn_count': game.turn_count,
+        'scores': {
+            'ZidanAI': game.get_score_breakdown(ZIDAN_AI),
+            'RuleBasedAI': game.get_score_breakdown(RULES_AI)
+        }
+    }
+
+def play_ai_ply(game_id, game, deadline=None):
+    """Play one Mode A ply (ZidanAI or RuleBasedAI) and append its log entry.
+    Respects passes, captures and suicide, stores the game, and starts
+    prefetching the following ply. deadline bounds ZidanAI's decision.
     """
-    try:
-        game_id = session.get('game_id')
-        
-        if game_id not in games:
-            return jsonify({'error': 'Game not found'}), 404
-        
-        game = games[game_id]
-        
-        if game.mode != 'A':
-            return jsonify({'error': 'AI step only available in Mode A'}), 400
-        
-        if game.game_over:
-            return jsonify({
-                'error': 'Game already over',
-                'winner': game.winner,
-                'board': game.board,
-                'game_over': True
-            }), 400
-        
-        current_ai = game.get_player_name(game.current_player)
+    # Execute one AI move, using the prefetched decision when available
+    decision = g.pop('pondered', None) or ponderer.take(game_id, game)
+    
+    if game.current_player == ZIDAN_AI:
+        if decision is not None:
+            result = decision
+        else:
+            with metrics.AI_DECISION_SECONDS.time(player='ZidanAI', source='request'):
+                zidan = ZidanAI(game)
+                result = zidan.choose_move(render_images=False, deadline=deadline)
+        row, col = result['row'], result['col']
         
-        # Execute one AI move
-        if game.current_player == ZIDAN_AI:
-            zidan = ZidanAI(game)
-            result = zidan.choose_move()
-            row, col = result['row'], result['col']
+        if row is None:
+            # Pass
+            game.pass_turn()
+            log_entry = {
+                'turn': game.turn_count + 1,
+                'player': 'ZidanAI',
+                'move': 'Pass',
+                'message': 'No legal moves available',
+                'rationale': result['rationale'],
+                'captures': []
+            }
+        else:
+            # Try move with suicide checking
+            success, captured, is_suicide, message = game.try_move(row, col, ZIDAN_AI)
             
-            if row is None:
-                # Pass
+            if not success:
+                # Retry with pass if suicide
                 game.pass_turn()
                 log_entry = {
                     'turn': game.turn_count + 1,
                     'player': 'ZidanAI',
                     'move': 'Pass',
-                    'message': 'No legal moves available',
+                    'message': f'Attempted suicide move rejected: {message}',
                     'rationale': result['rationale'],
-                    'board': game.print_board(),
+                    'suicideRejected': True,
                     'captures': []
                 }
             else:
-                # Try move with suicide checking
-                success, captured, is_suicide, message = game.try_move(row, col, ZIDAN_AI)
-                
-                if not success:
-                    # Retry with pass if suicide
-                    game.pass_turn()
-                    log_entry = {
-                        'turn': game.turn_count + 1,
-                        'player': 'ZidanAI',
-                        'move': 'Pass',
-                        'message': f'Attempted suicide move rejected: {message}',
-                        'rationale': result['rationale'],
-                        'board': game.print_board(),
-                        'suicideRejected': True,
-                        'captures': []
-                    }
-                else:
-                    player1_score = game.get_score_breakdown(ZIDAN_AI)
-                    player2_score = game.get_score_breakdown(RULES_AI)
-                    
-                    log_entry = {
-                        'turn': game.turn_count + 1,
-                        'player': 'ZidanAI',
-                        'move': f'({row}, {col})',
-                        'rationale': result['rationale'],
-                        'features': result['features'],
-                        'classification': result['classification'],
-                        'confidence': f"{result['confidence']:.1f}%",
-                        'entanglement_score': f"{result['entanglement_score']:.3f}",
-                        'bell_counts': result['bell_counts'],
-                        'circuit_image': result['circuit_image'],
-                        'histogram_image': result['histogram_image'],
-                        'board': game.print_board(),
-                        'scores': {'ZidanAI': player1_score, 'RuleBasedAI': player2_score},
-                        'captures': captured
-                    }
-            
-            game.game_log.append(log_entry)
-            game.next_turn()
-            
-        elif game.current_player == RULES_AI:
-            rules = RuleBasedAI(game)
-            row, col, rationale = rules.choose_move()
+                log_entry = {
+                    'turn': game.turn_count + 1,
+                    'player': 'ZidanAI',
+                    'move': f'({row}, {col})',
+                    'rationale': result['rationale'],
+                    'features': result['features'],
+                    'classification': result['classification'],
+                    'confidence': f"{result['confidence']:.1f}%",
+                    'entanglement_score': f"{result['entanglement_score']:.3f}",
+                    'bell_counts': result['bell_counts'],
+                    **image_urls(result),
+                    'captures': captured
+                }
+        log_entry['degradation'] = result['degradation']
+        if 'timings' in result:
+            log_entry['timings'] = result['timings']
+        
+        game.game_log.append(log_entry)
+        game.next_turn()
+    
+    elif game.current_player == RULES_AI:
+        if decision is None:
+            with metrics.AI_DECISION_SECONDS.time(player='RuleBasedAI', source='request'):
+                rules = RuleBasedAI(game)
+                decision = rules.choose_move()
+        row, col, rationale = decision
+        
+        if row is None:
+            # Pass
+            game.pass_turn()
+            log_entry = {
+                'turn': game.turn_count + 1,
+                'player': 'RuleBasedAI',
+                'move': 'Pass',
+                'message': 'No legal moves available',
+                'rationale': rationale,
+                'captures': []
+            }
+        else:
+            # Try move with suicide checking
+            success, captured, is_suicide, message = game.try_move(row, col, RULES_AI)
             
-            if row is None:
-                # Pass
+            if not success:
+                # Pass if suicide
                 game.pass_turn()
                 log_entry = {
                     'turn': game.turn_count + 1,
                     'player': 'RuleBasedAI',
                     'move': 'Pass',
-                    'message': 'No legal moves available',
+                    'message': f'Attempted suicide move rejected: {message}',
                     'rationale': rationale,
-                    'board': game.print_board(),
+                    'suicideRejected': True,
                     'captures': []
                 }
             else:
-                # Try move with suicide checking
-                success, captured, is_suicide, message = game.try_move(row, col, RULES_AI)
-                
-                if not success:
-                    # Pass if suicide
-                    game.pass_turn()
-                    log_entry = {
-                        'turn': game.turn_count + 1,
-                        'player': 'RuleBasedAI',
-                        'move': 'Pass',
-                        'message': f'Attempted suicide move rejected: {message}',
-                        'rationale': rationale,
-                        'board': game.print_board(),
-                        'suicideRejected': True,
-                        'captures': []
-                    }
-                else:
-                    player1_score = game.get_score_breakdown(ZIDAN_AI)
-                    player2_score = game.get_score_breakdown(RULES_AI)
-                    
-                    log_entry = {
-                        'turn': game.turn_count + 1,
-                        'player': 'RuleBasedAI',
-                        'move': f'({row}, {col})',
-                        'rationale': rationale,
-                        'board': game.print_board(),
-                        'scores': {'ZidanAI': player1_score, 'RuleBasedAI': player2_score},
-                        'captures': captured
-                    }
-            
-            game.game_log.append(log_entry)
-            game.next_turn()
+                log_entry = {
+                    'turn': game.turn_count + 1,
+                    'player': 'RuleBasedAI',
+                    'move': f'({row}, {col})',
+                    'rationale': rationale,
+                    'captures': captured
+                }
         
-        # Check game over
-        game.check_game_over()
+        game.game_log.append(log_entry)
+        game.next_turn()
+    
+    # Check game over
+    game.check_game_over()
+    
+    games.put(game_id, game)
+    
+    # Prefetch the next ply so the following step returns immediately
+    if game.game_over:
+        game_finished(game_id, game)
+    else:
+        ponderer.start(game_id, game)
+
+@app.route('/ai-step', methods=['POST'])
+@serialized_move
+def ai_step():
+    """Execute exactly one AI move in Mode A (AI vs AI).
+    Advances the game by one move, respecting passes, captures, and suicide.
+    """
+    try:
+        game_id = session.get('game_id')
+        game = games.get(game_id) if game_id else None
         
-        # Calculate final scores
-        player1_scores = game.get_score_breakdown(ZIDAN_AI)
-        player2_scores = game.get_score_breakdown(RULES_AI)
-        scores = {'ZidanAI': player1_scores, 'RuleBasedAI': player2_scores}
+        if game is None:
+            return reply({'error': 'Game not found'}), 404
+        
+        if game.mode != 'A':
+            return reply({'error': 'AI step only available in Mode A'}), 400
+        
+        if game.game_over:
+            return reply({
+                'error': 'Game already over',
+                'winner': game.winner,
+                'board': game.board,
+                'game_over': True
+            }), 400
+        
+        current_ai = game.get_player_name(game.current_player)
+        
+        admit_zidan(game_id, game)
+        play_ai_ply(game_id, game, move_deadline())
         
         response = {
-            'board': game.board,
-            'current_player': game.get_player_name(game.current_player) if not game.game_over else None,
-            'game_log': game.game_log,
-            'game_over': game.game_over,
-            'winner': game.winner if game.game_over else None,
-            'turn_count': game.turn_count,
-            'scores': scores,
+            **mode_a_state(game),
             'message': f'{current_ai} completed move'
         }
         
-        return jsonify(response)
+        return reply(response)
     
+    except Overloaded as e:
+        return overloaded(e)
     except Exception as e:
         import traceback
-        return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
+        return reply({'error': str(e), 'trace': traceback.format_exc()}), 500
+
+@app.route('/autoplay/stream', methods=['GET'])
+def autoplay_stream():
+    """Play the rest of a Mode A game on the server as a Server-Sent Events stream.
+    Query: since=<log entries the client holds>, delay=<seconds between plies, 0-5>.
+    Each ply is sent as a 'ply' event carrying the same fields as /ai-step;
+    an 'end' event follows once the game is over.
+    """
+    game_id = session.get('game_id')
+    game = games.get(game_id) if game_id else None
+    
+    if game is None:
+        return jsonify({'error': 'Game not found'}), 404
+    
+    if game.mode != 'A':
+        return jsonify({'error': 'Autoplay only available in Mode A'}), 400
+    
+    delay, since = autoplay_options(request)
+    compact = wire_format() != 'json'
+    
+    def generate():
+        sent = since
+        try:
+            while not game.game_over:
+                if game.current_player == ZIDAN_AI:
+                    with admission.slot(game_id):
+                        state = autoplay_ply(game_id, game, sent, move_deadline(time.perf_counter()))
+                else:
+                    state = autoplay_ply(game_id, game, sent)
+                if state is None:
+                    break
+                sent = state['log_length']
+                yield sse_event('ply', state, compact)
+                if delay and not game.game_over:
+                    time.sleep(delay)
+            yield sse_event('end', mode_a_state(game, sent), compact)
+        except Overloaded as e:
+            yield sse_event('error', {'error': str(e), 'retry_after': e.retry_after}, compact)
+        except Exception as e:
+            yield sse_event('error', {'error': str(e)}, compact)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers.update(SSE_HEADERS)
+    return response
+
+# Headers of an autoplay event stream besides its content type
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'  # let nginx pass events through
+}
+
+def autoplay_options(req):
+    """(delay, since) from an autoplay stream request's query string."""
+    delay = min(max(req.args.get('delay', 0.0, type=float), 0.0), 5.0)
+    return delay, req.args.get('since', type=int)
+
+def sse_event(name, data, compact=False):
+    """One Server-Sent Event carrying data as JSON."""
+    if compact:
+        data = wire.compact_payload(data)
+    return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+def autoplay_ply(game_id, game, sent, deadline=None):
+    """Play one streamed autoplay ply under the game's lock (the caller holds
+    a ZidanAI slot when ZidanAI moves). Returns the 'ply' event state for a
+    client holding sent log entries, or None if the game is already over.
+    """
+    with game_locks.lock(game_id):
+        if game.game_over:
+            return None
+        play_ai_ply(game_id, game, deadline)
+    return mode_a_state(game, sent)
+
+def submit_job(view):
+    """Queue a move view to run in the background with a copy of this request.
+    Returns 202 with the job id, 409 if the game already has a pending job,
+    or 503 if the queue is full.
+    """
+    game_id = session.get('game_id')
+    if not game_id or games.get(game_id) is None:
+        return jsonify({'error': 'Game not found'}), 404
+    
+    request.get_json(silent=True)  # parse the body now; the request ends before the job runs
+    
+    @copy_current_request_context
+    def run():
+        response = app.make_response(view())
+        return {'status_code': response.status_code,
+                **wire.loads(response.get_data(), response.mimetype)}
+    
+    try:
+        job = jobs.submit(run, key=game_id)
+    except JobPending as e:
+        return jsonify({'error': 'A move is already pending for this game', **e.job.to_dict()}), 409
+    except QueueFull:
+        response = jsonify({'error': 'Server busy, try again shortly', **jobs.stats()})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    
+    return jsonify({
+        **job.to_dict(),
+        'poll_url': url_for('get_job', job_id=job.id),
+        'queue_depth': jobs.stats()['queue_depth']
+    }), 202
+
+@app.route('/jobs/play', methods=['POST'])
+def submit_play():
+    """Asynchronous /play: returns a job id immediately."""
+    return submit_job(play_turn)
+
+@app.route('/jobs/ai-step', methods=['POST'])
+def submit_ai_step():
+    """Asynchronous /ai-step: returns a job id immediately."""
+    return submit_job(ai_step)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status; with wait=<seconds> (up to 30) long-polls until the job finishes.
+    A finished job's result holds the /play or /ai-step response and its status_code.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    wait = min(max(request.args.get('wait', 0.0, type=float), 0.0), 30.0)
+    if wait:
+        job.wait(wait)
+    return reply(job.to_dict())
+
+@app.route('/jobs/stats', methods=['GET'])
+def job_stats():
+    """Queue depth, worker usage and recent wait times of the job queue."""
+    return jsonify(jobs.stats())
+
+@app.route('/admission/stats', methods=['GET'])
+def admission_stats():
+    """ZidanAI admission control: slots in use, queue depth, rejections and wait times."""
+    return jsonify(admission.stats())
+
+@app.route('/review/<int:index>', methods=['GET'])
+def review(index):
+    """Board and log entry after game_log[index], for stepping through a game.
+    Boards are replayed from the nearest checkpoint, so any index is cheap.
+    """
+    game_id = session.get('game_id')
+    game = games.get(game_id) if game_id else None
+    
+    if game is None:
+        return reply({'error': 'No active game'}), 404
+    
+    if index >= len(game.game_log):
+        return reply({'error': 'No such log entry', 'log_length': len(game.game_log)}), 404
+    
+    return reply({
+        'index': index,
+        'board': game.board_at(index),
+        'entry': game.log_view(index, index + 1)[0],
+        'log_length': len(game.game_log)
+    })
+
+# Stateless API: decisions depend only on mode, side to move and board, so
+# they are memoised per position here and may be cached by shared HTTP caches
+API_CACHE_CONTROL = 'public, max-age=3600'
+
+@lru_cache(maxsize=4096)
+def evaluate_position(mode, player, board):
+    """Move and analysis for a position given as a 25-character board string."""
+    game = GameState.from_position(board, player, mode=mode)
+    analysis = None
+    if player == ZIDAN_AI:
+        with admission.slot(f'api:{request.remote_addr}'), \
+                metrics.AI_DECISION_SECONDS.time(player='ZidanAI', source='api'):
+            result = ZidanAI(game).choose_move(render_images=False)
+        row, col, rationale = result['row'], result['col'], result['rationale']
+        analysis = {
+            'features': result['features'],
+            'classification': result['classification'],
+            'confidence': result['confidence'],
+            'entanglement_score': result['entanglement_score'],
+            'bell_counts': result['bell_counts'],
+            'opening_book': result['opening_book'],
+            **image_urls(result)
+        }
+    else:
+        with metrics.AI_DECISION_SECONDS.time(player='RuleBasedAI', source='api'):
+            row, col, rationale = RuleBasedAI(game).choose_move()
+    
+    payload = {'player': game.get_player_name(player), 'rationale': rationale}
+    if row is None:
+        payload.update({'row': None, 'col': None, 'move': 'Pass', 'captures': []})
+    else:
+        success, captured, is_suicide, message = game.try_move(row, col, player)
+        if success:
+            payload.update({'row': row, 'col': col, 'move': f'({row}, {col})', 'captures': captured})
+        else:
+            payload.update({'row': None, 'col': None, 'move': 'Pass', 'captures': [],
+                            'message': f'Attempted suicide move rejected: {message}',
+                            'suicideRejected': True})
+    if analysis is not None:
+        payload['analysis'] = analysis
+    return payload
+
+@app.route('/api/move', methods=['GET', 'POST'])
+def api_move():
+    """Choose a move for an explicit position, without any session or stored game.
+    Parameters (query string for GET, JSON body for POST):
+      board: 25-character string of cell values (row-major) or a 5x5 list
+      to_move: side to move, 'ZidanAI' or 'RuleBasedAI' (or its player value)
+      mode: 'A' (default) or 'B'; turn_count and passes (default 0)
+    turn_count and passes only decide whether the game is already over: neither AI
+    reads them, so they are not part of the memoised position or its ETag.
+    GET responses are cacheable; the ETag identifies the position and response format.
+    """
+    params = request.args if request.method == 'GET' else request.get_json(silent=True)
+    if params is None:
+        params = {}
+    if not isinstance(params, dict):
+        return reply({'error': 'JSON body must be an object'}), 400
+    to_move = params.get('to_move')
+    if isinstance(to_move, str) and to_move.isdigit():
+        to_move = int(to_move)
+    
+    try:
+        game = GameState.from_position(params.get('board'), to_move,
+                                       turn_count=int(params.get('turn_count', 0)),
+                                       consecutive_passes=int(params.get('passes', 0)),
+                                       mode=params.get('mode', 'A'))
+    except (TypeError, ValueError) as e:
+        return reply({'error': str(e)}), 400
+    
+    if game.current_player == HUMAN:
+        return reply({'error': 'Only AI players can be asked for a move'}), 400
+    if game.check_game_over():
+        return reply({'error': 'Game already over', 'winner': game.winner}), 400
+    
+    position = f'{game.mode}{game.current_player}-{game.position_key():013x}'
+    etag = f'{position}-{wire_format()}'  # the body differs by format
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+    else:
+        try:
+            payload = evaluate_position(game.mode, game.current_player, wire.board_string(game.board))
+        except Overloaded as e:
+            return overloaded(e)
+        response = reply({'position': position, **payload})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = API_CACHE_CONTROL
+    response.vary.add('Accept')
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Process metrics in the Prometheus text exposition format."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+def require_admin():
+    """404 unless QGO_ADMIN_TOKEN is set and the request carries it
+    (X-Admin-Token header or token query parameter)."""
+    token = request.headers.get('X-Admin-Token') or request.args.get('token', '')
+    if not ADMIN_TOKEN or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        abort(404)
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """Sample the live process and return collapsed stacks or a flame graph.
+
+    Query parameters:
+      seconds: profile every thread for this long (default: 5)
+      route, requests: instead, profile the next `requests` requests to
+          this route pattern (e.g. /ai-step), waiting up to `timeout` seconds
+      interval: seconds between samples (default: 0.005)
+      idle: 1 to keep threads blocked in locks, queues or sockets (seconds mode)
+      format: 'collapsed' (default) or 'svg'
+    """
+    require_admin()
+    try:
+        interval = max(float(request.args.get('interval', profiler.DEFAULT_INTERVAL)), 0.001)
+        route = request.args.get('route')
+        if route:
+            stacks, profiled = profiler.capture(route, int(request.args.get('requests', 1)),
+                                                timeout=float(request.args.get('timeout', profiler.MAX_SECONDS)),
+                                                interval=interval)
+            title = f"{route}: {profiled} request(s)"
+        else:
+            seconds = float(request.args.get('seconds', 5))
+            stacks = profiler.sample(seconds, interval, include_idle=request.args.get('idle') == '1')
+            title = f"All threads: {min(seconds, profiler.MAX_SECONDS):g} s"
+    except ValueError:
+        return jsonify({'error': 'Invalid profile parameters'}), 400
+    except profiler.ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 409
+
+    if request.args.get('format') == 'svg':
+        return Response(profiler.to_svg(stacks, title), content_type='image/svg+xml')
+    return Response(profiler.to_collapsed(stacks), content_type='text/plain; charset=utf-8')
+
+def memory_report(top=10, tracker=allocations):
+    """Process RSS, per-game memory by part, cache sizes and allocation growth
+    since tracker's previous report.
+    """
+    with _state_cache_lock:
+        state_cache_bytes = sum(len(body) for body, _ in _state_cache.values())
+        state_cache_entries = len(_state_cache)
+    return {
+        'rss_bytes': memdiag.rss_bytes(),
+        'games': memdiag.games_report(games.resident_games(), top),
+        'store': games.stats(),
+        'caches': {
+            'state_cache_entries': state_cache_entries,
+            'state_cache_bytes': state_cache_bytes,
+            'image_renders_cached': visuals.circuit_png.cache_info().currsize + visuals.histogram_png.cache_info().currsize,
+            'api_move_positions_cached': evaluate_position.cache_info().currsize
+        },
+        'allocations': tracker.growth(top)
+    }
+
+@app.route('/debug/memory', methods=['GET'])
+def debug_memory():
+    """Memory diagnostics (admin token required).
+
+    Query parameters:
+      top: number of largest games and growing source lines (default: 10)
+      trace: 'start' (optionally with frames=N) or 'stop' tracemalloc; while
+          tracing, each call reports allocation growth since the previous one
+    """
+    require_admin()
+    try:
+        top = int(request.args.get('top', 10))
+        trace = request.args.get('trace')
+        if trace == 'start':
+            allocations.start(int(request.args.get('frames', 1)))
+        elif trace == 'stop':
+            allocations.stop()
+    except ValueError:
+        return jsonify({'error': 'Invalid parameters'}), 400
+    return jsonify(memory_report(top))
+
+# Serialised /get_state bodies by ETag; the ETag covers the game, its state
+# version, the log cursor and the response format, so entries never go stale
+STATE_CACHE_SIZE = 1024
+_state_cache = OrderedDict()
+_state_cache_lock = threading.Lock()
+
+def state_version(game):
+    """Changes whenever a game changes: every move, pass or rejected move adds a log entry."""
+    return f'{len(game.game_log)}.{game.turn_count}.{int(game.game_over)}'
 
 @app.route('/get_state', methods=['GET'])
 def get_state():
-    """Get current game state."""
+    """Get current game state.
+    Responses carry an ETag for the game's state version; polls sending it
+    back in If-None-Match get 304 Not Modified while nothing has changed.
+    """
     try:
         game_id = session.get('game_id')
+        game = games.get(game_id) if game_id else None
         
-        if game_id not in games:
-            return jsonify({'error': 'No active game'}), 404
+        if game is None:
+            return reply({'error': 'No active game'}), 404
         
-        game = games[game_id]
-        
-        # Calculate scores
-        if game.mode == 'A':
-            scores = {
-                'ZidanAI': game.get_score_breakdown(ZIDAN_AI),
-                'RuleBasedAI': game.get_score_breakdown(RULES_AI)
-            }
+        key = f'{game_id}:{state_version(game)}:{log_cursor(game)}:{wire_format()}'
+        tag = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+        if request.if_none_match.contains_weak(tag):
+            response = make_response('', 304)
         else:
-            scores = {
-                'Human': game.get_score_breakdown(HUMAN),
-                'ZidanAI': game.get_score_breakdown(ZIDAN_AI)
-            }
-        
-        response = {
-            'board': game.board,
-            'current_player': game.get_player_name(game.current_player) if not game.game_over else None,
-            'game_log': game.game_log,
-            'game_over': game.game_over,
-            'winner': game.winner if game.game_over else None,
-            'turn_count': game.turn_count,
-            'mode': game.mode,
-            'scores': scores
-        }
-        
-        return jsonify(response)
+            with _state_cache_lock:
+                cached = _state_cache.get(tag)
+                if cached is not None:
+                    _state_cache.move_to_end(tag)
+            STATE_CACHE_LOOKUPS.inc(result='hit' if cached is not None else 'miss')
+            if cached is not None:
+                response = Response(cached[0], mimetype=cached[1])
+            else:
+                response = reply(state_payload(game))
+                with _state_cache_lock:
+                    _state_cache[tag] = (response.get_data(), response.mimetype)
+                    while len(_state_cache) > STATE_CACHE_SIZE:
+                        _state_cache.popitem(last=False)
+        response.set_etag(tag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return reply({'error': str(e)}), 500
+
+def state_payload(game):
+    """Full /get_state response body for a game."""
+    # Calculate scores
+    if game.mode == 'A':
+        scores = {
+            'ZidanAI': game.get_score_breakdown(ZIDAN_AI),
+            'RuleBasedAI': game.get_score_breakdown(RULES_AI)
+        }
+    else:
+        scores = {
+            'Human': game.get_score_breakdown(HUMAN),
+            'ZidanAI': game.get_score_breakdown(ZIDAN_AI)
+        }
+    
+    return {
+        'board': game.board,
+        'current_player': game.get_player_name(game.current_player) if not game.game_over else None,
+        **log_since(game),
+        'game_over': game.game_over,
+        'winner': game.winner if game.game_over else None,
+        'turn_count': game.turn_count,
+        'mode': game.mode,
+        'scores': scores
+    }
+
+if os.environ.get('QGO_MEMORY_LOG', '0') != '0':
+    memdiag.start_logging(float(os.environ['QGO_MEMORY_LOG']),
+                          lambda: memory_report(tracker=logged_allocations))
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
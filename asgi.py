@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+asgi.py - Async (ASGI) serving mode and production entry point
+
+The Flask app is synchronous: under a threaded WSGI server each request
+holds an OS thread for its whole life, including the time a move spends
+waiting for a ZidanAI slot or for another move on the same game. This
+module wraps it as an ASGI application:
+
+- /play and /ai-step wait for their game and their ZidanAI slot as asyncio
+  tasks and only take a thread from the game pool to compute the move.
+  Identical moves in flight on a game share one response.
+- /autoplay/stream waits for each ply's slot and the delay between plies
+  the same way, taking a game pool thread per ply.
+- /start and /get_state never wait; they run on the game pool directly.
+- Every other route is bridged to the Flask app on a separate bridge pool.
+  Those that can block (/api/move waiting for a slot, long-polled
+  /jobs/<id>, /debug/profile) hold a bridge thread meanwhile, so at most
+  QGO_ASGI_BRIDGE_THREADS of them wait at once, without slowing games.
+
+Run with any ASGI server (not in requirements.txt; launcher.py and run.bat
+start Flask's debug server for local play instead):
+    uvicorn asgi:application --host 0.0.0.0 --port 8000
+    python asgi.py --port 8000            # the same, via uvicorn
+
+Games live in process memory by default; with several worker processes use
+QGO_STORE=sqlite:///games.db so every process sees every game.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from werkzeug.http import parse_cookie
+from werkzeug.wrappers import Request
+
+import app as flask_module
+from admission import Overloaded
+
+# Threads computing moves and plies, and serving /start and /get_state
+THREADS = int(os.environ.get('QGO_ASGI_THREADS', '16'))
+# Threads serving every other route through the Flask app
+BRIDGE_THREADS = int(os.environ.get('QGO_ASGI_BRIDGE_THREADS', '8'))
+
+GAME_ROUTES = ('/start', '/play', '/ai-step', '/get_state')
+MOVE_ROUTES = ('/play', '/ai-step')
+AUTOPLAY_ROUTE = '/autoplay/stream'
+
+
+def build_environ(scope, body):
+    """PEP 3333 environ for an ASGI HTTP scope and its request body."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('127.0.0.1', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'CONTENT_LENGTH': str(len(body)),  # the body is read in full, chunked or not
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name not in ('CONTENT_LENGTH', 'TRANSFER_ENCODING'):
+            key = 'HTTP_' + name
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def call_wsgi(wsgi_app, environ):
+    """Run the WSGI app; returns (status code, headers, body iterator)."""
+    started = []
+
+    def write(data):
+        raise NotImplementedError("The WSGI write() callable is not supported")
+
+    def start_response(status, headers, exc_info=None):
+        started[:] = [int(status.split(' ', 1)[0]), headers]
+        return write
+
+    iterable = wsgi_app(environ, start_response)
+    return started[0], started[1], iterable
+
+
+def in_request(wsgi_app, environ, fn, *args):
+    """fn(*args) inside a Flask request context for environ."""
+    with wsgi_app.request_context(environ):
+        return fn(*args)
+
+def read_all(iterable):
+    try:
+        return b''.join(iterable)
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+
+
+class QuantumGoASGI:
+    """ASGI application serving the Quantum Go Flask app."""
+
+    def __init__(self, wsgi_app=None, threads=THREADS, bridge_threads=BRIDGE_THREADS):
+        self.wsgi_app = wsgi_app or flask_module.app
+        self.threads = threads
+        self.bridge_threads = bridge_threads
+        self.executor = None
+        self.bridge_executor = None
+        self._game_locks = {}  # game id -> [asyncio.Lock, users]
+        self._flights = {}     # identical move request -> future of its response
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise NotImplementedError(f"Unsupported ASGI scope {scope['type']!r}")
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._ensure_executors()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for executor in (self.executor, self.bridge_executor):
+                    if executor is not None:
+                        executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _ensure_executors(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='asgi')
+            self.bridge_executor = ThreadPoolExecutor(max_workers=self.bridge_threads,
+                                                      thread_name_prefix='asgi-bridge')
+
+    async def run_sync(self, fn, *args, bridge=False):
+        """fn(*args) on the game pool (or the bridge pool)."""
+        self._ensure_executors()
+        executor = self.bridge_executor if bridge else self.executor
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+    async def http(self, scope, receive, send):
+        body = b''
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        environ = build_environ(scope, body)
+
+        if scope['path'] in GAME_ROUTES:
+            if scope['path'] in MOVE_ROUTES and scope['method'] == 'POST':
+                status, headers, data = await self.move(environ, body)
+            else:
+                status, headers, data = await self.handle(environ)
+            await send_response(send, status, headers, data)
+        elif scope['path'] == AUTOPLAY_ROUTE and scope['method'] == 'GET':
+            await self.autoplay(environ, receive, send)
+        else:
+            await self.stream(environ, send)
+
+    async def handle(self, environ, bridge=False):
+        """Run a request through the Flask app; returns the buffered response."""
+        status, headers, iterable = await self.run_sync(call_wsgi, self.wsgi_app, environ, bridge=bridge)
+        return status, headers, await self.run_sync(read_all, iterable, bridge=bridge)
+
+    async def stream(self, environ, send):
+        """Serve any other route on the bridge pool, sending the body as the app produces it."""
+        status, headers, iterable = await self.run_sync(call_wsgi, self.wsgi_app, environ, bridge=True)
+        await send({'type': 'http.response.start', 'status': status, 'headers': encode_headers(headers)})
+        chunks = iter(iterable)
+        try:
+            while True:
+                chunk = await self.run_sync(next, chunks, None, bridge=True)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            if hasattr(iterable, 'close'):
+                await self.run_sync(iterable.close, bridge=True)
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def autoplay(self, environ, receive, send):
+        """/autoplay/stream: plays the rest of a Mode A game as Server-Sent
+        Events, like the Flask route, but waits for each ply's ZidanAI slot
+        and the delay between plies without holding a thread.
+        """
+        game_id = self.game_id(environ)
+        game = await self.run_sync(flask_module.games.get, game_id) if game_id else None
+        if game is None or game.mode != 'A':
+            return await send_response(send, *await self.handle(environ))  # the app's 404/400
+
+        start = time.perf_counter()
+        req = Request(environ)
+        delay, sent = flask_module.autoplay_options(req)
+        compact = flask_module.wire_format(req) != 'json'
+        headers = [('Content-Type', 'text/event-stream; charset=utf-8'), *flask_module.SSE_HEADERS.items()]
+        await send({'type': 'http.response.start', 'status': 200, 'headers': encode_headers(headers)})
+        flask_module.REQUEST_SECONDS.observe(time.perf_counter() - start, route=AUTOPLAY_ROUTE,
+                                             method='GET', status=200)
+
+        disconnected = asyncio.Event()
+        async def watch():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+        watcher = asyncio.ensure_future(watch())
+
+        async def event(name, data):
+            body = flask_module.sse_event(name, data, compact).encode('utf-8')
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+        try:
+            while not game.game_over and not disconnected.is_set():
+                async with self.game_turn(game_id):
+                    if game.current_player == flask_module.ZIDAN_AI:
+                        ticket = await flask_module.admission.acquire_async(game_id)
+                        try:
+                            deadline = flask_module.move_deadline(time.perf_counter())
+                            state = await self.run_sync(in_request, self.wsgi_app, environ,
+                                                        flask_module.autoplay_ply, game_id, game, sent, deadline)
+                        finally:
+                            flask_module.admission.release(ticket)
+                    else:
+                        state = await self.run_sync(in_request, self.wsgi_app, environ,
+                                                    flask_module.autoplay_ply, game_id, game, sent)
+                if state is None:
+                    break
+                sent = state['log_length']
+                await event('ply', state)
+                if delay and not game.game_over:
+                    try:
+                        await asyncio.wait_for(disconnected.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+            if not disconnected.is_set():
+                await event('end', flask_module.mode_a_state(game, sent))
+        except Overloaded as e:
+            await event('error', {'error': str(e), 'retry_after': e.retry_after})
+        except Exception as e:
+            await event('error', {'error': str(e)})
+        finally:
+            watcher.cancel()
+        await send({'type': 'http.response.body', 'body': b''})
+
+    @asynccontextmanager
+    async def game_turn(self, game_id):
+        """Hold game_id's asyncio lock: one move or ply at a time per game."""
+        entry = self._game_locks.setdefault(game_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._game_locks[game_id]
+
+    def game_id(self, environ):
+        """Game id from the signed Flask session cookie, or None."""
+        app = self.wsgi_app
+        cookie = parse_cookie(environ.get('HTTP_COOKIE', '')).get(app.config['SESSION_COOKIE_NAME'])
+        serializer = app.session_interface.get_signing_serializer(app)
+        if not cookie or serializer is None:
+            return None
+        try:
+            data = serializer.loads(cookie, max_age=int(app.permanent_session_lifetime.total_seconds()))
+        except Exception:
+            return None
+        return data.get('game_id')
+
+    async def move(self, environ, body):
+        """A /play or /ai-step: one at a time per game, identical requests in
+        flight share a response, and the ZidanAI slot is awaited before a
+        thread is taken.
+
+        The move runs as its own task, so a requester that disconnects (the
+        first one included) only stops waiting: the others still get the
+        response. If the task itself is cancelled, the next waiter starts the
+        move again.
+        """
+        game_id = self.game_id(environ)
+        if game_id is None:
+            return await self.handle(environ)
+
+        key = (game_id, environ['PATH_INFO'], environ['QUERY_STRING'], body,
+               environ.get('HTTP_ACCEPT', ''), environ.get('HTTP_ACCEPT_ENCODING', ''))
+        while True:
+            flight = self._flights.get(key)
+            coalesced = flight is not None
+            if not coalesced:
+                flight = self._flights[key] = asyncio.ensure_future(self._fly(key, game_id, environ, body))
+                # Mark a failure retrieved: every waiter may have gone
+                flight.add_done_callback(lambda f: f.cancelled() or f.exception())
+            try:
+                status, headers, data = await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if flight.cancelled():
+                    continue  # the move was cancelled, not this request: run it again
+                raise
+            if coalesced:
+                headers = headers + [('X-Coalesced', '1')]
+            return status, headers, data
+
+    async def _fly(self, key, game_id, environ, body):
+        """Run a move for everyone waiting on key, then retire the flight."""
+        try:
+            return await self._move_in_turn(game_id, environ, body)
+        finally:
+            if self._flights.get(key) is asyncio.current_task():
+                del self._flights[key]
+
+    async def _move_in_turn(self, game_id, environ, body):
+        async with self.game_turn(game_id):
+            game = await self.run_sync(flask_module.games.get, game_id)
+            if game is not None and flask_module.zidan_decides(game):
+                decision = flask_module.claim_pondered(game_id, game, json_body(body))
+                if decision is not None:
+                    environ[flask_module.PONDERED] = decision
+                else:
+                    try:
+                        ticket = await flask_module.admission.acquire_async(game_id)
+                    except Overloaded as e:
+                        return overloaded_response(e)
+                    environ[flask_module.PREADMITTED] = ticket
+            try:
+                return await self.handle(environ)
+            finally:
+                # Not handed to the app (e.g. the request failed before routing)
+                ticket = environ.pop(flask_module.PREADMITTED, None)
+                if ticket is not None:
+                    flask_module.admission.release(ticket)
+
+
+def json_body(body):
+    """A request body's JSON object, or {} (the app reports malformed bodies)."""
+    try:
+        data = json.loads(body) if body else {}
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def encode_headers(headers):
+    return [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+async def send_response(send, status, headers, data):
+    await send({'type': 'http.response.start', 'status': status, 'headers': encode_headers(headers)})
+    await send({'type': 'http.response.body', 'body': data})
+
+def overloaded_response(e):
+    """503 for a move refused by admission control (same body as the Flask app's)."""
+    data = json.dumps({'error': str(e), 'retry_after': e.retry_after,
+                       **flask_module.admission.stats()}).encode('utf-8')
+    return 503, [('Content-Type', 'application/json'), ('Content-Length', str(len(data))),
+                 ('Retry-After', str(e.retry_after))], data
+
+
+application = QuantumGoASGI()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve Quantum Go with an ASGI server (uvicorn)')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='worker processes (more than one needs QGO_STORE=sqlite:///...)')
+    args = parser.parse_args()
+    try:
+        import uvicorn
+    except ImportError:
+        print("uvicorn is not installed: pip install uvicorn (or run asgi:application with another ASGI server)")
+        sys.exit(1)
+    if args.workers > 1 and os.environ.get('QGO_STORE', 'memory') == 'memory':
+        print("Warning: each worker keeps its own games; set QGO_STORE=sqlite:///games.db to share them")
+    uvicorn.run('asgi:application', host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+batch_sim.py - Lockstep NumPy simulator for Mode A self-play
+
+Holds B games as a (B, 25) int8 array and advances every active game one
+ply per step. Move choice, suicide checks, captures, passes and scoring
+all run as array operations over the whole batch; finished games are
+retired and stop taking part in later steps.
+
+The rules mirror GameState and the /ai-step flow exactly:
+  - RuleBasedAI: same heuristic and tie-breaking as RuleBasedAI.choose_move
+  - ZidanAI: exact (noise-free) classification, tabulated per feature
+    triple, followed by the aggressive/defensive scans of ZidanAI
+  - a move rejected as suicide becomes a pass
+
+Because the exact classification is deterministic, games from the empty
+board are all identical; use --random-plies to start from varied openings.
+
+Usage:
+    python batch_sim.py --games 10000 --random-plies 2
+"""
+import argparse
+import time
+import warnings
+warnings.filterwarnings('ignore')
+
+import numpy as np
+
+from game import GameState, BOARD_SIZE, EMPTY, ZIDAN_AI, RULES_AI
+
+CELLS = BOARD_SIZE * BOARD_SIZE
+OFF_BOARD = -1
+PASS = -1
+NO_LABEL = CELLS  # larger than any cell index
+UNSCORED = -10 ** 6
+
+PLAYER_NAMES = {ZIDAN_AI: 'ZidanAI', RULES_AI: 'RuleBasedAI', EMPTY: 'Draw'}
+
+
+def _build_neighbors():
+    """(25, 4) neighbor indices; missing neighbors point at the pad cell (index 25)."""
+    neighbors = np.full((CELLS, 4), CELLS, dtype=np.intp)
+    probe = GameState()
+    for idx in range(CELLS):
+        row, col = probe.idx_to_rc(idx)
+        for k, (nr, nc) in enumerate(probe.get_neighbors(row, col)):
+            neighbors[idx, k] = probe.rc_to_idx(nr, nc)
+    return neighbors
+
+
+NEIGHBORS = _build_neighbors()
+CELL_INDEX = np.arange(CELLS)
+ROWS = CELL_INDEX // BOARD_SIZE
+COLS = CELL_INDEX % BOARD_SIZE
+CENTER_DISTANCE = np.abs(ROWS - 2) + np.abs(COLS - 2)
+ON_EDGE = ((ROWS == 0) | (ROWS == BOARD_SIZE - 1) | (COLS == 0) | (COLS == BOARD_SIZE - 1)).astype(np.int64)
+
+# Exact ZidanAI classification per feature triple, shared by all simulators
+_classification_table = {}
+_zidan = None
+
+
+def _pad(values, fill):
+    """Append one pad column so NEIGHBORS can index past the board edge."""
+    pad = np.full((len(values), 1), fill, dtype=values.dtype)
+    return np.concatenate([values, pad], axis=1)
+
+
+def neighbor_values(boards):
+    """(B, 25, 4) contents of each cell's neighbors (OFF_BOARD past the edge)."""
+    return _pad(boards, OFF_BOARD)[:, NEIGHBORS]
+
+
+def label_groups(boards):
+    """Label connected groups of same-coloured stones.
+    Each stone gets the smallest cell index in its group; empty cells get NO_LABEL.
+    """
+    stones = boards != EMPTY
+    same = (neighbor_values(boards) == boards[:, :, None]) & stones[:, :, None]
+    labels = np.where(stones, CELL_INDEX, NO_LABEL)
+    while True:
+        neighbor_labels = _pad(labels, NO_LABEL)[:, NEIGHBORS]
+        new_labels = np.minimum(labels, np.where(same, neighbor_labels, NO_LABEL).min(axis=2))
+        # Pointer jumping: adopt the label of the cell our label points at
+        new_labels = np.take_along_axis(_pad(new_labels, NO_LABEL), new_labels, axis=1)
+        if np.array_equal(new_labels, labels):
+            return labels
+        labels = new_labels
+
+
+def group_stats(boards, labels, neighbors=None):
+    """Per-cell group size and whether the group has any liberty."""
+    if neighbors is None:
+        neighbors = neighbor_values(boards)
+    count = len(boards)
+    stones = boards != EMPTY
+    touches_empty = stones & (neighbors == EMPTY).any(axis=2)
+    flat = (labels + np.arange(count)[:, None] * (CELLS + 1)).ravel()
+    sizes = np.bincount(flat, weights=stones.ravel(), minlength=count * (CELLS + 1))
+    liberties = np.bincount(flat, weights=touches_empty.ravel(), minlength=count * (CELLS + 1))
+    group_size = np.where(stones, sizes[flat].reshape(count, CELLS), 0).astype(np.int64)
+    group_has_liberty = stones & (liberties[flat].reshape(count, CELLS) > 0)
+    return group_size, group_has_liberty
+
+
+def score_breakdown(boards, player, neighbors=None, group_size=None):
+    """Vectorised GameState.get_score_breakdown for every board.
+    Returns: dict of (B,) arrays (territory, liberties, connectivity, total)
+    """
+    if neighbors is None:
+        neighbors = neighbor_values(boards)
+    if group_size is None:
+        group_size, _ = group_stats(boards, label_groups(boards), neighbors)
+    mine = boards == player
+    territory = ((boards == EMPTY) & (neighbors == player).any(axis=2)).sum(axis=1)
+    liberties = np.where(mine, (neighbors == EMPTY).sum(axis=2), 0).sum(axis=1)
+    connectivity = np.where(mine, group_size, 0).max(axis=1)
+    return {
+        'territory': territory,
+        'liberties': liberties,
+        'connectivity': connectivity,
+        'total': territory * 2 + liberties + connectivity * 3
+    }
+
+
+def zidan_is_winning(features):
+    """Exact ZidanAI classification for a (territory, liberty, connectivity) triple."""
+    global _zidan
+    if features not in _classification_table:
+        from zidan_ai import ZidanAI
+        if _zidan is None:
+            _zidan = ZidanAI(GameState(mode='A'), use_book=False, shots=None)
+        counts = _zidan.exact_counts(_zidan.build_quantum_circuit(features))
+        S, _ = _zidan.calculate_entanglement_score(counts)
+        classification, _ = _zidan.classify_state(S)
+        _classification_table[features] = classification == "WINNING"
+    return _classification_table[features]
+
+
+def rules_moves(boards):
+    """RuleBasedAI.choose_move for every board. Returns cell index or PASS."""
+    neighbors = neighbor_values(boards)
+    liberty_count = (neighbors == EMPTY).sum(axis=2)
+    enemy_adjacent = (neighbors == ZIDAN_AI).sum(axis=2)
+    friendly_adjacent = (neighbors == RULES_AI).sum(axis=2)
+    score = (liberty_count * 3 + enemy_adjacent * 5 + friendly_adjacent * 4
+             + (4 - CENTER_DISTANCE) * 2 - ON_EDGE * 2)
+    # Ties go to the highest (row, col), as in the descending sort
+    key = np.where(boards == EMPTY, score * 32 + CELL_INDEX, UNSCORED)
+    return np.where(key.max(axis=1) > UNSCORED, key.argmax(axis=1), PASS)
+
+
+def zidan_moves(boards):
+    """ZidanAI.choose_move (exact mode, Mode A) for every board. Returns cell index or PASS."""
+    neighbors = neighbor_values(boards)
+    group_size, _ = group_stats(boards, label_groups(boards), neighbors)
+    mine = score_breakdown(boards, ZIDAN_AI, neighbors, group_size)
+    theirs = score_breakdown(boards, RULES_AI, neighbors, group_size)
+    features = np.stack([mine['territory'] - theirs['territory'],
+                         mine['liberties'] - theirs['liberties'],
+                         mine['connectivity'] - theirs['connectivity']], axis=1)
+
+    unique, inverse = np.unique(features, axis=0, return_inverse=True)
+    winning = np.array([zidan_is_winning(tuple(int(v) for v in row)) for row in unique])
+    winning = winning[inverse.ravel()]
+
+    liberty_count = (neighbors == EMPTY).sum(axis=2)
+    friendly_adjacent = (neighbors == ZIDAN_AI).sum(axis=2)
+    enemy_adjacent = (neighbors == RULES_AI).sum(axis=2)
+    aggressive = (10 - CENTER_DISTANCE * 2) + friendly_adjacent * 5 + liberty_count * 3
+    defensive = enemy_adjacent * 8 + liberty_count * 4 - ON_EDGE * 3
+    score = np.where(winning[:, None], aggressive, defensive)
+    # argmax keeps the first maximum, matching the strict '>' row-major scan
+    score = np.where(boards == EMPTY, score, UNSCORED)
+    return np.where(score.max(axis=1) > UNSCORED, score.argmax(axis=1), PASS)
+
+
+def play_moves(boards, players, moves):
+    """Vectorised GameState.try_move (suicide check, then captures).
+    Returns: (new boards, played) where played is False for passes and suicides
+    """
+    has_move = moves != PASS
+    rows = np.flatnonzero(has_move)
+    placed = boards.copy()
+    placed[rows, moves[rows]] = players[rows]
+
+    _, has_liberty = group_stats(placed, label_groups(placed))
+    opponent_stone = (placed != EMPTY) & (placed != players[:, None])
+    dead = opponent_stone & ~has_liberty
+    captures = dead.any(axis=1)
+
+    own_has_liberty = np.zeros(len(boards), dtype=bool)
+    own_has_liberty[rows] = has_liberty[rows, moves[rows]]
+    played = has_move & (captures | own_has_liberty)
+
+    result = np.where(dead, EMPTY, placed).astype(boards.dtype)
+    return np.where(played[:, None], result, boards), played
+
+
+class BatchSimulator:
+    """Plays B Mode A games (ZidanAI vs RuleBasedAI) in lockstep."""
+
+    def __init__(self, boards, current_players=None, turn_counts=None, passes=None,
+                 max_turns=30, record_moves=False):
+        self.boards = np.array(boards, dtype=np.int8).reshape(-1, CELLS)
+        count = len(self.boards)
+        self.current = (np.full(count, ZIDAN_AI, dtype=np.int8) if current_players is None
+                        else np.array(current_players, dtype=np.int8))
+        self.turns = (np.zeros(count, dtype=np.int16) if turn_counts is None
+                      else np.array(turn_counts, dtype=np.int16))
+        self.passes = (np.zeros(count, dtype=np.int8) if passes is None
+                       else np.array(passes, dtype=np.int8))
+        self.max_turns = max_turns
+        self.active = np.ones(count, dtype=bool)
+        self.winner = np.full(count, EMPTY, dtype=np.int8)
+        self.scores = np.zeros((count, 2), dtype=np.int16)
+        self.moves = [] if record_moves else None
+
+    @classmethod
+    def new_games(cls, count, **kwargs):
+        """Start count games from the empty board."""
+        return cls(np.zeros((count, CELLS), dtype=np.int8), **kwargs)
+
+    @classmethod
+    def from_game_states(cls, states, **kwargs):
+        """Start from existing Mode A GameState positions."""
+        return cls([[cell for row in state.board for cell in row] for state in states],
+                   current_players=[state.current_player for state in states],
+                   turn_counts=[state.turn_count for state in states],
+                   passes=[state.consecutive_passes for state in states],
+                   **kwargs)
+
+    def __len__(self):
+        return len(self.boards)
+
+    def _advance(self, idx, moves):
+        """Play moves for games idx, then pass the turn and check for game over."""
+        players = self.current[idx]
+        boards, played = play_moves(self.boards[idx], players, moves)
+        self.boards[idx] = boards
+        self.passes[idx] = np.where(played, 0, self.passes[idx] + 1)
+        self.turns[idx] += 1
+        self.current[idx] = np.where(players == ZIDAN_AI, RULES_AI, ZIDAN_AI)
+
+        if self.moves is not None:
+            record = np.full(len(self), -2, dtype=np.int8)
+            record[idx] = np.where(played, moves, PASS)
+            self.moves.append(record)
+
+        self._check_game_over(idx)
+
+    def _check_game_over(self, idx):
+        """Vectorised GameState.check_game_over for games idx."""
+        boards = self.boards[idx]
+        over = ((self.turns[idx] >= self.max_turns) | (self.passes[idx] >= 2)
+                | ~(boards == EMPTY).any(axis=1))
+        if not over.any():
+            return
+        done = idx[over]
+        boards = boards[over]
+        neighbors = neighbor_values(boards)
+        group_size, _ = group_stats(boards, label_groups(boards), neighbors)
+        score1 = score_breakdown(boards, ZIDAN_AI, neighbors, group_size)['total']
+        score2 = score_breakdown(boards, RULES_AI, neighbors, group_size)['total']
+        self.scores[done, 0] = score1
+        self.scores[done, 1] = score2
+        self.winner[done] = np.where(score1 > score2, ZIDAN_AI,
+                                     np.where(score2 > score1, RULES_AI, EMPTY))
+        self.active[done] = False
+
+    def play_random(self, plies, rng=None):
+        """Play plies random moves in every active game (for varied openings)."""
+        rng = np.random.default_rng() if rng is None else rng
+        for _ in range(plies):
+            idx = np.flatnonzero(self.active)
+            if idx.size == 0:
+                break
+            empty = self.boards[idx] == EMPTY
+            key = np.where(empty, rng.random(empty.shape), -1.0)
+            moves = np.where(empty.any(axis=1), key.argmax(axis=1), PASS)
+            self._advance(idx, moves)
+        return self
+
+    def step(self):
+        """Advance every active game by one ply. Returns False when all games are over."""
+        idx = np.flatnonzero(self.active)
+        if idx.size == 0:
+            return False
+        boards = self.boards[idx]
+        zidan = self.current[idx] == ZIDAN_AI
+        moves = np.full(idx.size, PASS, dtype=np.intp)
+        if zidan.any():
+            moves[zidan] = zidan_moves(boards[zidan])
+        if not zidan.all():
+            moves[~zidan] = rules_moves(boards[~zidan])
+        self._advance(idx, moves)
+        return True
+
+    def run(self):
+        """Play all games to the end."""
+        while self.step():
+            pass
+        return self
+
+    def results(self):
+        """Per-game results in the same shape as selfplay.py records."""
+        return [{
+            'game': i,
+            'winner': PLAYER_NAMES[int(self.winner[i])],
+            'scores': {'ZidanAI': int(self.scores[i, 0]), 'RuleBasedAI': int(self.scores[i, 1])},
+            'turns': int(self.turns[i])
+        } for i in range(len(self))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lockstep NumPy ZidanAI vs RuleBasedAI simulator')
+    parser.add_argument('--games', type=int, default=10000, help='number of games to play')
+    parser.add_argument('--random-plies', type=int, default=2, help='random opening plies per game')
+    parser.add_argument('--seed', type=int, default=None, help='seed for the random openings')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sim = BatchSimulator.new_games(args.games)
+    sim.play_random(args.random_plies, np.random.default_rng(args.seed))
+    sim.run()
+    elapsed = time.perf_counter() - start
+
+    print("=" * 50)
+    print(f"  {args.games} games in {elapsed:.2f}s ({args.games / elapsed:.0f} games/s)")
+    for player, name in PLAYER_NAMES.items():
+        count = int((sim.winner == player).sum())
+        print(f"  {name}: {count} ({count / args.games * 100:.1f}%)")
+    print("=" * 50)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+benchmark.py - Micro and macro benchmarks with regression thresholds
+
+Times the engine hot spots (GameState rules, RuleBasedAI, each stage of
+ZidanAI.choose_move), whole-game throughput and /play and /ai-step latency
+through the Flask test client. Each benchmark runs several rounds and
+reports the median time per operation.
+
+Results are compared against a baseline JSON file recorded on the same
+machine; the run fails (exit status 1) when a benchmark is slower than its
+baseline by more than the threshold.
+
+Usage:
+    python benchmark.py --save               # record the baseline
+    python benchmark.py                      # compare against it
+    python benchmark.py --filter zidan --threshold 0.5
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import warnings
+warnings.filterwarnings('ignore')
+
+# Background pondering would overlap the timed requests, and book lookups
+# would make the numbers depend on whether opening_book.bin exists
+os.environ['QGO_PONDER'] = '0'
+os.environ['QGO_OPENING_BOOK'] = ''
+
+from game import GameState, ZIDAN_AI, RULES_AI
+from zidan_ai import ZidanAI
+from rules_ai import RuleBasedAI
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+DEFAULT_THRESHOLD = 0.25
+
+
+def midgame_position(seed=3, plies=10):
+    """A reproducible Mode A position a few random moves into the game."""
+    rng = random.Random(seed)
+    game = GameState(mode='A')
+    for _ in range(plies):
+        row, col = rng.choice(game.get_legal_moves())
+        if not game.try_move(row, col, game.current_player)[0]:
+            game.pass_turn()
+        game.next_turn()
+    return game
+
+
+def timed(op, setup=None):
+    """Benchmark body: run op() n times (with an untimed setup() before each
+    call, whose result is passed to op) and return the seconds spent in op.
+    """
+    def run(n):
+        total = 0.0
+        for _ in range(n):
+            arg = setup() if setup else None
+            start = time.perf_counter()
+            op(arg) if setup else op()
+            total += time.perf_counter() - start
+        return total
+    return run
+
+
+def build_benchmarks():
+    """Return {name: run(n) -> seconds} for every benchmark."""
+    game = midgame_position()
+    player = game.current_player
+    legal = game.get_legal_moves()
+    move = legal[len(legal) // 2]
+
+    zidan = ZidanAI(game, use_book=False)
+    features = zidan.extract_features()
+    circuit = zidan.build_quantum_circuit(features)
+    counts = zidan.run_quantum_circuit(circuit)
+
+    def classify():
+        S, _ = zidan.calculate_entanglement_score(counts)
+        return zidan.classify_state(S)
+
+    benchmarks = {
+        'game.try_move': timed(lambda g: g.try_move(move[0], move[1], player), setup=game.copy_position),
+        'game.is_suicide': timed(lambda: [game.is_suicide(r, c, player) for r, c in legal]),
+        'game.check_captures': timed(lambda g: g.check_captures(player), setup=game.copy_position),
+        'game.get_score_breakdown': timed(lambda: (game.get_score_breakdown(ZIDAN_AI),
+                                                   game.get_score_breakdown(RULES_AI))),
+        'rules.choose_move': timed(lambda: RuleBasedAI(game, use_book=False).choose_move()),
+        'zidan.extract_features': timed(zidan.extract_features),
+        'zidan.build_circuit': timed(lambda: zidan.build_quantum_circuit(features)),
+        'zidan.run_circuit': timed(lambda: zidan.run_quantum_circuit(circuit)),
+        'zidan.classify': timed(classify),
+        'zidan.choose_aggressive': timed(zidan.choose_aggressive_move),
+        'zidan.choose_defensive': timed(zidan.choose_defensive_move),
+        'zidan.render_circuit': timed(lambda: zidan.render_circuit_png(circuit)),
+        'zidan.render_histogram': timed(lambda: zidan.render_histogram_png(counts)),
+        'zidan.choose_move': timed(lambda: ZidanAI(game, use_book=False).choose_move(render_images=False)),
+    }
+
+    def full_game():
+        from selfplay import play_game
+        return play_game(0)
+
+    benchmarks['macro.full_game'] = timed(full_game)
+
+    def flask_client(mode):
+        from app import app
+        client = app.test_client()
+        client.post('/start', json={'mode': mode})
+        return client
+
+    def ai_step_client():
+        # Fresh game once the current one is over
+        client = flask_client('A') if ai_step_client.client is None else ai_step_client.client
+        if client.get('/get_state?since=1000000').get_json()['game_over']:
+            client = flask_client('A')
+        ai_step_client.client = client
+        return client
+    ai_step_client.client = None
+
+    benchmarks['http.ai_step'] = timed(lambda c: c.post('/ai-step', json={'since': 1000000}),
+                                       setup=ai_step_client)
+    benchmarks['http.play_mode_b'] = timed(lambda c: c.post('/play', json={'row': 2, 'col': 2, 'since': 1}),
+                                           setup=lambda: flask_client('B'))
+    return benchmarks
+
+
+def measure(run, rounds, min_time):
+    """Median seconds per operation over rounds, each lasting at least min_time."""
+    run(1)  # warm-up (imports, caches)
+    n = 1
+    while True:
+        elapsed = run(n)
+        if elapsed >= min_time or n >= 1 << 20:
+            break
+        n = max(n * 2, int(n * min_time / max(elapsed, 1e-9)))
+    samples = [elapsed / n] + [run(n) / n for _ in range(rounds - 1)]
+    return statistics.median(samples)
+
+
+def format_time(seconds):
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} µs"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Quantum Go benchmarks with regression thresholds')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file')
+    parser.add_argument('--save', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed slowdown as a fraction of the baseline (default: 0.25)')
+    parser.add_argument('--rounds', type=int, default=5, help='rounds per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.1, help='minimum seconds per round')
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    regressions = []
+    print("=" * 72)
+    print(f"  {'benchmark':<28}{'time/op':>12}{'baseline':>12}{'change':>10}")
+    print("=" * 72)
+    for name, run in build_benchmarks().items():
+        if args.filter not in name:
+            continue
+        results[name] = measure(run, args.rounds, args.min_time)
+        line = f"  {name:<28}{format_time(results[name]):>12}"
+        if name in baseline:
+            change = results[name] / baseline[name] - 1
+            line += f"{format_time(baseline[name]):>12}{change:>+9.0%}"
+            if change > args.threshold:
+                regressions.append(name)
+                line += "  ❌"
+        print(line, flush=True)
+    print("=" * 72)
+
+    if args.save:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                saved = json.load(f)['results']
+        else:
+            saved = {}
+        saved.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'machine': platform.platform(),
+                'python': platform.python_version(),
+                'recorded': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'results': saved
+            }, f, indent=2, sort_keys=True)
+        print(f"  Baseline written to {args.baseline}")
+    elif not baseline:
+        print(f"  No baseline at {args.baseline}; run with --save to record one")
+
+    if regressions:
+        print(f"  {len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
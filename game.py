@@ -2,6 +2,9 @@
 game.py - Core game logic and board helpers for 5x5 Quantum Go
 """
 import copy
+import json
+import struct
+import zlib
 
 BOARD_SIZE = 5
 EMPTY = 0
@@ -9,6 +12,18 @@ ZIDAN_AI = 1
 RULES_AI = 2
 HUMAN = 3
 
+# Binary snapshot: version, mode, turn count, max turns, passes, game over, winner, current player
+SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct('<B1sBBBBBB')
+_WINNERS = [None, "ZidanAI", "RuleBasedAI", "Human", "Draw"]
+
+# The game log stores moves, captures and AI analysis only. Board snapshots
+# and scores are rebuilt on read by replaying from a board checkpoint kept
+# every LOG_CHECKPOINT_INTERVAL entries, so any entry is at most that many
+# replays away.
+LOG_CHECKPOINT_INTERVAL = 8
+_LOG_STONES = {"ZidanAI": ZIDAN_AI, "RuleBasedAI": RULES_AI, "Human": HUMAN}
+
 class GameState:
     """Manages the 5x5 Go board and game state."""
     
@@ -23,6 +38,7 @@ class GameState:
         self.max_turns = 30
         self.consecutive_passes = 0
         self.game_log = []
+        self._log_checkpoints = []  # position keys after entries 0, 8, 16, ...
         self.game_over = False
         self.winner = None
         
@@ -352,3 +368,165 @@ class GameState:
     def get_board_snapshot(self):
         """Return copy of current board state."""
         return copy.deepcopy(self.board)
+
+    def copy_position(self):
+        """Return a new GameState with the same position, without the game log."""
+        other = GameState(mode=self.mode)
+        other.board = [row[:] for row in self.board]
+        other.turn_count = self.turn_count
+        other.max_turns = self.max_turns
+        other.consecutive_passes = self.consecutive_passes
+        other.game_over = self.game_over
+        other.winner = self.winner
+        other.current_player = self.current_player
+        return other
+    
+    def to_snapshot(self):
+        """Serialise the game to compact bytes: fixed header, one byte per cell,
+        then the zlib-compressed JSON game log.
+        """
+        header = _SNAPSHOT_HEADER.pack(
+            SNAPSHOT_VERSION, self.mode.encode('ascii'), self.turn_count, self.max_turns,
+            self.consecutive_passes, int(self.game_over), _WINNERS.index(self.winner),
+            self.current_player)
+        cells = bytes(cell for row in self.board for cell in row)
+        log = zlib.compress(json.dumps(self.game_log, separators=(',', ':')).encode('utf-8'))
+        return header + cells + log
+    
+    @classmethod
+    def from_snapshot(cls, data):
+        """Rebuild a GameState from to_snapshot() bytes."""
+        (version, mode, turn_count, max_turns, passes, game_over,
+         winner, current_player) = _SNAPSHOT_HEADER.unpack_from(data, 0)
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {version}")
+        game = cls(mode=mode.decode('ascii'))
+        offset = _SNAPSHOT_HEADER.size
+        cells = data[offset:offset + BOARD_SIZE * BOARD_SIZE]
+        game.board = [list(cells[r * BOARD_SIZE:(r + 1) * BOARD_SIZE]) for r in range(BOARD_SIZE)]
+        game.turn_count = turn_count
+        game.max_turns = max_turns
+        game.consecutive_passes = passes
+        game.game_over = bool(game_over)
+        game.winner = _WINNERS[winner]
+        game.current_player = current_player
+        game.game_log = json.loads(zlib.decompress(data[offset + BOARD_SIZE * BOARD_SIZE:]))
+        return game
+    
+    @staticmethod
+    def _replay_entry(board, entry):
+        """Apply a log entry's stone and captures to a board in place."""
+        stone = _LOG_STONES.get(entry.get('player'))
+        move = entry.get('move', '')
+        if stone is None or not move.startswith('('):
+            return
+        row, col = (int(value) for value in move.strip('()').split(','))
+        board[row][col] = stone
+        for r, c in entry.get('captures', []):
+            board[r][c] = EMPTY
+    
+    def board_at(self, index):
+        """Board after game_log[index], replayed from the nearest checkpoint.
+        The log is append-only, so checkpoints are computed once and kept.
+        """
+        if not 0 <= index < len(self.game_log):
+            raise IndexError(f"No log entry {index}")
+        k = index // LOG_CHECKPOINT_INTERVAL
+        while len(self._log_checkpoints) <= k:
+            n = len(self._log_checkpoints)
+            if n == 0:
+                board = [[EMPTY] * BOARD_SIZE for _ in range(BOARD_SIZE)]
+                first = 0
+            else:
+                board = _board_from_key(self._log_checkpoints[-1])
+                first = (n - 1) * LOG_CHECKPOINT_INTERVAL + 1
+            for entry in self.game_log[first:n * LOG_CHECKPOINT_INTERVAL + 1]:
+                self._replay_entry(board, entry)
+            self._log_checkpoints.append(_position_key(board))
+        board = _board_from_key(self._log_checkpoints[k])
+        for entry in self.game_log[k * LOG_CHECKPOINT_INTERVAL + 1:index + 1]:
+            self._replay_entry(board, entry)
+        return board
+    
+    def log_view(self, start=0, stop=None):
+        """Game log entries start..stop-1 (default: to the end), with the board
+        snapshot (moves, passes and the start entry) and scores (stone
+        placements) filled in.
+        """
+        view = []
+        stop = len(self.game_log) if stop is None else min(stop, len(self.game_log))
+        if start >= stop:
+            return view
+        position = GameState(mode=self.mode)
+        position.board = self.board_at(start)
+        for index in range(start, stop):
+            entry = self.game_log[index]
+            if index > start:
+                self._replay_entry(position.board, entry)
+            move = entry.get('move')
+            if move is None and entry.get('player') != 'System':
+                view.append(entry)
+                continue
+            entry = dict(entry, board=position.print_board())
+            if move is not None and move != 'Pass':
+                entry['scores'] = {position.get_player_name(player): position.get_score_breakdown(player)
+                                   for player in self.players}
+            view.append(entry)
+        return view
+    
+    @classmethod
+    def from_position(cls, board, current_player, turn_count=0, consecutive_passes=0, mode='A'):
+        """Build a game (without a log) from an explicit position.
+        board: 5x5 list of cell values or a 25-character string of digits (row-major)
+        current_player: player value or name of the side to move
+        Raises ValueError for malformed or inconsistent input.
+        """
+        if mode not in ('A', 'B'):
+            raise ValueError("mode must be 'A' or 'B'")
+        game = cls(mode=mode)
+        
+        if isinstance(board, str):
+            if len(board) != BOARD_SIZE * BOARD_SIZE or not board.isdigit():
+                raise ValueError("board string must be 25 digits")
+            cells = [int(ch) for ch in board]
+        elif isinstance(board, list) and len(board) == BOARD_SIZE and all(
+                isinstance(row, list) and len(row) == BOARD_SIZE for row in board):
+            cells = [cell for row in board for cell in row]
+        else:
+            raise ValueError("board must be a 5x5 list or a 25-character string")
+        allowed = {EMPTY, *game.players}
+        if any(not isinstance(cell, int) or cell not in allowed for cell in cells):
+            raise ValueError(f"board cells must be one of {sorted(allowed)} in mode {mode}")
+        game.board = [cells[r * BOARD_SIZE:(r + 1) * BOARD_SIZE] for r in range(BOARD_SIZE)]
+        
+        names = {game.get_player_name(player): player for player in game.players}
+        player = names.get(current_player, current_player)
+        if player not in game.players:
+            raise ValueError(f"side to move must be one of {sorted(names)}")
+        game.current_player = player
+        
+        if not isinstance(turn_count, int) or not 0 <= turn_count <= game.max_turns:
+            raise ValueError(f"turn_count must be between 0 and {game.max_turns}")
+        if not isinstance(consecutive_passes, int) or not 0 <= consecutive_passes <= 2:
+            raise ValueError("passes must be between 0 and 2")
+        game.turn_count = turn_count
+        game.consecutive_passes = consecutive_passes
+        return game
+    
+    def position_key(self):
+        """Pack the board into an integer (2 bits per cell, row-major)."""
+        return _position_key(self.board)
+
+
+def _position_key(board):
+    """Pack a board into an integer (2 bits per cell, row-major)."""
+    key = 0
+    for row in board:
+        for cell in row:
+            key = (key << 2) | cell
+    return key
+
+def _board_from_key(key):
+    """Inverse of _position_key."""
+    cells = [(key >> (2 * (BOARD_SIZE * BOARD_SIZE - 1 - i))) & 3 for i in range(BOARD_SIZE * BOARD_SIZE)]
+    return [cells[r * BOARD_SIZE:(r + 1) * BOARD_SIZE] for r in range(BOARD_SIZE)]
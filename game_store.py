@@ -0,0 +1,426 @@
+"""
+game_store.py - Pluggable storage for active games
+
+Three implementations share the GameStore interface:
+  - MemoryGameStore: process-local dict with LRU and idle-TTL eviction
+  - HibernatingGameStore: memory store that moves idle games to snapshot
+    files on disk and rehydrates them transparently on the next access
+  - SQLiteGameStore: games stored as compact binary snapshots in a SQLite
+    database in WAL mode, so several worker processes can share them
+
+Routes load a game with get(), mutate it, and write it back with put().
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from game import GameState
+
+
+class GameStore:
+    """Interface for game storage."""
+
+    def new_id(self):
+        """Return a fresh, unguessable game id."""
+        return uuid.uuid4().hex
+
+    def get(self, game_id):
+        """Return the GameState for game_id, or None if unknown or expired."""
+        raise NotImplementedError
+
+    def put(self, game_id, game):
+        """Store (or update) a game."""
+        raise NotImplementedError
+
+    def delete(self, game_id):
+        """Remove a game if present."""
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __contains__(self, game_id):
+        return self.get(game_id) is not None
+
+    def stats(self):
+        """Return counters describing the store."""
+        return {'games': len(self)}
+
+    def resident_games(self):
+        """(game_id, game) pairs currently held in process memory."""
+        return []
+
+
+class MemoryGameStore(GameStore):
+    """In-memory store bounded by game count (LRU) and idle time (TTL)."""
+
+    def __init__(self, max_games=10000, ttl=3600, clock=time.monotonic):
+        """
+        max_games: least recently used games are evicted beyond this count
+        ttl: seconds a game may sit idle before it is evicted (None = forever)
+        """
+        self.max_games = max_games
+        self.ttl = ttl
+        self.clock = clock
+        self._games = OrderedDict()  # game_id -> (game, last access)
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, game_id):
+        with self._lock:
+            entry = self._games.get(game_id)
+            if entry is None:
+                return None
+            now = self.clock()
+            if self.ttl is not None and now - entry[1] > self.ttl:
+                del self._games[game_id]
+                self.evictions += 1
+                return None
+            self._games[game_id] = (entry[0], now)
+            self._games.move_to_end(game_id)
+            self._evict(now)
+        self._flush()
+        return entry[0]
+
+    def put(self, game_id, game):
+        with self._lock:
+            now = self.clock()
+            self._games[game_id] = (game, now)
+            self._games.move_to_end(game_id)
+            self._evict(now)
+        self._flush()
+
+    def delete(self, game_id):
+        with self._lock:
+            self._games.pop(game_id, None)
+
+    def _is_idle(self, now, last_access):
+        """Whether a game untouched since last_access should leave memory."""
+        return self.ttl is not None and now - last_access > self.ttl
+
+    def _evict(self, now):
+        """Drop idle games and the least recently used ones beyond max_games.
+        Oldest accesses are at the front, so both checks stop at the first survivor.
+        """
+        while self._games:
+            game_id, (game, last_access) = next(iter(self._games.items()))
+            if not self._is_idle(now, last_access) and len(self._games) <= self.max_games:
+                break
+            del self._games[game_id]
+            self._release(game_id, game)
+
+    def _release(self, game_id, game):
+        """Called for each game evicted from memory."""
+        self.evictions += 1
+
+    def _flush(self):
+        """Called after get() and put() release the lock, for slow eviction work."""
+
+    def __len__(self):
+        return len(self._games)
+
+    def resident_games(self):
+        with self._lock:
+            return [(game_id, game) for game_id, (game, _) in self._games.items()]
+
+    def stats(self):
+        return {'games': len(self._games), 'evictions': self.evictions}
+
+
+class HibernatingGameStore(MemoryGameStore):
+    """Memory store that hibernates idle games to disk instead of dropping them.
+
+    Games idle for hibernate_after seconds (or pushed out by max_games) are
+    written to <directory>/<game_id>.qgo and removed from memory. get()
+    rehydrates them on demand. Snapshot files idle for longer than ttl are
+    deleted by a periodic sweep.
+
+    Disk I/O (hibernating, rehydrating, sweeping) happens outside the store
+    lock: a game is claimed under the lock, read or written without it, and
+    published under it again. A game leaves memory only once its snapshot is
+    on disk and it has not been used meanwhile; a failed write (disk full,
+    permissions) keeps it resident.
+    """
+
+    SUFFIX = '.qgo'
+
+    def __init__(self, directory, hibernate_after=300, max_games=10000, ttl=3600,
+                 clock=time.monotonic, sweep_interval=60):
+        super().__init__(max_games=max_games, ttl=ttl, clock=clock)
+        self.directory = directory
+        self.hibernate_after = hibernate_after
+        self.sweep_interval = sweep_interval
+        self._last_sweep = None
+        self.hibernations = 0
+        self.rehydrations = 0
+        self.hibernate_errors = 0
+        self._to_hibernate = {}  # game_id -> store entry chosen by _evict
+        self._writing = set()
+        self._loading = {}  # game_id -> Event set once its rehydration is published
+        self._deleted_while_loading = set()
+        os.makedirs(directory, exist_ok=True)
+        # Ids with a snapshot on disk, kept up to date so stats() need not scan
+        with os.scandir(directory) as entries:
+            self._hibernated = {entry.name[:-len(self.SUFFIX)] for entry in entries
+                                if entry.name.endswith(self.SUFFIX)}
+
+    def _path(self, game_id):
+        # Ids come from the session; keep them from escaping the directory
+        return os.path.join(self.directory, os.path.basename(str(game_id)) + self.SUFFIX)
+
+    def _is_idle(self, now, last_access):
+        return now - last_access > self.hibernate_after
+
+    def _evict(self, now):
+        """Choose idle games and the least recently used ones beyond max_games
+        for _flush to hibernate; they stay in memory until then.
+        """
+        excess = len(self._games) - self.max_games
+        for game_id, entry in self._games.items():
+            if not self._is_idle(now, entry[1]) and excess <= 0:
+                break
+            excess -= 1
+            if game_id not in self._writing:
+                self._to_hibernate[game_id] = entry
+
+    def _flush(self):
+        with self._lock:
+            chosen, self._to_hibernate = self._to_hibernate, {}
+            self._writing.update(chosen)
+        for game_id, entry in chosen.items():
+            path = self._path(game_id)
+            try:
+                self._write_snapshot(path, entry[0])
+                written = True
+            except OSError as e:
+                written = False
+                print(f"[store] could not hibernate game {str(game_id)[:8]}: {e}", file=sys.stderr, flush=True)
+            with self._lock:
+                # Entries are replaced on every access, so identity means untouched
+                unchanged = self._games.get(game_id) is entry
+                stale = written and not unchanged
+                if not stale:
+                    self._writing.discard(game_id)
+                if written and unchanged:
+                    del self._games[game_id]
+                    self._hibernated.add(game_id)
+                    self.hibernations += 1
+                elif not written:
+                    self.hibernate_errors += 1
+                    if unchanged:
+                        # Stay resident; retried once idle for another hibernate_after
+                        self._games[game_id] = (entry[0], self.clock())
+                        self._games.move_to_end(game_id)
+            if stale:
+                # Used or deleted meanwhile; the id stays claimed until the file is gone
+                self._remove_file(path)
+                with self._lock:
+                    self._writing.discard(game_id)
+
+    def _write_snapshot(self, path, game):
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(game.to_snapshot())
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove_file(tmp_path)
+            raise
+
+    def _read_snapshot(self, path):
+        """Load and remove a snapshot file; None if missing or expired."""
+        try:
+            if self.ttl is not None and time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                game = GameState.from_snapshot(f.read())
+            os.remove(path)
+        except FileNotFoundError:
+            return None
+        return game
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def get(self, game_id):
+        while True:
+            game = super().get(game_id)
+            if game is not None:
+                return game
+            with self._lock:
+                entry = self._games.get(game_id)
+                if entry is not None:
+                    # Rehydrated by another request in the meantime
+                    return entry[0]
+                if game_id in self._writing:
+                    return None  # deleted while its snapshot was being written
+                loading = self._loading.get(game_id)
+                if loading is None:
+                    loading = self._loading[game_id] = threading.Event()
+                    break
+            loading.wait()  # another request is reading it; then look again
+
+        game = None
+        try:
+            game = self._read_snapshot(self._path(game_id))
+        finally:
+            with self._lock:
+                del self._loading[game_id]
+                loading.set()
+                self._hibernated.discard(game_id)
+                if game_id in self._deleted_while_loading:
+                    self._deleted_while_loading.discard(game_id)
+                    game = None
+                elif game_id in self._games:
+                    game = self._games[game_id][0]  # put() meanwhile: that game is newer
+                elif game is not None:
+                    self.rehydrations += 1
+                    now = self.clock()
+                    self._games[game_id] = (game, now)
+                    self._evict(now)
+        self._flush()
+        self._sweep()
+        return game
+
+    def put(self, game_id, game):
+        super().put(game_id, game)
+        self._sweep()
+
+    def delete(self, game_id):
+        super().delete(game_id)
+        with self._lock:
+            self._hibernated.discard(game_id)
+            if game_id in self._loading:
+                self._deleted_while_loading.add(game_id)
+        self._remove_file(self._path(game_id))
+
+    def _sweep(self):
+        """Delete hibernated games that have outlived the TTL (at most once per sweep_interval)."""
+        if self.ttl is None:
+            return
+        with self._lock:
+            now = self.clock()
+            if self._last_sweep is not None and now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        cutoff = time.time() - self.ttl
+        expired = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(self.SUFFIX) and entry.stat().st_mtime < cutoff:
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        continue
+                    expired.append(entry.name[:-len(self.SUFFIX)])
+        if expired:
+            with self._lock:
+                self._hibernated.difference_update(expired)
+
+    def hibernated_count(self):
+        """Number of games currently on disk."""
+        return len(self._hibernated)
+
+    def __contains__(self, game_id):
+        with self._lock:
+            return game_id in self._games or game_id in self._hibernated
+
+    def stats(self):
+        return {
+            'games': len(self._games),
+            'hibernated': self.hibernated_count(),
+            'hibernations': self.hibernations,
+            'rehydrations': self.rehydrations,
+            'hibernate_errors': self.hibernate_errors
+        }
+
+
+class SQLiteGameStore(GameStore):
+    """SQLite-backed store shared by all worker processes on a host."""
+
+    def __init__(self, path, ttl=3600, clock=time.time, sweep_interval=60):
+        """
+        path: database file (created if missing)
+        ttl: seconds a game may sit idle before it is deleted (None = forever)
+        sweep_interval: minimum seconds between expiry sweeps
+        """
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._last_sweep = 0
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS games ('
+                     'id TEXT PRIMARY KEY, updated REAL NOT NULL, snapshot BLOB NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS games_updated ON games (updated)')
+        conn.commit()
+
+    def _connect(self):
+        """One connection per thread (sqlite3 connections are not shareable)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, game_id):
+        conn = self._connect()
+        row = conn.execute('SELECT updated, snapshot FROM games WHERE id = ?', (game_id,)).fetchone()
+        if row is None:
+            return None
+        if self.ttl is not None and self.clock() - row[0] > self.ttl:
+            self.delete(game_id)
+            return None
+        return GameState.from_snapshot(row[1])
+
+    def put(self, game_id, game):
+        conn = self._connect()
+        now = self.clock()
+        conn.execute('INSERT OR REPLACE INTO games (id, updated, snapshot) VALUES (?, ?, ?)',
+                     (game_id, now, game.to_snapshot()))
+        conn.commit()
+        if self.ttl is not None and now - self._last_sweep > self.sweep_interval:
+            self._last_sweep = now
+            conn.execute('DELETE FROM games WHERE updated < ?', (now - self.ttl,))
+            conn.commit()
+
+    def delete(self, game_id):
+        conn = self._connect()
+        conn.execute('DELETE FROM games WHERE id = ?', (game_id,))
+        conn.commit()
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM games').fetchone()[0]
+
+
+def create_store(url='memory', max_games=10000, ttl=3600, hibernate_after=None, hibernate_dir=None):
+    """Build a store from a URL: 'memory' or 'sqlite:///path/to/games.db'.
+    With hibernate_after (seconds), the memory store hibernates idle games to hibernate_dir.
+    """
+    if url == 'memory':
+        if hibernate_after is not None:
+            if hibernate_dir is None:
+                hibernate_dir = os.path.join(tempfile.gettempdir(), 'qgo-hibernate')
+            return HibernatingGameStore(hibernate_dir, hibernate_after=hibernate_after,
+                                        max_games=max_games, ttl=ttl)
+        return MemoryGameStore(max_games=max_games, ttl=ttl)
+    if url.startswith('sqlite:///'):
+        path = url[len('sqlite:///'):]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return SQLiteGameStore(path, ttl=ttl)
+    raise ValueError(f"Unknown game store: {url}")
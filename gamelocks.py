@@ -0,0 +1,120 @@
+"""
+gamelocks.py - Per-game serialisation of moves with duplicate coalescing
+
+Moves on one game run one at a time under that game's lock. A request
+identical to a move still in progress on the same game (a double-click or
+client retry: same route and body) does not queue up a second move; it
+waits for the one in progress and shares its outcome.
+
+Locks live in process memory, so with several server processes this
+serialises moves only within each process (route a game's requests to one
+process with sticky sessions).
+"""
+import threading
+from contextlib import contextmanager
+
+
+class _Flight:
+    """One in-progress call whose outcome identical calls share."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _GameEntry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+        self.flights = {}  # key -> _Flight
+
+
+class GameLocks:
+    """Lock per game id, created on first use and dropped when unused."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._games = {}
+        self.coalesced = 0
+        self.contended = 0
+
+    def _enter(self, game_id):
+        entry = self._games.get(game_id)
+        if entry is None:
+            entry = self._games[game_id] = _GameEntry()
+        entry.users += 1
+        return entry
+
+    def _leave(self, game_id, entry):
+        entry.users -= 1
+        if entry.users == 0:
+            del self._games[game_id]
+
+    def _acquire(self, entry):
+        if not entry.lock.acquire(blocking=False):
+            with self._lock:
+                self.contended += 1
+            entry.lock.acquire()
+
+    @contextmanager
+    def lock(self, game_id):
+        """Hold game_id's lock for the duration of a with-block."""
+        with self._lock:
+            entry = self._enter(game_id)
+        try:
+            self._acquire(entry)
+            try:
+                yield
+            finally:
+                entry.lock.release()
+        finally:
+            with self._lock:
+                self._leave(game_id, entry)
+
+    def run(self, game_id, key, fn):
+        """Call fn() under game_id's lock and return (result, shared).
+        If a call with the same key is already in progress for this game,
+        wait for it instead and return its result with shared=True (its
+        exception, if it raised, is raised here too).
+        """
+        with self._lock:
+            entry = self._enter(game_id)
+            flight = entry.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = entry.flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        try:
+            if not leader:
+                flight.done.wait()
+                if flight.error is not None:
+                    raise flight.error
+                return flight.result, True
+
+            try:
+                self._acquire(entry)
+                try:
+                    flight.result = fn()
+                finally:
+                    entry.lock.release()
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                with self._lock:
+                    del entry.flights[key]
+                flight.done.set()
+            return flight.result, False
+        finally:
+            with self._lock:
+                self._leave(game_id, entry)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'games_locked': len(self._games),
+                'coalesced': self.coalesced,
+                'contended': self.contended
+            }
@@ -0,0 +1,174 @@
+"""
+jobs.py - Bounded worker queue for asynchronous AI moves
+
+Submitting a job returns immediately with a job id; a fixed pool of worker
+threads runs jobs in order and clients poll (or long-poll) for the result.
+The queue is bounded so overload is refused at submission instead of piling
+up, and each key (a game id) may have only one pending job at a time so two
+moves for the same game never run concurrently.
+
+Jobs live in process memory: with several server processes, poll the
+process that accepted the job (sticky sessions).
+"""
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class QueueFull(Exception):
+    """The job queue is at capacity."""
+
+
+class JobPending(Exception):
+    """The key already has a queued or running job."""
+
+    def __init__(self, job):
+        super().__init__(f"Job {job.id} is still {job.status}")
+        self.job = job
+
+
+class Job:
+    """One unit of work and its outcome."""
+
+    def __init__(self, fn, key, submitted):
+        self.id = uuid.uuid4().hex
+        self.fn = fn
+        self.key = key
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.submitted = submitted
+        self.started = None
+        self.finished = None
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes or timeout elapses; returns whether it finished."""
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        data = {'job_id': self.id, 'status': self.status}
+        if self.status == DONE:
+            data['result'] = self.result
+        elif self.status == FAILED:
+            data['error'] = self.error
+        return data
+
+
+class JobQueue:
+    """Fixed worker pool fed by a bounded FIFO queue."""
+
+    def __init__(self, workers=4, max_queue=64, retention=300, clock=time.monotonic):
+        """
+        workers: threads computing jobs
+        max_queue: queued (not yet running) jobs accepted before QueueFull
+        retention: seconds finished jobs stay available for polling
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retention = retention
+        self.clock = clock
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = {}
+        self._pending = {}  # key -> unfinished job
+        self._lock = threading.Lock()
+        self._threads = []
+        self._running = 0
+        self._waits = deque(maxlen=1000)  # queue wait of recent jobs (seconds)
+        self._runs = deque(maxlen=1000)   # run time of recent jobs (seconds)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f'job-worker-{len(self._threads)}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn, key=None):
+        """Queue fn() and return its Job.
+        Raises QueueFull when the queue is at capacity and JobPending when
+        key already has an unfinished job.
+        """
+        with self._lock:
+            self._purge()
+            if key is not None and key in self._pending:
+                raise JobPending(self._pending[key])
+            job = Job(fn, key, self.clock())
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self.rejected += 1
+                raise QueueFull(f"{self.max_queue} jobs already queued")
+            self._jobs[job.id] = job
+            if key is not None:
+                self._pending[key] = job
+            self._start_workers()
+        return job
+
+    def get(self, job_id):
+        """Return the Job with this id, or None if unknown or expired."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                job.status = RUNNING
+                job.started = self.clock()
+                self._running += 1
+                self._waits.append(job.started - job.submitted)
+            try:
+                result, status = job.fn(), DONE
+            except Exception as e:
+                result, status = None, FAILED
+                job.error = str(e)
+            with self._lock:
+                job.result = result
+                job.status = status
+                job.finished = self.clock()
+                job.fn = None
+                self._running -= 1
+                self._runs.append(job.finished - job.started)
+                if status == DONE:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                if self._pending.get(job.key) is job:
+                    del self._pending[job.key]
+            job._done.set()
+
+    def _purge(self):
+        """Forget finished jobs older than the retention period."""
+        cutoff = self.clock() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished is not None and job.finished < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self):
+        """Queue depth, worker usage and recent wait/run times (milliseconds)."""
+        with self._lock:
+            waits = list(self._waits)
+            runs = list(self._runs)
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue': self.max_queue,
+                'running': self._running,
+                'workers': self.workers,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(1000 * sum(waits) / len(waits), 1) if waits else 0.0,
+                'max_wait_ms': round(1000 * max(waits), 1) if waits else 0.0,
+                'avg_run_ms': round(1000 * sum(runs) / len(runs), 1) if runs else 0.0
+            }
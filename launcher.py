@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 """
 Quick launcher for Quantum Go application
+
+Starts Flask's debug server for local play; see asgi.py for production serving.
 """
 import subprocess
 import sys
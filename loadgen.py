@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+loadgen.py - Load generator for the Quantum Go web API
+
+Runs many simulated players concurrently (one thread and cookie session
+each) against a running server for a fixed duration. A player starts a
+game, Mode A or Mode B by the configured mix, and plays it to the end:
+Mode A players call /ai-step, Mode B players send a legal /play move
+(ZidanAI replies in the same request). After every move a player polls
+/get_state with its ETag, like the browser. Finished games are replaced by
+new ones until time runs out.
+
+Reports requests per second and p50/p95/p99 latency per route. 503
+responses (server shedding load) are counted separately from errors.
+
+Usage:
+    python app.py &                                  # or any production server
+    python loadgen.py --clients 16 --duration 60
+    python loadgen.py --serve --clients 8 --mode-a 1.0 --json results.json
+
+--serve starts the app in this process, which is convenient but shares the
+interpreter (and its GIL) with the players; measure a separate server for
+numbers worth comparing.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from http.cookiejar import CookieJar
+
+from game import GameState, HUMAN
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, int(round(fraction * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+class RouteStats:
+    """Latencies and outcomes of one client's requests, by route."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.shed = defaultdict(int)
+
+    def merge(self, other):
+        for route, samples in other.latencies.items():
+            self.latencies[route].extend(samples)
+        for route, count in other.errors.items():
+            self.errors[route] += count
+        for route, count in other.shed.items():
+            self.shed[route] += count
+
+    def summary(self, elapsed):
+        routes = {}
+        for route in sorted(set(self.latencies) | set(self.errors) | set(self.shed)):
+            samples = sorted(self.latencies[route])
+            routes[route] = {
+                'requests': len(samples),
+                'per_second': round(len(samples) / elapsed, 2),
+                'p50_ms': round(1000 * percentile(samples, 0.50), 1),
+                'p95_ms': round(1000 * percentile(samples, 0.95), 1),
+                'p99_ms': round(1000 * percentile(samples, 0.99), 1),
+                'max_ms': round(1000 * samples[-1], 1) if samples else 0.0,
+                'errors': self.errors[route],
+                'shed': self.shed[route]
+            }
+        return routes
+
+
+class Player:
+    """One simulated browser session playing games back to back."""
+
+    def __init__(self, base_url, mode_a_share, polls, think_time, deadline, rng):
+        self.base_url = base_url.rstrip('/')
+        self.mode_a_share = mode_a_share
+        self.polls = polls
+        self.think_time = think_time
+        self.deadline = deadline
+        self.rng = rng
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+        self.stats = RouteStats()
+        self.games = 0
+        self.etag = None
+        self.log_length = 0
+
+    def request(self, method, route, body=None, query=''):
+        """Send a request; returns (status, JSON body or None). Latency of
+        answered requests (any status) is recorded; failures count as errors.
+        """
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(self.base_url + route + query, data=data, method=method)
+        if data is not None:
+            req.add_header('Content-Type', 'application/json')
+        if route == '/get_state' and self.etag:
+            req.add_header('If-None-Match', self.etag)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=120) as response:
+                status, payload, headers = response.status, response.read(), response.headers
+        except urllib.error.HTTPError as e:
+            status, payload, headers = e.code, e.read(), e.headers
+        except (urllib.error.URLError, OSError):
+            self.stats.errors[route] += 1
+            return None, None
+        self.stats.latencies[route].append(time.perf_counter() - start)
+        if status == 503:
+            self.stats.shed[route] += 1
+        elif status >= 500:
+            self.stats.errors[route] += 1
+        if route == '/get_state' and headers.get('ETag'):
+            self.etag = headers['ETag']
+        try:
+            return status, json.loads(payload) if payload else None
+        except ValueError:
+            return status, None
+
+    def poll(self):
+        for _ in range(self.polls):
+            self.request('GET', '/get_state', query=f'?since={self.log_length}')
+
+    def pause(self):
+        if self.think_time:
+            time.sleep(self.rng.uniform(0, 2 * self.think_time))
+
+    def human_move(self, state):
+        """A random legal, non-suicidal move for the human, or None."""
+        game = GameState.from_position(state['board'], HUMAN, state.get('turn_count', 0), 0, 'B')
+        moves = [move for move in game.get_legal_moves() if not game.is_suicide(move[0], move[1], HUMAN)]
+        return self.rng.choice(moves) if moves else None
+
+    def play_game(self):
+        mode = 'A' if self.rng.random() < self.mode_a_share else 'B'
+        status, state = self.request('POST', '/start', {'mode': mode})
+        if status != 200 or state is None:
+            time.sleep(0.1)
+            return
+        self.games += 1
+        self.etag = None
+        self.log_length = state.get('log_length', 1)
+        while time.monotonic() < self.deadline and not state.get('game_over'):
+            self.pause()
+            if mode == 'A':
+                status, result = self.request('POST', '/ai-step', {'since': self.log_length})
+            else:
+                move = self.human_move(state)
+                if move is None:
+                    return
+                status, result = self.request('POST', '/play', {'row': move[0], 'col': move[1],
+                                                                'since': self.log_length})
+            if status != 200 or result is None:
+                return  # start over with a fresh game
+            state = {**state, **result}
+            self.log_length = result.get('log_length', self.log_length)
+            self.poll()
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            try:
+                self.play_game()
+            except Exception:
+                self.stats.errors['client'] += 1  # unexpected response shape; start a new game
+
+
+def serve_in_process():
+    """Start the app on a free local port in a background thread; returns its URL."""
+    import logging
+    import os
+    os.environ.setdefault('QGO_PONDER', '0')
+    from werkzeug.serving import make_server
+    from app import app
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # no access log lines
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def run_load(base_url, clients=8, duration=30, mode_a_share=0.5, polls=1, think_time=0.0, seed=0):
+    """Run the players and return the report dict."""
+    deadline = time.monotonic() + duration
+    players = [Player(base_url, mode_a_share, polls, think_time, deadline, random.Random(seed + i))
+               for i in range(clients)]
+    threads = [threading.Thread(target=player.run, name=f'player-{i}', daemon=True)
+               for i, player in enumerate(players)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    stats = RouteStats()
+    for player in players:
+        stats.merge(player.stats)
+    routes = stats.summary(elapsed)
+    total = sum(route['requests'] for route in routes.values())
+    return {
+        'url': base_url,
+        'clients': clients,
+        'duration_s': round(elapsed, 2),
+        'games_started': sum(player.games for player in players),
+        'requests': total,
+        'requests_per_second': round(total / elapsed, 2),
+        'routes': routes
+    }
+
+
+def print_report(report):
+    print("=" * 86)
+    print(f"  {report['clients']} clients for {report['duration_s']} s against {report['url']}: "
+          f"{report['requests']} requests ({report['requests_per_second']}/s), "
+          f"{report['games_started']} games")
+    print("=" * 86)
+    print(f"  {'route':<12}{'requests':>9}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'max ms':>10}{'errors':>8}{'503s':>7}")
+    for route, row in report['routes'].items():
+        print(f"  {route:<12}{row['requests']:>9}{row['per_second']:>9}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+              f"{row['p99_ms']:>10}{row['max_ms']:>10}{row['errors']:>8}{row['shed']:>7}")
+    print("=" * 86)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load generator for the Quantum Go API')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='server to load')
+    parser.add_argument('--serve', action='store_true', help='start the app in this process instead')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent simulated players')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run')
+    parser.add_argument('--mode-a', type=float, default=0.5, help='share of games played in Mode A (0-1)')
+    parser.add_argument('--polls', type=int, default=1, help='/get_state polls after each move')
+    parser.add_argument('--think-time', type=float, default=0.0, help='mean seconds between moves')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    base_url = serve_in_process() if args.serve else args.url
+    report = run_load(base_url, args.clients, args.duration, args.mode_a, args.polls, args.think_time, args.seed)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if report['requests'] == 0:
+        print(f"  No requests completed; is the server running at {base_url}?")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
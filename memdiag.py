@@ -0,0 +1,203 @@
+"""
+memdiag.py - Memory accounting and leak diagnostics
+
+Estimates how much memory each resident game holds, split into its board,
+log text, image fields and log checkpoints, and reports allocation growth
+between successive tracemalloc snapshots. Sizes come from a recursive
+sys.getsizeof walk: objects shared between games (interned strings, small
+ints) are counted once per game, so totals are approximate upper bounds.
+
+tracemalloc slows allocation noticeably; it only runs once started (by
+QGO_TRACEMALLOC or the /debug/memory endpoint).
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+# Log entry fields holding images (base64 PNGs in old logs, URLs now)
+IMAGE_FIELD = 'image'
+
+PARTS = ('board', 'log_text', 'images', 'checkpoints', 'other')
+
+
+def deep_sizeof(obj, seen=None):
+    """Bytes held by obj and everything it references (containers and __dict__)."""
+    if seen is None:
+        seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+            stack.append(obj.__dict__)
+    return total
+
+def game_footprint(game):
+    """Approximate bytes held by one game, by part, plus the total."""
+    seen = set()
+    footprint = dict.fromkeys(PARTS, 0)
+    footprint['board'] = deep_sizeof(game.board, seen)
+    footprint['checkpoints'] = deep_sizeof(game._log_checkpoints, seen)
+    log_bytes = sys.getsizeof(game.game_log)
+    seen.add(id(game.game_log))
+    for entry in game.game_log:
+        for key, value in entry.items():
+            if IMAGE_FIELD in key:
+                footprint['images'] += deep_sizeof(value, seen)
+        log_bytes += deep_sizeof(entry, seen)
+    footprint['log_text'] = log_bytes
+    footprint['other'] = deep_sizeof(game, seen)  # the GameState and its remaining attributes
+    footprint['total'] = sum(footprint[part] for part in PARTS)
+    return footprint
+
+def games_report(resident, top=10):
+    """Summary of (game_id, game) pairs: totals and averages by part, largest games.
+    Game ids are shortened since they double as session secrets.
+    """
+    rows = []
+    totals = dict.fromkeys(PARTS + ('total',), 0)
+    for game_id, game in resident:
+        footprint = game_footprint(game)
+        for part, size in footprint.items():
+            totals[part] += size
+        rows.append((footprint['total'], game_id, game, footprint))
+    rows.sort(key=lambda row: row[0], reverse=True)
+    count = len(rows)
+    return {
+        'games': count,
+        'bytes': totals,
+        'avg_bytes_per_game': {part: round(size / count) if count else 0 for part, size in totals.items()},
+        'largest': [{
+            'game': game_id[:8],
+            'mode': game.mode,
+            'turn': game.turn_count,
+            'log_entries': len(game.game_log),
+            'bytes': footprint
+        } for _, game_id, game, footprint in rows[:top]]
+    }
+
+def rss_bytes():
+    """Resident set size of this process (peak RSS where /proc is unavailable), or None."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# Tracing runs started so far: snapshots from an earlier run are not comparable
+_tracing_runs = 0
+_tracing_lock = threading.Lock()
+
+
+class AllocationTracker:
+    """Allocation growth by source line between successive snapshots.
+    Each consumer (endpoint, periodic log) keeps its own tracker, so calls
+    by one do not move the other's baseline; tracemalloc itself is shared.
+    """
+
+    def __init__(self):
+        self._previous = None  # (tracing run, snapshot)
+        self._lock = threading.Lock()
+
+    def start(self, frames=1):
+        global _tracing_runs
+        with _tracing_lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                _tracing_runs += 1
+        with self._lock:
+            self._previous = None
+
+    def stop(self):
+        tracemalloc.stop()
+        with self._lock:
+            self._previous = None
+
+    def growth(self, top=10):
+        """Traced memory and the top source lines by growth since the previous
+        call (since the start for the first call); None when not tracing.
+        """
+        if not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        with self._lock:
+            previous, self._previous = self._previous, (_tracing_runs, snapshot)
+        if previous is not None and previous[0] == _tracing_runs:
+            previous = previous[1]
+        else:
+            previous = None  # first call, or tracing restarted since
+        if previous is None:
+            stats = [(stat.traceback, stat.size, stat.count, stat.size, stat.count)
+                     for stat in snapshot.statistics('lineno')]
+        else:
+            stats = [(stat.traceback, stat.size, stat.count, stat.size_diff, stat.count_diff)
+                     for stat in snapshot.compare_to(previous, 'lineno')]
+        stats.sort(key=lambda stat: stat[3], reverse=True)
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'traced_bytes': current,
+            'peak_traced_bytes': peak,
+            'since': 'start' if previous is None else 'previous snapshot',
+            'growth': [{
+                'where': f"{traceback[0].filename}:{traceback[0].lineno}",
+                'size_diff': size_diff,
+                'count_diff': count_diff,
+                'size': size,
+                'count': count
+            } for traceback, size, count, size_diff, count_diff in stats[:top]]
+        }
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.0f}{unit}" if unit == 'B' else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+def summary_line(report):
+    """One-line digest of a memory report for the periodic log."""
+    avg = report['games']['avg_bytes_per_game']
+    line = (f"[memory] rss={format_bytes(report['rss_bytes']) if report['rss_bytes'] else '?'} "
+            f"games={report['games']['games']} total={format_bytes(report['games']['bytes']['total'])} "
+            f"avg/game={format_bytes(avg['total'])} (board {format_bytes(avg['board'])}, "
+            f"log {format_bytes(avg['log_text'])}, images {format_bytes(avg['images'])})")
+    allocations = report.get('allocations')
+    if allocations and allocations['growth']:
+        top = allocations['growth'][0]
+        line += f" traced={format_bytes(allocations['traced_bytes'])} top_growth={top['where']} +{format_bytes(top['size_diff'])}"
+    return line
+
+def start_logging(interval, build_report, stream=None):
+    """Print summary_line(build_report()) every interval seconds from a daemon thread."""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                print(summary_line(build_report()), file=stream or sys.stderr, flush=True)
+            except Exception as e:
+                print(f"[memory] report failed: {e}", file=stream or sys.stderr, flush=True)
+    thread = threading.Thread(target=run, name='memory-log', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,163 @@
+"""
+metrics.py - Minimal Prometheus-style metrics (no external dependencies)
+
+Counters and histograms are updated on the hot path with one lock and a
+dict lookup (plus a bisect for histograms). Counters and gauges can also be
+read at scrape time from a callback, which is how store sizes, queue depths and
+cache hit counts are exported without touching the request path.
+
+Metrics are per process; scrape each worker process separately.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Default latency buckets in seconds (1 ms to 30 s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_registry = []
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count. With a callback, the values are read
+    at scrape time instead (a number, or {label values tuple: number}).
+    """
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=(), callback=None):
+        super().__init__(name, help, labels)
+        self._values = {}
+        self.callback = callback
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        if self.callback is not None:
+            try:
+                values = self.callback()
+            except Exception:
+                return []
+            items = values.items() if isinstance(values, dict) else [((), values)]
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}' for key, value in items]
+
+
+class Gauge(Counter):
+    """Current value, set directly or computed by a callback at scrape time."""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets."""
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of a with-block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[-1] if series else 0
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, ("le", _format_value(bound)))} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {_format_value(series[-2])}')
+            lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {series[-1]}')
+        return lines
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# Engine metrics, updated from the modules that do the work
+SIMULATOR_RUNS = Counter('qgo_simulator_runs_total', 'Quantum circuit executions', ['method'])
+SIMULATOR_SHOTS = Counter('qgo_simulator_shots_total', 'Measurement shots simulated')
+IMAGE_RENDERS = Counter('qgo_image_renders_total', 'Circuit and histogram images rendered', ['kind'])
+AI_DECISION_SECONDS = Histogram('qgo_ai_decision_seconds', 'Time to compute an AI move', ['player', 'source'])
+ZIDAN_DECISIONS = Counter('qgo_zidan_decisions_total', 'ZidanAI decisions by degradation level', ['level'])
+OPENING_BOOK_HITS = Counter('qgo_opening_book_hits_total', 'ZidanAI decisions answered from the opening book')
@@ -0,0 +1,280 @@
+"""
+opening_book.py - Precomputed opening book for the first plies of 5x5 games
+
+The book is built offline by enumerating every position reachable within
+the first K plies (reduced by the 8 board symmetries) and recording:
+  - ZidanAI: the Bell measurement counts of its quantum analysis
+  - RuleBasedAI: the heuristic score of every empty cell
+
+At runtime the file is memory-mapped read-only and looked up with a binary
+search, so both AIs can skip their full pipeline for early-game positions.
+
+Build the book:
+    python opening_book.py --depth 4 --out opening_book.bin
+"""
+import argparse
+import mmap
+import os
+import struct
+import time
+
+from game import GameState, BOARD_SIZE, ZIDAN_AI, RULES_AI
+
+MAGIC = b'QGOB'
+VERSION = 1
+
+# Header: magic, version, record size, record count
+HEADER = struct.Struct('<4sHHI')
+# Record: position key, flags, Bell counts (00, 01, 10, 11), rule scores per cell
+RECORD = struct.Struct('<QB4H25b')
+KEY = struct.Struct('<Q')
+
+FLAG_ZIDAN = 1
+FLAG_RULES = 2
+NO_SCORE = -128
+MODE_B_BIT = 1 << (2 * BOARD_SIZE * BOARD_SIZE)
+
+BELL_STATES = ['00', '01', '10', '11']
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')
+
+
+def _build_symmetries():
+    """Return the 8 board symmetries as index permutations.
+    For each permutation perm, canonical cell j takes its value from cell perm[j].
+    """
+    n = BOARD_SIZE - 1
+    transforms = [
+        lambda r, c: (r, c),
+        lambda r, c: (c, n - r),
+        lambda r, c: (n - r, n - c),
+        lambda r, c: (n - c, r),
+        lambda r, c: (r, n - c),
+        lambda r, c: (n - r, c),
+        lambda r, c: (c, r),
+        lambda r, c: (n - c, n - r),
+    ]
+    symmetries = []
+    for transform in transforms:
+        perm = [0] * (BOARD_SIZE * BOARD_SIZE)
+        for r in range(BOARD_SIZE):
+            for c in range(BOARD_SIZE):
+                tr, tc = transform(r, c)
+                perm[tr * BOARD_SIZE + tc] = r * BOARD_SIZE + c
+        symmetries.append(tuple(perm))
+    return symmetries
+
+
+SYMMETRIES = _build_symmetries()
+
+
+def canonical_key(game_state):
+    """Return (key, perm) for the symmetry-reduced position.
+    The key is the smallest packed board over all symmetries, tagged with the mode.
+    """
+    cells = [cell for row in game_state.board for cell in row]
+    best_key = None
+    best_perm = None
+    for perm in SYMMETRIES:
+        key = 0
+        for j in perm:
+            key = (key << 2) | cells[j]
+        if best_key is None or key < best_key:
+            best_key = key
+            best_perm = perm
+    if game_state.mode == 'B':
+        best_key |= MODE_B_BIT
+    return best_key, best_perm
+
+
+def unpack_board(key):
+    """Rebuild a board (list of rows) from a packed position key."""
+    cells = []
+    for shift in range(2 * (BOARD_SIZE * BOARD_SIZE - 1), -1, -2):
+        cells.append((key >> shift) & 3)
+    return [cells[r * BOARD_SIZE:(r + 1) * BOARD_SIZE] for r in range(BOARD_SIZE)]
+
+
+class OpeningBook:
+    """Read-only, memory-mapped opening book."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self._mm.close()
+            raise ValueError(f"Not a compatible opening book: {path}")
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        """Release the memory map."""
+        self._mm.close()
+
+    def _find(self, key):
+        """Binary search for a record by key. Returns the unpacked record or None."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = HEADER.size + mid * RECORD.size
+            mid_key = KEY.unpack_from(self._mm, offset)[0]
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                return RECORD.unpack_from(self._mm, offset)
+        return None
+
+    def lookup(self, game_state):
+        """Find the book record for a position.
+        Returns: (perm, record) or None if the position is not in the book
+        """
+        key, perm = canonical_key(game_state)
+        record = self._find(key)
+        if record is None:
+            return None
+        return perm, record
+
+    def zidan_counts(self, game_state):
+        """Return the stored Bell counts for ZidanAI, or None if not in the book."""
+        found = self.lookup(game_state)
+        if found is None or not found[1][1] & FLAG_ZIDAN:
+            return None
+        values = found[1][2:6]
+        return {state: count for state, count in zip(BELL_STATES, values) if count}
+
+    def rules_scores(self, game_state):
+        """Return {(row, col): score} for RuleBasedAI, or None if not in the book."""
+        found = self.lookup(game_state)
+        if found is None or not found[1][1] & FLAG_RULES:
+            return None
+        perm, record = found
+        scores = {}
+        for j, score in enumerate(record[6:]):
+            if score != NO_SCORE:
+                scores[(perm[j] // BOARD_SIZE, perm[j] % BOARD_SIZE)] = score
+        return scores
+
+
+_default_book = None
+_default_loaded = False
+
+
+def get_default_book():
+    """Load the book named by QGO_OPENING_BOOK (or opening_book.bin) once.
+    Returns None when no book has been built.
+    """
+    global _default_book, _default_loaded
+    if not _default_loaded:
+        _default_loaded = True
+        path = os.environ.get('QGO_OPENING_BOOK', DEFAULT_PATH)
+        if path and os.path.exists(path):
+            try:
+                _default_book = OpeningBook(path)
+            except (OSError, ValueError, struct.error):
+                _default_book = None
+    return _default_book
+
+
+def _child(state, row, col):
+    """Return a copy of state with the move played, or None if it is illegal."""
+    child = state.copy_position()
+    success, _, _, _ = child.try_move(row, col, state.current_player)
+    if not success:
+        return None
+    child.next_turn()
+    return child
+
+
+def enumerate_openings(mode, depth):
+    """Yield (key, state) for each distinct position within depth plies."""
+    seen = set()
+    frontier = [GameState(mode=mode)]
+    for ply in range(depth + 1):
+        next_frontier = []
+        for state in frontier:
+            key, _ = canonical_key(state)
+            if (key, state.current_player) in seen:
+                continue
+            seen.add((key, state.current_player))
+            yield key, state
+            if ply < depth:
+                for row, col in state.get_legal_moves():
+                    child = _child(state, row, col)
+                    if child is not None:
+                        next_frontier.append(child)
+        frontier = next_frontier
+
+
+def build_book(depth, path, shots=1024):
+    """Enumerate openings for both modes and write the book to path.
+    Returns the number of records written.
+    """
+    from qiskit import transpile
+    from zidan_ai import ZidanAI
+    from rules_ai import RuleBasedAI
+
+    records = {}
+    zidan_keys = {}  # features -> list of keys sharing them
+
+    for mode in ('A', 'B'):
+        for key, state in enumerate_openings(mode, depth):
+            if state.current_player not in (ZIDAN_AI, RULES_AI):
+                continue
+            canon = GameState(mode=mode)
+            canon.board = unpack_board(key & (MODE_B_BIT - 1))
+            record = records.setdefault(key, [0, [0, 0, 0, 0], [NO_SCORE] * (BOARD_SIZE * BOARD_SIZE)])
+
+            if state.current_player == ZIDAN_AI:
+                features = ZidanAI(canon, use_book=False).extract_features()
+                zidan_keys.setdefault(features, []).append(key)
+                record[0] |= FLAG_ZIDAN
+            elif state.current_player == RULES_AI:
+                rules = RuleBasedAI(canon, use_book=False)
+                for row, col in canon.get_legal_moves():
+                    record[2][row * BOARD_SIZE + col] = rules.evaluate_move(row, col)
+                record[0] |= FLAG_RULES
+
+    # Positions only differ to the quantum circuit through their features,
+    # so each distinct feature triple is simulated once in a single batch.
+    if zidan_keys:
+        zidan = ZidanAI(GameState(mode='A'), use_book=False)
+        feature_list = list(zidan_keys)
+        circuits = [zidan.build_quantum_circuit(features) for features in feature_list]
+        result = zidan.backend.run(transpile(circuits, zidan.backend), shots=shots).result()
+        for i, features in enumerate(feature_list):
+            counts = result.get_counts(i)
+            for key in zidan_keys[features]:
+                records[key][1] = [counts.get(state, 0) for state in BELL_STATES]
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(records)))
+        for key in sorted(records):
+            flags, counts, scores = records[key]
+            f.write(RECORD.pack(key, flags, *counts, *scores))
+
+    return len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the Quantum Go opening book')
+    parser.add_argument('--depth', type=int, default=4, help='number of plies to enumerate')
+    parser.add_argument('--shots', type=int, default=1024, help='shots per quantum circuit')
+    parser.add_argument('--out', default=DEFAULT_PATH, help='output file')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = build_book(args.depth, args.out, shots=args.shots)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(args.out)
+    print(f"Wrote {count} positions (depth {args.depth}) to {args.out}")
+    print(f"  Size: {size / 1024:.1f} KiB, built in {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+pondering.py - Speculative AI decisions computed ahead of the request
+
+Mode B: after ZidanAI answers, the position is handed to a background
+worker that computes ZidanAI's reply to each likely human move. When the
+human move arrives, the matching reply is served from the cache and all
+other speculative work for that game is cancelled.
+
+Mode A: the game is deterministic given the position, so as soon as one
+AI step is returned the next ZidanAI or RuleBasedAI decision is prefetched
+and the following /ai-step picks it up.
+
+Background ZidanAI decisions count against the admission controller's
+concurrency limit: one runs only when a slot is free, and is skipped
+otherwise rather than delaying requests.
+"""
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from game import BOARD_SIZE, EMPTY, ZIDAN_AI, RULES_AI, HUMAN
+from zidan_ai import ZidanAI
+from rules_ai import RuleBasedAI
+import metrics
+
+
+class _Session:
+    """Speculative work for one game: (turn, position key) -> Future."""
+
+    def __init__(self):
+        self.futures = {}
+        self.cancelled = threading.Event()
+
+
+class Ponderer:
+    """Precomputes AI decisions for upcoming positions in the background."""
+
+    def __init__(self, enabled=True, max_moves=BOARD_SIZE * BOARD_SIZE, max_workers=1, max_sessions=8,
+                 admission=None):
+        """
+        enabled: turn pondering on or off
+        max_moves: number of candidate human moves to ponder per position (Mode B)
+        max_workers: background threads shared by all games
+        max_sessions: games pondered at once (oldest are cancelled first)
+        admission: AdmissionController whose free slots ZidanAI decisions use
+        """
+        self.enabled = enabled
+        self.max_moves = max_moves
+        self.max_sessions = max_sessions
+        self.admission = admission
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ponder')
+        self._lock = threading.Lock()
+        self._sessions = {}
+        # Counters are updated under _lock: request and ponder threads both count
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.skipped = 0
+
+    def likely_moves(self, game):
+        """Order the human's legal moves by a simple likelihood heuristic:
+        close to existing stones and to the center first.
+        """
+        def likelihood(move):
+            row, col = move
+            adjacent = sum(1 for nr, nc in game.get_neighbors(row, col)
+                           if game.board[nr][nc] != EMPTY)
+            return adjacent * 2 - (abs(row - 2) + abs(col - 2))
+
+        moves = game.get_legal_moves()
+        moves.sort(key=likelihood, reverse=True)
+        return moves[:self.max_moves]
+
+    def start(self, game_id, game):
+        """Begin speculative work for the player to move in game:
+        replies to each likely human move, or the AI's own next decision.
+        """
+        if not self.enabled or game.game_over:
+            return
+        self.cancel(game_id)
+
+        if game.current_player == HUMAN:
+            positions = []
+            for row, col in self.likely_moves(game):
+                child = self._play_human_move(game, row, col)
+                if child is not None:
+                    positions.append(child)
+        else:
+            positions = [game.copy_position()]
+
+        # Complete before it is published: other threads iterate its futures
+        session = _Session()
+        for state in positions:
+            session.futures[(state.turn_count, state.position_key())] = self._executor.submit(
+                self._think, state, session.cancelled)
+
+        with self._lock:
+            replaced = self._sessions.pop(game_id, None)
+            if replaced is not None:
+                self._cancel_session(replaced)
+            while len(self._sessions) >= self.max_sessions:
+                oldest = next(iter(self._sessions))
+                self._cancel_session(self._sessions.pop(oldest))
+            self._sessions[game_id] = session
+
+    def take(self, game_id, game):
+        """Claim the precomputed decision for the position the AI now faces.
+        Cancels every other speculative decision for the game.
+        Returns: ZidanAI result dict or RuleBasedAI (row, col, rationale),
+        or None if it must be computed now
+        """
+        with self._lock:
+            session = self._sessions.pop(game_id, None)
+        if session is None:
+            return None
+
+        future = session.futures.pop((game.turn_count, game.position_key()), None)
+        self._cancel_session(session)
+
+        # A reply that has not started yet is no faster than computing it here
+        if future is None or future.cancel():
+            result = None
+        else:
+            result = future.result()
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def claim(self, game_id, game, human_move=None):
+        """Like take(), for the position the AI faces in game after
+        human_move (row, col) if given, but only when that decision is
+        already computed. Otherwise returns None and leaves the game's
+        speculative work running for a later take().
+        """
+        if human_move is not None:
+            game = self._play_human_move(game, *human_move)
+            if game is None:
+                return None
+        key = (game.turn_count, game.position_key())
+        with self._lock:
+            session = self._sessions.get(game_id)
+            future = session.futures.get(key) if session is not None else None
+            if future is None or not future.done() or future.cancelled() or future.result() is None:
+                return None
+            del self._sessions[game_id]
+            self.hits += 1
+        self._cancel_session(session)
+        return future.result()
+
+    def cancel(self, game_id):
+        """Drop all speculative work for a game."""
+        with self._lock:
+            session = self._sessions.pop(game_id, None)
+        if session is not None:
+            self._cancel_session(session)
+
+    def _cancel_session(self, session):
+        session.cancelled.set()
+        for future in session.futures.values():
+            future.cancel()
+
+    def _play_human_move(self, game, row, col):
+        """Return a copy of game after the human move, or None if it ends the game
+        or is rejected.
+        """
+        child = game.copy_position()
+        success, _, _, _ = child.try_move(row, col, HUMAN)
+        if not success:
+            return None
+        child.next_turn()
+        if child.check_game_over():
+            return None
+        return child
+
+    def _think(self, state, cancelled):
+        if cancelled.is_set():
+            return None
+        try:
+            if state.current_player == ZIDAN_AI:
+                return self._think_zidan(state)
+            if state.current_player == RULES_AI:
+                with metrics.AI_DECISION_SECONDS.time(player='RuleBasedAI', source='ponder'):
+                    return RuleBasedAI(state).choose_move()
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"[ponder] decision failed: {type(e).__name__}: {e}", file=sys.stderr, flush=True)
+        return None
+
+    def _think_zidan(self, state):
+        ticket = self.admission.try_acquire() if self.admission is not None else None
+        if self.admission is not None and ticket is None:
+            with self._lock:
+                self.skipped += 1
+            return None
+        try:
+            with metrics.AI_DECISION_SECONDS.time(player='ZidanAI', source='ponder'):
+                return ZidanAI(state).choose_move(render_images=False)
+        finally:
+            if ticket is not None:
+                self.admission.release(ticket)
@@ -0,0 +1,218 @@
+"""
+profiler.py - In-process sampling profiler with flame graph output
+
+A background thread reads every thread's Python stack with
+sys._current_frames() at a fixed interval and counts identical stacks.
+Nothing is instrumented, so the overhead is one stack walk per thread per
+sample and the profiled code runs unchanged. Two modes:
+
+  - sample(seconds): all threads for a fixed window
+  - capture(route, requests): only the threads serving the next K requests
+    to one route (the app calls request_started/request_finished)
+
+Results are collapsed stacks ("outer;inner;leaf count" per line, the input
+format of flamegraph.pl and speedscope) or a self-contained SVG flame graph.
+"""
+import html
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_INTERVAL = 0.005
+MAX_SECONDS = 60
+MAX_DEPTH = 128
+
+# Leaf frames in these stdlib modules mean the thread is blocked, not working
+IDLE_FILES = ('threading.py', 'queue.py', 'selectors.py', 'socketserver.py', 'socket.py', 'ssl.py')
+
+# One profile at a time; profiling two windows at once would double the overhead
+_busy = threading.Lock()
+_capture = None
+
+
+class ProfilerBusy(Exception):
+    """Another profile is already running."""
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+
+def collapse(frame):
+    """Stack of a frame as 'outer;...;leaf' and whether the thread looks idle."""
+    idle = frame is not None and os.path.basename(frame.f_code.co_filename) in IDLE_FILES
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels)), idle
+
+
+class Sampler:
+    """Counts collapsed stacks of the selected threads until stopped."""
+
+    def __init__(self, interval=DEFAULT_INTERVAL, include_idle=False, threads=None):
+        """threads: a set of thread idents to sample (shared and updated by the
+        caller), or None for every thread except the sampler and its caller.
+        """
+        self.interval = interval
+        self.include_idle = include_idle
+        self.threads = threads
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._exclude = {threading.get_ident()}
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        self._exclude.add(threading.get_ident())
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        wanted = self.threads
+        for ident, frame in sys._current_frames().items():
+            if ident in self._exclude or (wanted is not None and ident not in wanted):
+                continue
+            stack, idle = collapse(frame)
+            if stack and (self.include_idle or not idle):
+                self.stacks[stack] += 1
+        self.samples += 1
+
+
+def sample(seconds, interval=DEFAULT_INTERVAL, include_idle=False):
+    """Profile all threads for a fixed window; returns a Counter of stacks."""
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        sampler = Sampler(interval, include_idle).start()
+        time.sleep(min(seconds, MAX_SECONDS))
+        return sampler.stop()
+    finally:
+        _busy.release()
+
+
+class _Capture:
+    """Threads currently serving a request to the captured route."""
+
+    def __init__(self, route, requests):
+        self.route = route
+        self.remaining = requests
+        self.threads = set()
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+
+
+def capture(route, requests, timeout=MAX_SECONDS, interval=DEFAULT_INTERVAL):
+    """Profile the next `requests` requests to route (or until timeout);
+    returns (Counter of stacks, number of requests profiled).
+    """
+    global _capture
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        current = _Capture(route, requests)
+        sampler = Sampler(interval, include_idle=True, threads=current.threads).start()
+        _capture = current
+        current.done.wait(min(timeout, MAX_SECONDS))
+        _capture = None
+        stacks = sampler.stop()
+        return stacks, requests - current.remaining
+    finally:
+        _busy.release()
+
+def request_started(route):
+    """Called by the app before a request; cheap when nothing is captured."""
+    current = _capture
+    if current is None or current.route != route:
+        return
+    with current.lock:
+        if current.remaining > len(current.threads):
+            current.threads.add(threading.get_ident())
+
+def request_finished():
+    current = _capture
+    if current is None:
+        return
+    ident = threading.get_ident()
+    with current.lock:
+        if ident in current.threads:
+            current.threads.discard(ident)
+            current.remaining -= 1
+            if current.remaining <= 0:
+                current.done.set()
+
+
+def to_collapsed(stacks):
+    """Collapsed stack text, most frequent first."""
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+# Flame graph layout
+SVG_WIDTH = 1200
+FRAME_HEIGHT = 16
+FONT_SIZE = 11
+CHAR_WIDTH = 6.5
+
+def _tree(stacks):
+    root = {'count': 0, 'children': {}}
+    for stack, count in stacks.items():
+        node = root
+        node['count'] += count
+        for label in stack.split(';'):
+            node = node['children'].setdefault(label, {'count': 0, 'children': {}})
+            node['count'] += count
+    return root
+
+def _color(label):
+    # Stable warm colour per function, in the style of flamegraph.pl
+    h = sum(map(ord, label))
+    return f"rgb({205 + h % 50},{(h * 7) % 180 + 40},{(h * 13) % 55})"
+
+def to_svg(stacks, title='Flame Graph'):
+    """Self-contained SVG flame graph (root at the bottom, hover for counts)."""
+    root = _tree(stacks)
+    total = root['count'] or 1
+
+    def depth(node):
+        return 1 + max((depth(child) for child in node['children'].values()), default=0)
+
+    levels = depth(root)
+    height = (levels + 2) * FRAME_HEIGHT
+    scale = SVG_WIDTH / total
+    rects = []
+
+    def draw(label, node, x, level):
+        width = node['count'] * scale
+        if width < 0.5:
+            return
+        y = height - (level + 1) * FRAME_HEIGHT
+        tip = f"{html.escape(label)} ({node['count']} samples, {100 * node['count'] / total:.1f}%)"
+        # Cut before escaping so an entity such as &lt; is never split
+        shown = label if len(label) * CHAR_WIDTH < width - 4 else label[:max(0, int((width - 4) / CHAR_WIDTH) - 2)] + '..'
+        text = html.escape(shown)
+        rects.append(
+            f'<g><title>{tip}</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{width:.1f}" height="{FRAME_HEIGHT - 1}" fill="{_color(label)}" rx="2"/>'
+            + (f'<text x="{x + 3:.1f}" y="{y + FRAME_HEIGHT - 4}">{text}</text>' if width > 3 * CHAR_WIDTH else '')
+            + '</g>')
+        for child_label, child in sorted(node['children'].items()):
+            draw(child_label, child, x, level + 1)
+            x += child['count'] * scale
+
+    draw('all', root, 0.0, 0)
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{SVG_WIDTH}" height="{height}" '
+            f'font-family="monospace" font-size="{FONT_SIZE}">'
+            f'<rect width="100%" height="100%" fill="#f8f8f8"/>'
+            f'<text x="{SVG_WIDTH / 2}" y="{FONT_SIZE + 2}" text-anchor="middle">{html.escape(title)}</text>'
+            + ''.join(rects) + '</svg>')
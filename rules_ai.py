@@ -2,13 +2,15 @@
 rules_ai.py - Classical rule-based AI with heuristic strategy
 """
 import random
+from opening_book import get_default_book
 
 class RuleBasedAI:
     """Classical heuristic AI for Go."""
     
-    def __init__(self, game_state):
+    def __init__(self, game_state, use_book=True):
         self.game_state = game_state
         self.player = 2  # RULES_AI
+        self.book = get_default_book() if use_book else None
     
     def choose_move(self):
         """
@@ -23,10 +25,16 @@ class RuleBasedAI:
         if not legal_moves:
             return None, None, "No legal moves available - Pass"
         
+        # Opening positions have their scores precomputed in the book
+        book_scores = self.book.rules_scores(self.game_state) if self.book else None
+        
         # Score each move
         move_scores = []
         for row, col in legal_moves:
-            score = self.evaluate_move(row, col)
+            if book_scores is not None:
+                score = book_scores[(row, col)]
+            else:
+                score = self.evaluate_move(row, col)
             move_scores.append((score, row, col))
         
         # Sort by score (descending)
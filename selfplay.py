@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+selfplay.py - Headless ZidanAI vs RuleBasedAI self-play runner
+
+Plays complete Mode A games directly against GameState (no Flask, no image
+rendering) across a process pool and streams one JSON line per game.
+
+Usage:
+    python selfplay.py --games 1000 --workers 8 --out selfplay.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+warnings.filterwarnings('ignore')
+
+from multiprocessing import Pool
+
+from game import GameState, ZIDAN_AI, RULES_AI
+from zidan_ai import ZidanAI
+from rules_ai import RuleBasedAI
+
+
+def play_game(game_index):
+    """Play one Mode A game to the end, following the /ai-step rules.
+    Returns: dict with winner, scores, turns and per-move timings (ms)
+    """
+    game = GameState(mode='A')
+    move_times = []
+    start = time.perf_counter()
+
+    while not game.game_over:
+        move_start = time.perf_counter()
+        player = game.current_player
+        if player == ZIDAN_AI:
+            result = ZidanAI(game).choose_move(render_images=False)
+            row, col = result['row'], result['col']
+        else:
+            row, col, _ = RuleBasedAI(game).choose_move()
+
+        if row is None:
+            game.pass_turn()
+        else:
+            success, _, _, _ = game.try_move(row, col, player)
+            if not success:
+                # Suicide moves are turned into passes, as in /ai-step
+                game.pass_turn()
+
+        move_times.append(round((time.perf_counter() - move_start) * 1000, 3))
+        game.next_turn()
+        game.check_game_over()
+
+    return {
+        'game': game_index,
+        'winner': game.winner,
+        'scores': {
+            'ZidanAI': game.calculate_score(ZIDAN_AI),
+            'RuleBasedAI': game.calculate_score(RULES_AI)
+        },
+        'turns': game.turn_count,
+        'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+        'move_times_ms': move_times
+    }
+
+
+def run(games, workers, out):
+    """Play games across a process pool, writing results to out as they finish.
+    Returns: (win counts by winner, elapsed seconds)
+    """
+    wins = {'ZidanAI': 0, 'RuleBasedAI': 0, 'Draw': 0}
+    start = time.perf_counter()
+
+    with Pool(processes=workers) as pool:
+        chunksize = max(1, games // (workers * 8))
+        for record in pool.imap_unordered(play_game, range(games), chunksize=chunksize):
+            out.write(json.dumps(record) + "\n")
+            wins[record['winner']] += 1
+
+    return wins, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless ZidanAI vs RuleBasedAI self-play')
+    parser.add_argument('--games', type=int, default=100, help='number of games to play')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--out', default='selfplay.jsonl', help="JSONL output file ('-' for stdout)")
+    args = parser.parse_args()
+
+    if args.out == '-':
+        wins, elapsed = run(args.games, args.workers, sys.stdout)
+        report = sys.stderr
+    else:
+        with open(args.out, 'w') as out:
+            wins, elapsed = run(args.games, args.workers, out)
+        report = sys.stdout
+
+    print("=" * 50, file=report)
+    print(f"  {args.games} games on {args.workers} workers in {elapsed:.1f}s "
+          f"({args.games / elapsed:.1f} games/s)", file=report)
+    for name, count in wins.items():
+        print(f"  {name}: {count} ({count / args.games * 100:.1f}%)", file=report)
+    print("=" * 50, file=report)
+
+
+if __name__ == '__main__':
+    main()
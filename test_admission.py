@@ -0,0 +1,125 @@
+"""
+test_admission.py - Tests for admission control of AI decisions
+"""
+import sys
+import threading
+import time
+
+from admission import AdmissionController, Overloaded
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out"
+        time.sleep(0.005)
+
+def test_limits():
+    """Slots are bounded; a full queue and long waits are refused with a retry hint."""
+    print("=" * 50)
+    print("TEST 1: Concurrency and Queue Limits")
+    print("=" * 50)
+
+    control = AdmissionController(concurrency=1, max_queue=1, max_wait=0.2)
+    ticket = control.acquire('a')
+    assert control.stats()['running'] == 1
+
+    waiter = threading.Thread(target=lambda: control.release(control.acquire('b')))
+    waiter.start()
+    wait_for(lambda: control.stats()['queue_depth'] == 1)
+
+    try:
+        control.acquire('c')
+        assert False, "A full queue should refuse"
+    except Overloaded as e:
+        assert e.retry_after >= 1
+    control.release(ticket)
+    waiter.join()
+
+    ticket = control.acquire('a')
+    start = time.monotonic()
+    try:
+        control.acquire('b')
+        assert False, "Waiting past max_wait should refuse"
+    except Overloaded:
+        assert time.monotonic() - start >= 0.2
+    assert control.try_acquire() is None, "Background work never waits for a slot"
+    control.release(ticket)
+
+    admitted = control.stats()['admitted']
+    background = control.try_acquire()
+    assert background is not None and control.stats()['running'] == 1
+    assert control.stats()['admitted'] == admitted, "Background work is not counted as admitted"
+    control.release(background)
+
+    stats = control.stats()
+    print(f"  Stats: {stats}")
+    assert stats['running'] == 0 and stats['queue_depth'] == 0
+    assert stats['admitted'] == 3 and stats['rejected'] == 1 and stats['timed_out'] == 1
+
+    print("✅ Test 1 PASSED: Limits enforced\n")
+
+def test_fairness():
+    """Waiting requests are admitted round-robin across keys, and per key in order."""
+    print("=" * 50)
+    print("TEST 2: Fair Admission")
+    print("=" * 50)
+
+    control = AdmissionController(concurrency=1, max_queue=10, max_wait=5, per_key=3)
+    order = []
+
+    def request(key, label):
+        with control.slot(key):
+            order.append(label)
+
+    ticket = control.acquire('busy')
+    threads = []
+    for key, label in [('a', 'a1'), ('a', 'a2'), ('a', 'a3'), ('b', 'b1')]:
+        thread = threading.Thread(target=request, args=(key, label))
+        thread.start()
+        threads.append(thread)
+        wait_for(lambda: control.stats()['queue_depth'] == len(threads))
+
+    try:
+        control.acquire('a')
+        assert False, "A key at its waiting limit should be refused"
+    except Overloaded:
+        pass
+
+    control.release(ticket)
+    for thread in threads:
+        thread.join()
+    print(f"  Admission order: {order}")
+    assert order == ['a1', 'b1', 'a2', 'a3'], "Session b should not wait behind all of a's requests"
+
+    print("✅ Test 2 PASSED: Fair admission\n")
+
+def run_all_tests():
+    """Run all admission control tests."""
+    tests = [
+        test_limits,
+        test_fairness
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ TEST FAILED: {e}\n")
+            failed += 1
+        except Exception as e:
+            print(f"❌ TEST ERROR: {e}\n")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"TEST SUMMARY: {passed} passed, {failed} failed")
+    print("=" * 50 + "\n")
+
+    return failed == 0
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,811 @@
+"""
+test_app.py - Tests for the Flask routes using the test client
+"""
+import gzip
+import json
+import os
+import sys
+import warnings
+warnings.filterwarnings('ignore')
+
+os.environ.setdefault('QGO_PONDER', '0')
+os.environ.setdefault('QGO_OPENING_BOOK', '')  # compute every decision (no book lookups)
+
+import threading
+import time
+from xml.dom import minidom
+
+import app as app_module
+from admission import AdmissionController
+import profiler
+import visuals
+import zidan_ai
+from app import app
+from game import GameState
+
+def new_client(mode='A'):
+    """Return a test client with a freshly started game."""
+    client = app.test_client()
+    response = client.post('/start', json={'mode': mode})
+    assert response.status_code == 200, response.get_json()
+    return client
+
+def signed_image(kind, params):
+    """URL of an image as the server would issue it."""
+    with app.test_request_context():
+        return app_module.image_url(kind, params)
+
+def test_incremental_log():
+    """Responses carry only the log entries after the client's cursor."""
+    print("=" * 50)
+    print("TEST 1: Incremental Game Log")
+    print("=" * 50)
+
+    client = new_client('A')
+    full_log = client.get('/get_state').get_json()['game_log']
+    assert len(full_log) == 1
+
+    have = len(full_log)
+    for _ in range(4):
+        data = client.post('/ai-step', json={'since': have}).get_json()
+        assert data['log_start'] == have, "Log should start at the cursor"
+        assert len(data['game_log']) == 1, "Each step should add one entry"
+        assert data['log_length'] == have + 1
+        full_log.extend(data['game_log'])
+        have = data['log_length']
+
+    state = client.get('/get_state').get_json()
+    assert state['log_start'] == 0 and state['game_log'] == full_log, "Appended log should equal full log"
+
+    state = client.get(f'/get_state?since={have}').get_json()
+    assert state['game_log'] == [] and state['log_length'] == have
+
+    # Out-of-range cursors fall back to the full log
+    state = client.get('/get_state?since=999').get_json()
+    assert state['log_start'] == 0 and len(state['game_log']) == have
+
+    print("✅ Test 1 PASSED: Incremental log works\n")
+
+def test_incremental_log_mode_b():
+    """Mode B moves return the human and ZidanAI entries only."""
+    print("=" * 50)
+    print("TEST 2: Incremental Log in Mode B")
+    print("=" * 50)
+
+    client = new_client('B')
+    data = client.post('/play', json={'row': 2, 'col': 2, 'since': 1}).get_json()
+    assert data['log_start'] == 1
+    assert [entry['player'] for entry in data['game_log']] == ['Human', 'ZidanAI']
+
+    data = client.post('/play', json={'row': 2, 'col': 2, 'since': data['log_length']}).get_json()
+    assert 'error' in data and data['game_log'] == [], "Rejected move adds no entries"
+
+    print("✅ Test 2 PASSED: Mode B log is incremental\n")
+
+def test_image_urls():
+    """ZidanAI log entries link to cacheable images instead of inline base64."""
+    print("=" * 50)
+    print("TEST 3: Cacheable Image URLs")
+    print("=" * 50)
+
+    client = new_client('A')
+    entry = client.post('/ai-step', json={'since': 1}).get_json()['game_log'][0]
+    assert entry['player'] == 'ZidanAI'
+    assert 'circuit_image' not in entry and 'histogram_image' not in entry
+    print(f"  {entry['circuit_image_url']}  {entry['histogram_image_url']}")
+
+    for url in (entry['circuit_image_url'], entry['histogram_image_url']):
+        response = client.get(url)
+        assert response.status_code == 200 and response.mimetype == 'image/png'
+        assert response.data.startswith(b'\x89PNG'), "Expected a PNG body"
+        assert 'immutable' in response.headers['Cache-Control']
+        etag = response.headers['ETag']
+        assert not etag.startswith('W/'), "ETag should be strong"
+
+        cached = client.get(url, headers={'If-None-Match': etag})
+        assert cached.status_code == 304 and cached.data == b''
+
+    assert client.get('/images/circuit/1,2.png').status_code == 404
+    assert client.get('/images/circuit/1,2,9999.png').status_code == 404
+    assert client.get('/images/histogram/a,b,c,d.png').status_code == 404
+
+    # Only parameters the server issued are drawn
+    renders = visuals.histogram_png.cache_info().misses
+    assert client.get('/images/histogram/7,1,0,3.png').status_code == 404, "Unsigned"
+    forged = signed_image('histogram', (7, 1, 0, 3)).replace('7,1,0,3', '7,1,0,4')
+    assert client.get(forged).status_code == 404, "Signed for other parameters"
+    assert visuals.histogram_png.cache_info().misses == renders, "Refused without rendering"
+
+    # A failed drawing is not cached: the next request draws it again
+    render = zidan_ai.ZidanAI.render_histogram_png
+    zidan_ai.ZidanAI.render_histogram_png = lambda self, counts: None
+    try:
+        assert client.get(signed_image('histogram', (7, 1, 0, 3))).status_code == 500
+    finally:
+        zidan_ai.ZidanAI.render_histogram_png = render
+    assert client.get(signed_image('histogram', (7, 1, 0, 3))).status_code == 200
+
+    print("✅ Test 3 PASSED: Images are served from cacheable URLs\n")
+
+def parse_events(body):
+    """Split a text/event-stream body into (event, data) pairs."""
+    events = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+def test_autoplay_stream():
+    """The SSE endpoint plays a whole Mode A game in one response."""
+    print("=" * 50)
+    print("TEST 4: Streamed Autoplay")
+    print("=" * 50)
+
+    client = new_client('A')
+    response = client.get('/autoplay/stream?since=1')
+    assert response.status_code == 200 and response.mimetype == 'text/event-stream'
+    events = parse_events(response.get_data(as_text=True))
+    print(f"  Received {len(events)} events")
+
+    names = [name for name, _ in events]
+    assert names[-1] == 'end' and set(names[:-1]) == {'ply'}, "Expected ply events then end"
+    assert events[-1][1]['game_over'] and events[-1][1]['winner'] is not None
+
+    # The streamed deltas add up to the stored log
+    streamed = []
+    for _, data in events:
+        assert data['log_start'] == len(streamed) + 1
+        streamed.extend(data['game_log'])
+    state = client.get('/get_state').get_json()
+    assert state['game_log'][1:] == streamed
+    assert state['turn_count'] == events[-1][1]['turn_count']
+
+    assert new_client('B').get('/autoplay/stream').status_code == 400
+
+    print("✅ Test 4 PASSED: Streamed autoplay works\n")
+
+def test_job_api():
+    """Moves submitted as jobs return a job id and the result is long-polled."""
+    print("=" * 50)
+    print("TEST 5: Asynchronous Job API")
+    print("=" * 50)
+
+    client = new_client('A')
+    response = client.post('/jobs/ai-step', json={'since': 1})
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['status'] in ('queued', 'running', 'done')
+
+    done = client.get(f"{job['poll_url']}?wait=10").get_json()
+    assert done['status'] == 'done', done
+    result = done['result']
+    assert result['status_code'] == 200
+    assert result['log_start'] == 1 and len(result['game_log']) == 1
+    assert client.get('/get_state').get_json()['turn_count'] == result['turn_count']
+
+    stats = client.get('/jobs/stats').get_json()
+    print(f"  Job stats: {stats}")
+    assert stats['completed'] >= 1 and 'avg_wait_ms' in stats
+
+    mode_b = new_client('B')
+    done = mode_b.get(mode_b.post('/jobs/play', json={'row': 2, 'col': 2, 'since': 1}).get_json()['poll_url'] + '?wait=10').get_json()
+    assert [entry['player'] for entry in done['result']['game_log']] == ['Human', 'ZidanAI']
+
+    assert client.get('/jobs/unknown').status_code == 404
+    assert app.test_client().post('/jobs/ai-step', json={}).status_code == 404
+
+    print("✅ Test 5 PASSED: Job API works\n")
+
+def replay_boards(entries):
+    """Rebuild print_board() snapshots of compact log entries from moves and captures."""
+    stones = {'ZidanAI': '1', 'RuleBasedAI': '2', 'Human': '3'}
+    board = ['0'] * 25
+    snapshots = []
+    for entry in entries:
+        move = entry.get('move', '')
+        if entry['player'] in stones and move.startswith('('):
+            row, col = map(int, move.strip('()').split(', '))
+            board[row * 5 + col] = stones[entry['player']]
+            for r, c in entry.get('captures', []):
+                board[r * 5 + c] = '0'
+        if entry.get('board') == 1:
+            game = GameState()
+            game.board = [[int(cell) for cell in board[r * 5:r * 5 + 5]] for r in range(5)]
+            snapshots.append(game.print_board())
+    return snapshots
+
+def test_compact_format():
+    """Compact responses carry the same information in fewer bytes, and compress."""
+    print("=" * 50)
+    print("TEST 6: Compact Wire Format")
+    print("=" * 50)
+
+    client = new_client('A')
+    for _ in range(8):
+        client.post('/ai-step', json={})
+    full = client.get('/get_state')
+    compact = client.get('/get_state?compact=1')
+    print(f"  JSON: {len(full.data)} bytes, compact: {len(compact.data)} bytes")
+    assert len(compact.data) < len(full.data)
+
+    full, compact = full.get_json(), compact.get_json()
+    assert compact['format'] == 'compact'
+    assert compact['board'] == ''.join(str(cell) for row in full['board'] for cell in row)
+    for player, score in full['scores'].items():
+        assert compact['scores'][player] == [score['territory'], score['liberties'], score['connectivity']]
+    assert replay_boards(compact['game_log']) == [e['board'] for e in full['game_log'] if 'board' in e], \
+        "Replayed snapshots should match the server's"
+
+    gzipped = client.get('/get_state', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in gzipped.headers['Vary']
+    assert json.loads(gzip.decompress(gzipped.data)) == full
+    print(f"  gzip: {len(gzipped.data)} bytes")
+
+    small = client.get('/jobs/unknown', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers, "Tiny responses are sent as is"
+
+    print("✅ Test 6 PASSED: Compact format works\n")
+
+def test_move_only_log():
+    """Log snapshots and scores rebuilt from moves match the live game."""
+    print("=" * 50)
+    print("TEST 7: Move-Only Log")
+    print("=" * 50)
+
+    client = new_client('A')
+    boards, scores = [], []
+    while True:
+        data = client.post('/ai-step', json={'since': 10 ** 6}).get_json()
+        if 'error' in data:
+            break
+        boards.append(data['board'])
+        scores.append(data['scores'])
+        if data['game_over']:
+            break
+
+    log = client.get('/get_state').get_json()['game_log']
+    assert len(log) == len(boards) + 1
+    for i, entry in enumerate(log[1:]):
+        game = GameState()
+        game.board = boards[i]
+        assert entry['board'] == game.print_board(), f"Snapshot {i + 1} differs"
+        if entry['move'] != 'Pass':
+            assert entry['scores'] == scores[i], f"Scores {i + 1} differ"
+
+    for index in (0, 5, len(log) - 1):
+        review = client.get(f'/review/{index}').get_json()
+        assert review['entry'] == log[index]
+        assert review['board'] == (boards[index - 1] if index else [[0] * 5 for _ in range(5)])
+    assert client.get(f'/review/{len(log)}').status_code == 404
+
+    print("✅ Test 7 PASSED: Move-only log rebuilds boards\n")
+
+def test_stateless_move_api():
+    """/api/move answers explicit positions without a session and is cacheable."""
+    print("=" * 50)
+    print("TEST 8: Stateless Move API")
+    print("=" * 50)
+
+    client = app.test_client()  # no game, no session
+    board = '0000000000001000000000000'
+    response = client.get(f'/api/move?board={board}&to_move=RuleBasedAI&turn_count=1')
+    assert response.status_code == 200, response.get_json()
+    data = response.get_json()
+    print(f"  {data['player']} plays {data['move']}: {data['rationale']}")
+    assert data['player'] == 'RuleBasedAI' and data['move'] != '(2, 2)'
+    assert 'public' in response.headers['Cache-Control']
+    etag = response.headers['ETag']
+
+    again = client.get(f'/api/move?board={board}&to_move=2&turn_count=1')
+    assert again.get_json() == data, "Repeated position should be served from the cache"
+    assert client.get(f'/api/move?board={board}&to_move=2', headers={'If-None-Match': etag}).status_code == 304
+    assert 'Accept' in response.headers['Vary']
+    compact = client.get(f'/api/move?board={board}&to_move=2&compact=1', headers={'If-None-Match': etag})
+    assert compact.status_code == 200 and compact.headers['ETag'] != etag, "Each format has its own ETag"
+
+    rows = [[0] * 5 for _ in range(5)]
+    rows[0][0] = 2
+    data = client.post('/api/move', json={'board': rows, 'to_move': 'ZidanAI', 'mode': 'A'}).get_json()
+    assert data['player'] == 'ZidanAI' and 'classification' in data['analysis']
+    assert data['analysis']['histogram_image_url'].startswith('/images/')
+
+    assert client.get('/api/move?board=123&to_move=ZidanAI').status_code == 400
+    assert client.get(f'/api/move?board={board}&to_move=Human&mode=B').status_code == 400
+    assert client.get(f'/api/move?board={board}&to_move=ZidanAI&turn_count=30').status_code == 400
+    for body in ([], 'x', 5):
+        assert client.post('/api/move', json=body).status_code == 400, "Non-object JSON body is rejected"
+
+    print("✅ Test 8 PASSED: Stateless API works\n")
+
+def test_get_state_conditional():
+    """/get_state answers 304 while the game is unchanged."""
+    print("=" * 50)
+    print("TEST 9: Conditional /get_state")
+    print("=" * 50)
+
+    client = new_client('A')
+    first = client.get('/get_state?since=1')
+    etag = first.headers['ETag']
+    assert 'no-cache' in first.headers['Cache-Control']
+
+    unchanged = client.get('/get_state?since=1', headers={'If-None-Match': etag})
+    assert unchanged.status_code == 304 and unchanged.data == b''
+    assert client.get('/get_state?since=1').data == first.data, "Cached body should be identical"
+
+    # A different cursor or format is a different representation
+    assert client.get('/get_state?since=0', headers={'If-None-Match': etag}).status_code == 200
+    assert client.get('/get_state?since=1&compact=1', headers={'If-None-Match': etag}).status_code == 200
+
+    client.post('/ai-step', json={})
+    changed = client.get('/get_state?since=1', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert len(changed.get_json()['game_log']) == 1
+
+    # Compressed bodies carry a weak tag, which revalidates the same way
+    zipped = client.get('/get_state?since=0', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip' and zipped.headers['ETag'].startswith('W/')
+    revalidated = client.get('/get_state?since=0', headers={'Accept-Encoding': 'gzip',
+                                                             'If-None-Match': zipped.headers['ETag']})
+    assert revalidated.status_code == 304
+
+    # Another game never matches this game's tag
+    other = new_client('A')
+    assert other.get('/get_state?since=1', headers={'If-None-Match': etag}).status_code == 200
+
+    print("✅ Test 9 PASSED: Conditional polling works\n")
+
+def test_stage_timings():
+    """With timing enabled, ZidanAI log entries carry per-stage timings."""
+    print("=" * 50)
+    print("TEST 10: ZidanAI Stage Timings")
+    print("=" * 50)
+
+    client = new_client('A')
+    entry = client.post('/ai-step', json={'since': 1}).get_json()['game_log'][0]
+    assert 'timings' not in entry, "Timing is off by default"
+
+    zidan_ai.reset_stage_stats()
+    zidan_ai.TIMING_ENABLED = True
+    try:
+        client = new_client('A')
+        entry = client.post('/ai-step', json={'since': 1}).get_json()['game_log'][0]
+    finally:
+        zidan_ai.TIMING_ENABLED = False
+    timings = entry['timings']
+    print(f"  {timings}")
+    assert {'features', 'classify', 'move'} <= set(timings)
+    assert 'simulate' in timings or 'book' in timings
+    assert all(t['wall_ms'] >= 0 and t['cpu_ms'] >= 0 for t in timings.values())
+    assert zidan_ai.stage_stats()['features']['count'] == 1
+
+    # Images are drawn by their routes; those renders count in the process totals
+    zidan_ai.TIMING_ENABLED = True
+    try:
+        assert client.get(signed_image('histogram', (5, 6, 7, 9))).status_code == 200
+        assert client.get(signed_image('circuit', (3, -2, 4))).status_code == 200
+    finally:
+        zidan_ai.TIMING_ENABLED = False
+    stats = zidan_ai.stage_stats()
+    assert stats['render_histogram']['count'] == 1 and stats['render_circuit']['count'] == 1
+    assert 'qgo_zidan_stage_seconds_total{stage="render_circuit"}' in client.get('/metrics').get_data(as_text=True)
+
+    print("✅ Test 10 PASSED: Stage timings recorded\n")
+
+def metric_value(text, sample):
+    """Value of one sample line (name with labels) in a /metrics body, or 0."""
+    for line in text.splitlines():
+        if line.startswith(sample + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return 0.0
+
+def test_metrics():
+    """/metrics exposes request, game and engine metrics in Prometheus format."""
+    print("=" * 50)
+    print("TEST 11: Prometheus Metrics")
+    print("=" * 50)
+
+    client = app.test_client()
+    before = client.get('/metrics').get_data(as_text=True)
+    client = new_client('A')
+    client.post('/ai-step', json={})
+    response = client.get('/metrics')
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+
+    def grew(sample, by=1):
+        return metric_value(text, sample) - metric_value(before, sample) >= by
+
+    assert grew('qgo_games_created_total{mode="A"}')
+    assert grew('qgo_http_request_duration_seconds_count{route="/ai-step",method="POST",status="200"}')
+    assert 'qgo_http_request_duration_seconds_bucket{route="/ai-step",method="POST",status="200",le="+Inf"}' in text
+    assert '# TYPE qgo_ai_decision_seconds histogram' in text
+    assert metric_value(text, 'qgo_games_active') >= 1
+    with client.session_transaction() as session:
+        game = app_module.games.get(session['game_id'])
+    game.game_over = True  # finished games stay stored but are no longer active
+    after = client.get('/metrics').get_data(as_text=True)
+    assert metric_value(after, 'qgo_games_active') == metric_value(text, 'qgo_games_active') - 1
+    assert 'qgo_cache_lookups_total{cache="image_circuit",result="hit"}' in text
+
+    print("✅ Test 11 PASSED: Metrics exposed\n")
+
+def test_debug_profile():
+    """/debug/profile needs the admin token and returns stacks of the profiled route."""
+    print("=" * 50)
+    print("TEST 12: Sampling Profiler")
+    print("=" * 50)
+
+    client = new_client('A')
+    app_module.ADMIN_TOKEN = None
+    assert client.get('/debug/profile?seconds=0.1').status_code == 404, "Disabled without a token"
+    app_module.ADMIN_TOKEN = 'secret'
+    try:
+        assert client.get('/debug/profile?seconds=0.1&token=wrong').status_code == 404
+
+        response = client.get('/debug/profile?seconds=0.2&idle=1', headers={'X-Admin-Token': 'secret'})
+        assert response.status_code == 200 and response.mimetype == 'text/plain'
+
+        # Capture the next /ai-step: the profile request blocks until it is served
+        result = {}
+        def profile():
+            result['response'] = app.test_client().get(
+                '/debug/profile?route=/ai-step&requests=1&timeout=30&format=svg&token=secret')
+        thread = threading.Thread(target=profile)
+        thread.start()
+        while profiler._capture is None:
+            time.sleep(0.01)
+        client.post('/ai-step', json={})
+        thread.join()
+        response = result['response']
+        assert response.status_code == 200 and response.mimetype == 'image/svg+xml'
+        svg = response.get_data(as_text=True)
+        assert svg.startswith('<svg') and '1 request(s)' in svg
+        assert 'ai_step (app.py' in svg, "The profiled handler should appear in the flame graph"
+    finally:
+        app_module.ADMIN_TOKEN = None
+
+    stacks = profiler.Counter({'main;play;choose_move': 3, 'main;play;render': 1})
+    assert profiler.to_collapsed(stacks) == 'main;play;choose_move 3\nmain;play;render 1\n'
+
+    # Truncated labels stay well-formed XML whatever the frame width
+    for count in range(1, 200):
+        svg = profiler.to_svg(profiler.Counter({'main;<module> (zidan_ai.py:10)': count, 'main;other': 1000}))
+        minidom.parseString(svg)
+
+    print("✅ Test 12 PASSED: Profiles captured\n")
+
+def test_debug_memory():
+    """/debug/memory accounts for resident games and reports allocation growth."""
+    print("=" * 50)
+    print("TEST 13: Memory Diagnostics")
+    print("=" * 50)
+
+    client = new_client('A')
+    for _ in range(3):
+        client.post('/ai-step', json={})
+    assert client.get('/debug/memory').status_code == 404, "Disabled without a token"
+
+    app_module.ADMIN_TOKEN = 'secret'
+    try:
+        headers = {'X-Admin-Token': 'secret'}
+        report = client.get('/debug/memory?top=3', headers=headers).get_json()
+        games = report['games']
+        assert games['games'] == len(app_module.games.resident_games()) >= 1
+        assert len(games['largest']) <= 3
+        largest = games['largest'][0]['bytes']
+        assert largest['total'] == sum(largest[part] for part in ('board', 'log_text', 'images', 'checkpoints', 'other'))
+        assert largest['board'] > 0 and largest['log_text'] > 0
+        assert report['allocations'] is None, "Not tracing until started"
+
+        report = client.get('/debug/memory?trace=start', headers=headers).get_json()
+        assert report['allocations']['since'] == 'start'
+        client.post('/start', json={'mode': 'B'})
+        report = client.get('/debug/memory', headers=headers).get_json()
+        assert report['allocations']['since'] == 'previous snapshot'
+        assert all('size_diff' in stat for stat in report['allocations']['growth'])
+
+        # The periodic log keeps its own baseline: it does not move the endpoint's
+        logged = app_module.memory_report(tracker=app_module.logged_allocations)
+        assert logged['allocations']['since'] == 'start'
+        report = client.get('/debug/memory', headers=headers).get_json()
+        assert report['allocations']['since'] == 'previous snapshot'
+        assert app_module.memory_report(tracker=app_module.logged_allocations)['allocations']['since'] == 'previous snapshot'
+        assert client.get('/debug/memory?trace=stop', headers=headers).get_json()['allocations'] is None
+
+        # A baseline from before a restart is not compared against
+        client.get('/debug/memory?trace=start', headers=headers)
+        logged = app_module.memory_report(tracker=app_module.logged_allocations)
+        assert logged['allocations']['since'] == 'start'
+        client.get('/debug/memory?trace=stop', headers=headers)
+    finally:
+        app_module.ADMIN_TOKEN = None
+
+    print("✅ Test 13 PASSED: Memory report\n")
+
+def test_move_deadline():
+    """ZidanAI degrades step by step as its deadline tightens, and log entries record the level."""
+    print("=" * 50)
+    print("TEST 14: Move Deadlines")
+    print("=" * 50)
+
+    game = GameState(mode='A')
+    game.apply_move(2, 2, 2)
+    ai = zidan_ai.ZidanAI(game, use_book=False)
+    # Fixed cost estimates (seconds), so each budget below selects one level:
+    # with images full 0.46, reduced 0.36, exact 0.315, no images 0.015; without
+    # images full 0.16, reduced 0.06, exact 0.015
+    saved_costs = zidan_ai.cost_estimates()
+    with zidan_ai._cost_lock:
+        zidan_ai._cost_estimates.clear()
+        zidan_ai._cost_estimates.update({'base': 0.010, 'exact': 0.005, 'render': 0.300,
+                                         f'shots:{ai.shots}': 0.150,
+                                         f'shots:{zidan_ai.REDUCED_SHOT_COUNT}': 0.050})
+    try:
+        plans = {(budget, images): ai.plan_degradation(time.perf_counter() + budget, images)
+                 for budget, images in [(0.6, True), (0.40, True), (0.33, True), (0.1, True), (0.005, True),
+                                        (0.2, False), (0.1, False), (0.03, False), (0.005, False), (-1, True)]}
+    finally:
+        with zidan_ai._cost_lock:
+            zidan_ai._cost_estimates.clear()
+            zidan_ai._cost_estimates.update(saved_costs)
+    assert plans == {
+        (0.6, True): zidan_ai.FULL,
+        (0.40, True): zidan_ai.REDUCED_SHOTS,
+        (0.33, True): zidan_ai.EXACT,
+        (0.1, True): zidan_ai.NO_IMAGES,
+        (0.005, True): zidan_ai.HEURISTIC,
+        (0.2, False): zidan_ai.FULL,
+        (0.1, False): zidan_ai.REDUCED_SHOTS,
+        (0.03, False): zidan_ai.EXACT,
+        (0.005, False): zidan_ai.HEURISTIC,
+        (-1, True): zidan_ai.HEURISTIC
+    }, plans
+
+    result = ai.choose_move(render_images=False, deadline=time.perf_counter() - 1)
+    assert result['degradation'] == zidan_ai.HEURISTIC
+    assert result['bell_counts'] is None and result['row'] is not None
+    assert -1 <= result['entanglement_score'] <= 1
+
+    result = ai.choose_move(render_images=False, deadline=time.perf_counter() + 60)
+    assert result['degradation'] == zidan_ai.FULL and sum(result['bell_counts'].values()) == ai.shots
+
+    client = new_client('A')
+    budget = app_module.MOVE_BUDGET
+    app_module.MOVE_BUDGET = 1e-9
+    try:
+        entry = client.post('/ai-step', json={}).get_json()['game_log'][-1]
+    finally:
+        app_module.MOVE_BUDGET = budget
+    assert entry['player'] == 'ZidanAI' and entry['degradation'] == zidan_ai.HEURISTIC
+    assert 'circuit_image_url' not in entry, "No images for heuristic moves"
+    entry = new_client('A').post('/ai-step', json={}).get_json()['game_log'][-1]
+    assert entry['degradation'] in zidan_ai.DEGRADATION_LEVELS
+
+    print("✅ Test 14 PASSED: Deadlines respected\n")
+
+def test_admission_control():
+    """Saturated ZidanAI capacity answers 503 with Retry-After and leaves the game untouched."""
+    print("=" * 50)
+    print("TEST 15: Admission Control")
+    print("=" * 50)
+
+    client_a = new_client('A')
+    client_b = new_client('B')
+    saved = app_module.admission
+    app_module.admission = AdmissionController(concurrency=0, max_queue=0)
+    try:
+        before = client_a.get('/get_state').get_json()
+        response = client_a.post('/ai-step', json={})
+        assert response.status_code == 503 and int(response.headers['Retry-After']) >= 1
+        assert response.get_json()['rejected'] == 1
+        assert client_a.get('/get_state').get_json()['game_log'] == before['game_log']
+
+        response = client_b.post('/play', json={'row': 2, 'col': 2})
+        assert response.status_code == 503
+        state = client_b.get('/get_state').get_json()
+        assert state['current_player'] == 'Human' and state['board'][2][2] == 0, "Human move not applied"
+        assert client_b.get('/admission/stats').get_json()['rejected'] == 2
+    finally:
+        app_module.admission = saved
+
+    assert client_a.post('/ai-step', json={}).status_code == 200
+    assert client_b.post('/play', json={'row': 2, 'col': 2}).status_code == 200
+    assert app_module.admission.stats()['running'] == 0, "Slots are released after each request"
+
+    # A move whose decision was pondered needs no slot
+    ponderer = app_module.ponderer
+    ponderer.enabled = True
+    saved = app_module.admission
+    app_module.admission = ponderer.admission = AdmissionController(concurrency=1, max_queue=0)
+    try:
+        client = new_client('A')
+        with client.session_transaction() as session:
+            game_id = session['game_id']
+        client.post('/ai-step', json={})   # ZidanAI; prefetches RuleBasedAI
+        client.post('/ai-step', json={})   # RuleBasedAI; prefetches ZidanAI with the free slot
+        for future in list(ponderer._sessions[game_id].futures.values()):
+            future.result(timeout=120)
+        hits = ponderer.hits
+        ticket = app_module.admission.acquire('elsewhere')  # saturated: the queue is 0
+        try:
+            response = client.post('/ai-step', json={})
+            assert response.status_code == 200, "Served from pondering despite the saturation"
+            assert ponderer.hits == hits + 1
+            assert client.post('/ai-step', json={}).status_code == 200, "RuleBasedAI needs no slot"
+            assert client.post('/ai-step', json={}).status_code == 503, "Not pondered: refused"
+        finally:
+            app_module.admission.release(ticket)
+    finally:
+        app_module.admission = ponderer.admission = saved
+        ponderer.enabled = False
+        ponderer.cancel(game_id)
+
+    print("✅ Test 15 PASSED: Overload refused cleanly\n")
+
+def test_coalesced_moves():
+    """Duplicate move requests arriving during a move share it; others on the game wait their turn."""
+    print("=" * 50)
+    print("TEST 16: Per-Game Locking")
+    print("=" * 50)
+
+    client = new_client('A')
+    twin = app.test_client()
+    twin.set_cookie('session', client.get_cookie('session').value)
+    log_length = client.get('/get_state').get_json()['log_length']
+
+    calls = []
+    choose_move = zidan_ai.ZidanAI.choose_move
+    def slow_choose_move(self, *args, **kwargs):
+        calls.append(1)
+        time.sleep(0.5)
+        return choose_move(self, *args, **kwargs)
+
+    responses = {}
+    def step(name, c):
+        responses[name] = c.post('/ai-step', json={'since': log_length})
+
+    zidan_ai.ZidanAI.choose_move = slow_choose_move
+    try:
+        first = threading.Thread(target=step, args=('first', client))
+        first.start()
+        while not calls:
+            time.sleep(0.01)
+        step('duplicate', twin)
+        first.join()
+    finally:
+        zidan_ai.ZidanAI.choose_move = choose_move
+
+    assert len(calls) == 1, "The duplicate should not start a second ZidanAI decision"
+    first, duplicate = responses['first'], responses['duplicate']
+    assert first.status_code == duplicate.status_code == 200
+    assert duplicate.headers.get('X-Coalesced') == '1' and 'X-Coalesced' not in first.headers
+    assert first.get_json() == duplicate.get_json()
+    assert client.get('/get_state').get_json()['log_length'] == log_length + 1, "Exactly one move played"
+
+    assert app_module.game_locks.stats()['coalesced'] >= 1
+
+    print("✅ Test 16 PASSED: Duplicate moves coalesced\n")
+
+def test_mode_a_prefetch():
+    """Mode A prefetches the next ply; a prefetch for an outdated position is discarded."""
+    print("=" * 50)
+    print("TEST 17: Mode A Prefetch")
+    print("=" * 50)
+
+    ponderer = app_module.ponderer
+    ponderer.enabled = True
+    try:
+        client = new_client('A')
+        with client.session_transaction() as session:
+            game_id = session['game_id']
+
+        def prefetched():
+            """Wait for the game's prefetched ply; returns the game it is for."""
+            futures = list(ponderer._sessions[game_id].futures.values())
+            assert len(futures) == 1, "One next ply to prefetch"
+            futures[0].result(timeout=120)
+            return app_module.games.get(game_id)
+
+        assert client.post('/ai-step', json={}).status_code == 200
+        prefetched()
+        hits, misses = ponderer.hits, ponderer.misses
+        assert client.post('/ai-step', json={}).status_code == 200
+        assert (ponderer.hits, ponderer.misses) == (hits + 1, misses), "The prefetched ply is consumed"
+
+        # Change the position behind the prefetch's back: it no longer applies
+        game = prefetched()
+        row, col = game.get_legal_moves()[0]
+        game.board[row][col] = game.current_player
+        app_module.games.put(game_id, game)
+        response = client.post('/ai-step', json={})
+        assert response.status_code == 200
+        assert (ponderer.hits, ponderer.misses) == (hits + 1, misses + 1), "The stale prefetch is discarded"
+        entry = client.get('/get_state').get_json()['game_log'][-1]
+        assert entry['move'] != f'({row}, {col})', "The move was decided for the changed position"
+    finally:
+        ponderer.enabled = False
+        ponderer.cancel(game_id)
+
+    print("✅ Test 17 PASSED: Next ply prefetched\n")
+
+def test_rejected_suicide_mode_b():
+    """A ZidanAI suicide in Mode B is logged as a pass, so replayed boards match the game."""
+    print("=" * 50)
+    print("TEST 18: Rejected Suicide in Mode B")
+    print("=" * 50)
+
+    client = new_client('B')
+    with client.session_transaction() as session:
+        game_id = session['game_id']
+
+    # ZidanAI answers in the corners, then tries the point the human has surrounded
+    planned = [(0, 0), (0, 4), (4, 0), (2, 2)]
+    choose_move = zidan_ai.ZidanAI.choose_move
+    def planned_choose_move(self, *args, **kwargs):
+        result = choose_move(self, *args, **kwargs)
+        result['row'], result['col'] = planned.pop(0)
+        return result
+
+    zidan_ai.ZidanAI.choose_move = planned_choose_move
+    try:
+        for row, col in [(1, 2), (2, 1), (2, 3), (3, 2)]:
+            assert client.post('/play', json={'row': row, 'col': col}).status_code == 200
+    finally:
+        zidan_ai.ZidanAI.choose_move = choose_move
+
+    game = app_module.games.get(game_id)
+    entry = game.game_log[-1]
+    assert entry['player'] == 'ZidanAI' and entry['move'] == 'Pass' and entry['suicideRejected']
+    assert game.board[2][2] == 0, "The suicide stone is not placed"
+    assert game.board_at(len(game.game_log) - 1) == game.board
+    assert game.log_view()[-1]['board'] == game.print_board(), "Log board matches the real board"
+
+    print("✅ Test 18 PASSED: Suicide logged as a pass\n")
+
+def run_all_tests():
+    """Run all app tests."""
+    tests = [
+        test_incremental_log,
+        test_incremental_log_mode_b,
+        test_image_urls,
+        test_autoplay_stream,
+        test_job_api,
+        test_compact_format,
+        test_move_only_log,
+        test_stateless_move_api,
+        test_get_state_conditional,
+        test_stage_timings,
+        test_metrics,
+        test_debug_profile,
+        test_debug_memory,
+        test_move_deadline,
+        test_admission_control,
+        test_coalesced_moves,
+        test_mode_a_prefetch,
+        test_rejected_suicide_mode_b
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ TEST FAILED: {e}\n")
+            failed += 1
+        except Exception as e:
+            print(f"❌ TEST ERROR: {e}\n")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"TEST SUMMARY: {passed} passed, {failed} failed")
+    print("=" * 50 + "\n")
+
+    return failed == 0
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,279 @@
+"""
+test_asgi.py - Tests for the async (ASGI) serving mode
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+import warnings
+warnings.filterwarnings('ignore')
+
+os.environ.setdefault('QGO_PONDER', '0')
+os.environ.setdefault('QGO_OPENING_BOOK', '')
+
+import app as app_module
+import zidan_ai
+from admission import AdmissionController
+from asgi import QuantumGoASGI
+
+async def call(asgi, method, path, body=None, cookie=None, query=b'', disconnect=None):
+    """Send one HTTP request to an ASGI app; returns (status, headers dict, body bytes).
+    The client stays connected until the response ends or disconnect (an asyncio.Event) is set.
+    """
+    data = json.dumps(body).encode('utf-8') if body is not None else b''
+    headers = [(b'content-type', b'application/json')] if body is not None else []
+    if cookie:
+        headers.append((b'cookie', cookie.encode('latin-1')))
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query,
+             'headers': headers, 'server': ('testserver', 80), 'client': ('127.0.0.1', 1234)}
+    messages = [{'type': 'http.request', 'body': data, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await (disconnect or asyncio.Event()).wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi(scope, receive, send)
+    start = sent[0]
+    response_headers = {name.decode(): value.decode() for name, value in start['headers']}
+    return start['status'], response_headers, b''.join(m.get('body', b'') for m in sent[1:])
+
+async def new_game(asgi, mode='A'):
+    status, headers, _ = await call(asgi, 'POST', '/start', {'mode': mode})
+    assert status == 200
+    return headers['set-cookie'].split(';', 1)[0]
+
+def slow_decisions(delay, calls):
+    """Patch ZidanAI.choose_move to take at least delay seconds; returns the original."""
+    original = zidan_ai.ZidanAI.choose_move
+    def slow(self, *args, **kwargs):
+        calls.append(1)
+        time.sleep(delay)
+        return original(self, *args, **kwargs)
+    zidan_ai.ZidanAI.choose_move = slow
+    return original
+
+def test_routes():
+    """The async routes and the bridged Flask routes behave like the WSGI app."""
+    print("=" * 50)
+    print("TEST 1: ASGI Routes")
+    print("=" * 50)
+
+    async def scenario():
+        asgi = QuantumGoASGI(threads=4)
+        cookie = await new_game(asgi, 'A')
+        status, _, body = await call(asgi, 'POST', '/ai-step', {}, cookie)
+        assert status == 200 and json.loads(body)['log_length'] == 2
+        status, headers, body = await call(asgi, 'GET', '/get_state', cookie=cookie)
+        assert status == 200 and json.loads(body)['turn_count'] == 1
+        assert (await call(asgi, 'GET', '/ai-step'))[0] == 405
+
+        cookie_b = await new_game(asgi, 'B')
+        status, _, body = await call(asgi, 'POST', '/play', {'row': 2, 'col': 2}, cookie_b)
+        assert status == 200 and json.loads(body)['current_player'] == 'Human'
+
+        status, headers, body = await call(asgi, 'GET', '/metrics')
+        assert status == 200 and b'qgo_games_created_total' in body
+        assert (await call(asgi, 'GET', '/get_state'))[0] == 404, "No session, no game"
+
+    asyncio.run(scenario())
+    print("✅ Test 1 PASSED: Routes served\n")
+
+def test_waiting_moves_hold_no_threads():
+    """Moves queued for ZidanAI wait as tasks: a 2-thread pool still answers other requests."""
+    print("=" * 50)
+    print("TEST 2: Waiting Without Threads")
+    print("=" * 50)
+
+    calls = []
+    saved = app_module.admission
+    app_module.admission = AdmissionController(concurrency=1, max_queue=50, max_wait=30)
+    original = slow_decisions(0.2, calls)
+
+    async def scenario():
+        asgi = QuantumGoASGI(threads=2)
+        cookies = [await new_game(asgi, 'A') for _ in range(6)]
+        moves = [asyncio.ensure_future(call(asgi, 'POST', '/ai-step', {}, cookie)) for cookie in cookies]
+        while app_module.admission.stats()['queue_depth'] < 4:
+            await asyncio.sleep(0.01)
+        start = time.perf_counter()
+        status, _, _ = await call(asgi, 'GET', '/get_state', cookie=cookies[0])
+        poll_time = time.perf_counter() - start
+        results = await asyncio.gather(*moves)
+        return poll_time, results
+
+    try:
+        poll_time, results = asyncio.run(scenario())
+    finally:
+        zidan_ai.ZidanAI.choose_move = original
+        app_module.admission = saved
+
+    print(f"  /get_state answered in {poll_time * 1000:.0f} ms while 5 moves waited")
+    assert all(status == 200 for status, _, _ in results)
+    assert len(calls) == 6
+    assert poll_time < 0.5, "Queued moves should not occupy the thread pool"
+
+    print("✅ Test 2 PASSED: Waiting moves hold no threads\n")
+
+def test_duplicates_and_overload():
+    """Identical moves in flight share one response; saturation answers 503."""
+    print("=" * 50)
+    print("TEST 3: Coalescing and Overload")
+    print("=" * 50)
+
+    calls = []
+    original = slow_decisions(0.3, calls)
+
+    async def duplicates():
+        asgi = QuantumGoASGI(threads=4)
+        cookie = await new_game(asgi, 'A')
+        first, second = await asyncio.gather(call(asgi, 'POST', '/ai-step', {}, cookie),
+                                             call(asgi, 'POST', '/ai-step', {}, cookie))
+        state = json.loads((await call(asgi, 'GET', '/get_state', cookie=cookie))[2])
+        return first, second, state
+
+    try:
+        first, second, state = asyncio.run(duplicates())
+    finally:
+        zidan_ai.ZidanAI.choose_move = original
+    assert len(calls) == 1 and state['log_length'] == 2, "One move for two identical requests"
+    assert first[0] == second[0] == 200 and first[2] == second[2]
+    assert second[1].get('x-coalesced') == '1'
+
+    # The first requester going away does not cost the duplicate its response
+    async def leader_gone():
+        asgi = QuantumGoASGI(threads=4)
+        cookie = await new_game(asgi, 'A')
+        leader = asyncio.ensure_future(call(asgi, 'POST', '/ai-step', {}, cookie))
+        while not calls:
+            await asyncio.sleep(0.01)
+        duplicate = asyncio.ensure_future(call(asgi, 'POST', '/ai-step', {}, cookie))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        response = await duplicate
+        state = json.loads((await call(asgi, 'GET', '/get_state', cookie=cookie))[2])
+        return leader.cancelled(), response, state
+
+    calls.clear()
+    original = slow_decisions(0.3, calls)
+    try:
+        cancelled, (status, headers, _), state = asyncio.run(leader_gone())
+    finally:
+        zidan_ai.ZidanAI.choose_move = original
+    assert cancelled and status == 200 and headers.get('x-coalesced') == '1'
+    assert len(calls) == 1 and state['log_length'] == 2, "The shared move finished once"
+
+    saved = app_module.admission
+    app_module.admission = AdmissionController(concurrency=0, max_queue=0)
+    try:
+        async def overload():
+            asgi = QuantumGoASGI(threads=2)
+            cookie = await new_game(asgi, 'A')
+            return await call(asgi, 'POST', '/ai-step', {}, cookie)
+        status, headers, body = asyncio.run(overload())
+    finally:
+        app_module.admission = saved
+    assert status == 503 and int(headers['retry-after']) >= 1 and json.loads(body)['rejected'] == 1
+
+    print("✅ Test 3 PASSED: Duplicates coalesced, overload refused\n")
+
+def events(body):
+    """Names and data of the Server-Sent Events in a stream body."""
+    parsed = []
+    for block in body.decode('utf-8').strip().split('\n\n'):
+        name, data = block.split('\n', 1)
+        parsed.append((name[len('event: '):], json.loads(data[len('data: '):])))
+    return parsed
+
+def test_autoplay_stream():
+    """Autoplay viewers waiting between plies hold no threads; a disconnect stops the game."""
+    print("=" * 50)
+    print("TEST 4: Async Autoplay Stream")
+    print("=" * 50)
+
+    saved = app_module.admission
+    app_module.admission = AdmissionController(concurrency=1, max_queue=50, max_wait=30)
+
+    async def viewers():
+        asgi = QuantumGoASGI(threads=2, bridge_threads=1)
+        cookies = [await new_game(asgi, 'A') for _ in range(4)]
+        streams = [asyncio.ensure_future(call(asgi, 'GET', '/autoplay/stream', cookie=cookie,
+                                              query=b'since=1&delay=1'))
+                   for cookie in cookies]
+        await asyncio.sleep(0.5)
+        start = time.perf_counter()
+        status, _, _ = await call(asgi, 'GET', '/get_state', cookie=cookies[0])
+        poll_time = time.perf_counter() - start
+        for stream in streams:
+            stream.cancel()
+        await asyncio.gather(*streams, return_exceptions=True)
+        return poll_time, await call(asgi, 'GET', '/autoplay/stream', cookie=cookies[0], query=b'since=1')
+
+    async def disconnecting():
+        asgi = QuantumGoASGI(threads=2)
+        cookie = await new_game(asgi, 'A')
+        gone = asyncio.Event()
+        stream = asyncio.ensure_future(call(asgi, 'GET', '/autoplay/stream', cookie=cookie,
+                                            query=b'delay=5', disconnect=gone))
+        await asyncio.sleep(0.5)
+        gone.set()
+        response = await asyncio.wait_for(stream, 5)
+        state = json.loads((await call(asgi, 'GET', '/get_state', cookie=cookie))[2])
+        return response, state
+
+    try:
+        poll_time, (status, headers, body) = asyncio.run(viewers())
+        (_, _, partial), state = asyncio.run(disconnecting())
+    finally:
+        app_module.admission = saved
+
+    print(f"  /get_state answered in {poll_time * 1000:.0f} ms during 4 autoplay streams")
+    assert poll_time < 0.5, "Streams waiting between plies should not occupy the pool"
+    assert status == 200 and headers['content-type'].startswith('text/event-stream')
+    names = [name for name, _ in events(body)]
+    assert names[-1] == 'end' and set(names[:-1]) == {'ply'}
+    assert events(body)[-1][1]['game_over']
+
+    assert [name for name, _ in events(partial)] == ['ply'], "One ply, then the client left"
+    assert not state['game_over'] and state['log_length'] == 2
+
+    print("✅ Test 4 PASSED: Autoplay waits without threads\n")
+
+def run_all_tests():
+    """Run all ASGI tests."""
+    tests = [
+        test_routes,
+        test_waiting_moves_hold_no_threads,
+        test_duplicates_and_overload,
+        test_autoplay_stream
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ TEST FAILED: {e}\n")
+            failed += 1
+        except Exception as e:
+            print(f"❌ TEST ERROR: {e}\n")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"TEST SUMMARY: {passed} passed, {failed} failed")
+    print("=" * 50 + "\n")
+
+    return failed == 0
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
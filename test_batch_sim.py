@@ -0,0 +1,154 @@
+"""
+test_batch_sim.py - Differential tests: batch_sim.BatchSimulator vs GameState
+"""
+import random
+import sys
+import warnings
+warnings.filterwarnings('ignore')
+
+import numpy as np
+
+from game import GameState, ZIDAN_AI, RULES_AI, EMPTY
+from zidan_ai import ZidanAI
+from rules_ai import RuleBasedAI
+from batch_sim import BatchSimulator, score_breakdown, play_moves, PASS
+
+CORPUS_SIZE = 60
+
+def random_opening(seed):
+    """Play a few random legal moves from the empty board (suicide = pass)."""
+    rng = random.Random(seed)
+    game = GameState(mode='A')
+    for _ in range(rng.randint(0, 10)):
+        row, col = rng.choice(game.get_legal_moves())
+        success, _, _, _ = game.try_move(row, col, game.current_player)
+        if not success:
+            game.pass_turn()
+        game.next_turn()
+        if game.check_game_over():
+            break
+    return game
+
+def play_reference(game):
+    """Play a game out with GameState and the real AIs (ZidanAI in exact mode).
+    Returns the list of moves as cell indices (PASS for passes).
+    """
+    moves = []
+    while not game.game_over:
+        player = game.current_player
+        if player == ZIDAN_AI:
+            result = ZidanAI(game, use_book=False, shots=None).choose_move(render_images=False)
+            row, col = result['row'], result['col']
+        else:
+            row, col, _ = RuleBasedAI(game, use_book=False).choose_move()
+
+        if row is not None and game.try_move(row, col, player)[0]:
+            moves.append(game.rc_to_idx(row, col))
+        else:
+            game.pass_turn()
+            moves.append(PASS)
+        game.next_turn()
+        game.check_game_over()
+    return moves
+
+def test_scores_match():
+    """Vectorised score breakdown equals GameState.get_score_breakdown."""
+    print("=" * 50)
+    print("TEST 1: Score Breakdown Matches")
+    print("=" * 50)
+
+    games = [random_opening(seed) for seed in range(CORPUS_SIZE)]
+    boards = np.array([[cell for row in g.board for cell in row] for g in games], dtype=np.int8)
+    for player in (ZIDAN_AI, RULES_AI):
+        batch = score_breakdown(boards, player)
+        for i, game in enumerate(games):
+            expected = game.get_score_breakdown(player)
+            actual = {key: int(values[i]) for key, values in batch.items()}
+            assert actual == expected, f"Score mismatch: {actual} != {expected}\n{game.print_board()}"
+
+    print("✅ Test 1 PASSED: Scores match\n")
+
+def test_captures_and_suicide_match():
+    """Vectorised try_move agrees with GameState.try_move on every empty cell."""
+    print("=" * 50)
+    print("TEST 2: Captures and Suicide Match")
+    print("=" * 50)
+
+    checked = 0
+    for seed in range(CORPUS_SIZE):
+        game = random_opening(seed + 1000)
+        for player in (ZIDAN_AI, RULES_AI):
+            cells = [game.rc_to_idx(r, c) for r, c in game.get_legal_moves()]
+            if not cells:
+                continue
+            board = np.array([cell for row in game.board for cell in row], dtype=np.int8)
+            boards = np.repeat(board[None, :], len(cells), axis=0)
+            players = np.full(len(cells), player, dtype=np.int8)
+            results, played = play_moves(boards, players, np.array(cells))
+            for k, idx in enumerate(cells):
+                copy = game.copy_position()
+                success, _, _, _ = copy.try_move(*copy.idx_to_rc(idx), player)
+                expected = [cell for row in copy.board for cell in row]
+                assert bool(played[k]) == success, f"Legality mismatch at {idx}"
+                assert results[k].tolist() == expected, f"Board mismatch at {idx}"
+                checked += 1
+
+    print(f"  Checked {checked} moves")
+    print("✅ Test 2 PASSED: try_move matches\n")
+
+def test_full_games_match():
+    """Whole games match GameState move for move."""
+    print("=" * 50)
+    print("TEST 3: Full Games Match")
+    print("=" * 50)
+
+    openings = [g for g in (random_opening(seed) for seed in range(CORPUS_SIZE)) if not g.game_over]
+    sim = BatchSimulator.from_game_states(openings, record_moves=True).run()
+    results = sim.results()
+
+    for i, game in enumerate(openings):
+        reference_moves = play_reference(game)
+        batch_moves = [int(step[i]) for step in sim.moves if step[i] != -2]
+        assert batch_moves == reference_moves, f"Game {i}: moves differ"
+        assert sim.boards[i].tolist() == [cell for row in game.board for cell in row]
+        assert results[i]['winner'] == game.winner, f"Game {i}: winner differs"
+        assert results[i]['turns'] == game.turn_count
+        assert results[i]['scores'] == {
+            'ZidanAI': game.calculate_score(ZIDAN_AI),
+            'RuleBasedAI': game.calculate_score(RULES_AI)
+        }
+
+    print(f"  Compared {len(openings)} games")
+    print("✅ Test 3 PASSED: Batch simulator agrees with GameState\n")
+
+def run_all_tests():
+    """Run all batch simulator tests."""
+    tests = [
+        test_scores_match,
+        test_captures_and_suicide_match,
+        test_full_games_match
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ TEST FAILED: {e}\n")
+            failed += 1
+        except Exception as e:
+            print(f"❌ TEST ERROR: {e}\n")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"TEST SUMMARY: {passed} passed, {failed} failed")
+    print("=" * 50 + "\n")
+
+    return failed == 0
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,63 @@
+"""
+test_benchmark.py - Smoke test for the benchmark runner
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+def test_save_and_compare():
+    """One fast benchmark is recorded as a baseline and compared against it."""
+    print("=" * 50)
+    print("TEST 1: Benchmark Smoke Run")
+    print("=" * 50)
+
+    baseline = os.path.join(tempfile.mkdtemp(), 'baseline.json')
+    command = [sys.executable, 'benchmark.py', '--filter', 'game.is_suicide', '--rounds', '1',
+               '--min-time', '0.001', '--baseline', baseline]
+    cwd = os.path.dirname(os.path.abspath(__file__))
+
+    saved = subprocess.run(command + ['--save'], cwd=cwd, capture_output=True, text=True, timeout=300)
+    assert saved.returncode == 0, saved.stderr
+    with open(baseline) as f:
+        results = json.load(f)['results']
+    assert list(results) == ['game.is_suicide'] and results['game.is_suicide'] > 0
+
+    # Generous threshold: only the comparison path is under test, not the timing
+    compared = subprocess.run(command + ['--threshold', '100'], cwd=cwd, capture_output=True, text=True, timeout=300)
+    print(compared.stdout)
+    assert compared.returncode == 0, compared.stderr
+    assert 'game.is_suicide' in compared.stdout and 'No baseline' not in compared.stdout
+
+    print("✅ Test 1 PASSED: Benchmark runs\n")
+
+def run_all_tests():
+    """Run all benchmark tests."""
+    tests = [
+        test_save_and_compare
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ TEST FAILED: {e}\n")
+            failed += 1
+        except Exception as e:
+            print(f"❌ TEST ERROR: {e}\n")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"TEST SUMMARY: {passed} passed, {failed} failed")
+    print("=" * 50 + "\n")
+
+    return failed == 0
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
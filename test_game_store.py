@@ -0,0 +1,341 @@
+"""
+test_game_store.py - Tests for game snapshots and the game stores
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from game import GameState, HUMAN, ZIDAN_AI, LOG_CHECKPOINT_INTERVAL
+from game_store import MemoryGameStore, HibernatingGameStore, SQLiteGameStore, create_store
+
+class FakeClock:
+    """Manually advanced clock for TTL tests."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def sample_game():
+    """A Mode B game with a couple of moves and log entries."""
+    game = GameState(mode='B')
+    game.try_move(2, 2, HUMAN)
+    game.game_log.append({'turn': 1, 'player': 'Human', 'move': '(2, 2)', 'captures': []})
+    game.next_turn()
+    game.try_move(1, 2, ZIDAN_AI)
+    game.game_log.append({'turn': 2, 'player': 'ZidanAI', 'move': '(1, 2)', 'bell_counts': {'00': 512, '11': 512}})
+    game.next_turn()
+    game.consecutive_passes = 1
+    return game
+
+def test_snapshot_roundtrip():
+    """to_snapshot/from_snapshot preserve the whole game."""
+    print("=" * 50)
+    print("TEST 1: Snapshot Roundtrip")
+    print("=" * 50)
+
+    game = sample_game()
+    data = game.to_snapshot()
+    restored = GameState.from_snapshot(data)
+    print(f"  Snapshot size: {len(data)} bytes")
+
+    assert restored.board == game.board
+    assert restored.mode == 'B'
+    assert restored.turn_count == game.turn_count
+    assert restored.current_player == game.current_player
+    assert restored.consecutive_passes == 1
+    assert restored.players == game.players
+    assert restored.game_log == game.game_log
+
+    game.check_game_over()
+    game.game_over = True
+    game.winner = "Draw"
+    restored = GameState.from_snapshot(game.to_snapshot())
+    assert restored.game_over and restored.winner == "Draw"
+
+    print("✅ Test 1 PASSED: Snapshot roundtrip works\n")
+
+def test_memory_lru_eviction():
+    """Least recently used games are evicted past max_games."""
+    print("=" * 50)
+    print("TEST 2: Memory Store LRU Eviction")
+    print("=" * 50)
+
+    store = MemoryGameStore(max_games=2, ttl=None)
+    store.put('a', GameState())
+    store.put('b', GameState())
+    assert store.get('a') is not None  # 'a' is now most recently used
+    store.put('c', GameState())
+
+    assert len(store) == 2
+    assert 'b' not in store, "Least recently used game should be evicted"
+    assert 'a' in store and 'c' in store
+
+    print("✅ Test 2 PASSED: LRU eviction works\n")
+
+def test_memory_ttl_eviction():
+    """Idle games expire after the TTL."""
+    print("=" * 50)
+    print("TEST 3: Memory Store TTL Eviction")
+    print("=" * 50)
+
+    clock = FakeClock()
+    store = MemoryGameStore(max_games=100, ttl=60, clock=clock)
+    store.put('idle', GameState())
+    store.put('busy', GameState())
+
+    clock.now += 45
+    assert store.get('busy') is not None
+    clock.now += 30
+    assert store.get('idle') is None, "Idle game should have expired"
+    assert store.get('busy') is not None, "Recently used game should survive"
+
+    print("✅ Test 3 PASSED: TTL eviction works\n")
+
+def test_sqlite_store_shared():
+    """Two SQLite stores on one file see each other's games."""
+    print("=" * 50)
+    print("TEST 4: SQLite Store")
+    print("=" * 50)
+
+    clock = FakeClock()
+    path = os.path.join(tempfile.mkdtemp(), 'games.db')
+    store1 = SQLiteGameStore(path, ttl=60, clock=clock)
+    store2 = SQLiteGameStore(path, ttl=60, clock=clock)
+
+    game_id = store1.new_id()
+    store1.put(game_id, sample_game())
+    loaded = store2.get(game_id)
+    assert loaded is not None, "Game should be visible to the second store"
+    assert loaded.board == sample_game().board
+    assert loaded.game_log == sample_game().game_log
+    assert len(store2) == 1
+
+    loaded.try_move(0, 0, HUMAN)
+    store2.put(game_id, loaded)
+    assert store1.get(game_id).board[0][0] == HUMAN
+
+    clock.now += 120
+    assert store1.get(game_id) is None, "Expired game should be gone"
+    assert len(store1) == 0
+
+    mode = store1._connect().execute('PRAGMA journal_mode').fetchone()[0]
+    assert mode == 'wal', f"Expected WAL mode, got {mode}"
+    assert isinstance(create_store('sqlite:///' + path), SQLiteGameStore)
+
+    print("✅ Test 4 PASSED: SQLite store works\n")
+
+def test_hibernation():
+    """Idle games move to disk and come back on the next access."""
+    print("=" * 50)
+    print("TEST 5: Hibernating Store")
+    print("=" * 50)
+
+    clock = FakeClock()
+    directory = tempfile.mkdtemp()
+    store = HibernatingGameStore(directory, hibernate_after=30, max_games=2, ttl=None, clock=clock)
+    store.put('idle', sample_game())
+    clock.now += 20
+    store.put('active', GameState())
+    clock.now += 20
+    store.get('active')
+
+    assert len(store) == 1, "Idle game should have left memory"
+    assert os.path.exists(os.path.join(directory, 'idle.qgo')), "Snapshot should be on disk"
+    print(f"  Stats after hibernation: {store.stats()}")
+
+    game = store.get('idle')
+    assert game is not None, "Hibernated game should be rehydrated"
+    assert game.board == sample_game().board and game.game_log == sample_game().game_log
+    assert not os.path.exists(os.path.join(directory, 'idle.qgo'))
+    assert store.stats()['rehydrations'] == 1
+
+    # Overflowing max_games hibernates instead of dropping
+    store.put('third', GameState())
+    store.put('fourth', GameState())
+    assert len(store) == 2
+    assert store.hibernated_count() >= 1
+    assert all(store.get(game_id) is not None for game_id in ['idle', 'active', 'third', 'fourth'])
+
+    assert store.get('../escape') is None
+
+    print("✅ Test 5 PASSED: Hibernation works\n")
+
+def test_log_replay():
+    """board_at() replays moves and captures from checkpoints, also after a snapshot roundtrip."""
+    print("=" * 50)
+    print("TEST 6: Move-Only Log Replay")
+    print("=" * 50)
+
+    rng = random.Random(7)
+    game = GameState(mode='A')
+    game.game_log.append({'turn': 0, 'player': 'System', 'message': 'Game started in Mode A'})
+    boards = [game.get_board_snapshot()]
+    while not game.game_over:
+        player = game.current_player
+        row, col = rng.choice(game.get_legal_moves())
+        success, captured, _, _ = game.try_move(row, col, player)
+        if success:
+            entry = {'move': f'({row}, {col})', 'captures': captured}
+        else:
+            game.pass_turn()
+            entry = {'move': 'Pass', 'captures': []}
+        game.game_log.append({'turn': game.turn_count + 1, 'player': game.get_player_name(player), **entry})
+        boards.append(game.get_board_snapshot())
+        game.next_turn()
+        game.check_game_over()
+
+    assert any(entry.get('captures') for entry in game.game_log), "Corpus should include captures"
+    restored = GameState.from_snapshot(game.to_snapshot())
+    for state in (game, restored):
+        for index in reversed(range(len(boards))):
+            assert state.board_at(index) == boards[index], f"Board after entry {index} differs"
+    assert len(game._log_checkpoints) == (len(boards) - 1) // LOG_CHECKPOINT_INTERVAL + 1
+
+    view = restored.log_view(3, 4)[0]
+    position = GameState()
+    position.board = boards[3]
+    assert view['board'] == position.print_board() and 'board' not in restored.game_log[3]
+
+    print("✅ Test 6 PASSED: Log replay works\n")
+
+def test_hibernation_writes():
+    """Snapshots are written outside the store lock; games used meanwhile or
+    whose write fails stay in memory.
+    """
+    print("=" * 50)
+    print("TEST 7: Hibernation Writes")
+    print("=" * 50)
+
+    clock = FakeClock()
+    directory = tempfile.mkdtemp()
+    store = HibernatingGameStore(directory, hibernate_after=30, max_games=10, ttl=None, clock=clock)
+    write = store._write_snapshot
+    seen = []
+
+    def touching_write(path, game):
+        assert not store._lock.locked(), "Disk I/O must not hold the store lock"
+        seen.append(path)
+        store.get('busy')  # a request uses the game while it is being written
+        write(path, game)
+
+    store.put('busy', sample_game())
+    clock.now += 40
+    store._write_snapshot = touching_write
+    store.put('other', GameState())
+    assert seen, "The idle game should have been written"
+    assert store.get('busy') is not None and len(store) == 2, "A game used meanwhile stays in memory"
+    assert not os.path.exists(os.path.join(directory, 'busy.qgo')), "Its stale snapshot is removed"
+
+    def failing_write(path, game):
+        raise OSError(28, 'No space left on device')
+
+    store._write_snapshot = failing_write
+    clock.now += 40
+    store.put('other', GameState())  # 'busy' is idle again
+    assert store.stats()['hibernate_errors'] == 1
+    assert store.get('busy') is not None, "A game that could not be written stays in memory"
+    assert store.hibernated_count() == 0
+
+    store._write_snapshot = write
+    clock.now += 40
+    store.put('new', GameState())
+    assert len(store) == 1 and store.hibernated_count() == 2, "Hibernation resumes once writes succeed"
+
+    print("✅ Test 7 PASSED: Hibernation writes are safe\n")
+
+def test_rehydration_and_sweep():
+    """Snapshots are read and swept outside the store lock, and the
+    hibernated count is kept without scanning the directory.
+    """
+    print("=" * 50)
+    print("TEST 8: Rehydration and Sweep")
+    print("=" * 50)
+
+    clock = FakeClock()
+    directory = tempfile.mkdtemp()
+    store = HibernatingGameStore(directory, hibernate_after=30, max_games=10, ttl=3600,
+                                 clock=clock, sweep_interval=0)
+    store.put('idle', sample_game())
+    store.put('gone', GameState())
+    clock.now += 40
+    store.put('active', GameState())
+    assert store.hibernated_count() == 2
+
+    read = store._read_snapshot
+    def unlocked_read(path):
+        assert not store._lock.locked(), "Rehydration must not hold the store lock"
+        assert store.get('active') is not None, "Other games are served meanwhile"
+        return read(path)
+    store._read_snapshot = unlocked_read
+    assert store.get('idle').game_log == sample_game().game_log
+    assert store.hibernated_count() == 1 and store.stats()['rehydrations'] == 1
+
+    # Expired snapshots are swept outside the lock, and the count follows
+    scandir = os.scandir
+    def unlocked_scandir(path):
+        assert not store._lock.locked(), "Sweeping must not hold the store lock"
+        return scandir(path)
+    old = time.time() - 7200
+    os.utime(os.path.join(directory, 'gone.qgo'), (old, old))
+    os.scandir = unlocked_scandir
+    try:
+        store.put('active', GameState())
+    finally:
+        os.scandir = scandir
+    assert not os.path.exists(os.path.join(directory, 'gone.qgo'))
+
+    def no_scandir(path):
+        raise AssertionError("stats() should not scan the directory")
+    os.scandir = no_scandir
+    try:
+        assert store.stats()['hibernated'] == 0 and 'gone' not in store
+    finally:
+        os.scandir = scandir
+
+    # A new store picks up snapshots left by a previous one
+    clock.now += 40
+    store.put('new', GameState())
+    assert HibernatingGameStore(directory, ttl=None).hibernated_count() == store.hibernated_count() == 2
+
+    print("✅ Test 8 PASSED: Disk I/O outside the lock\n")
+
+def run_all_tests():
+    """Run all game store tests."""
+    tests = [
+        test_snapshot_roundtrip,
+        test_memory_lru_eviction,
+        test_memory_ttl_eviction,
+        test_sqlite_store_shared,
+        test_hibernation,
+        test_log_replay,
+        test_hibernation_writes,
+        test_rehydration_and_sweep
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ TEST FAILED: {e}\n")
+            failed += 1
+        except Exception as e:
+            print(f"❌ TEST ERROR: {e}\n")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"TEST SUMMARY: {passed} passed, {failed} failed")
+    print("=" * 50 + "\n")
+
+    return failed == 0
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,132 @@
+"""
+test_gamelocks.py - Tests for per-game move locking and coalescing
+"""
+import sys
+import threading
+import time
+
+from gamelocks import GameLocks
+
+def test_serialised_per_game():
+    """Moves on one game never overlap; moves on different games do."""
+    print("=" * 50)
+    print("TEST 1: Per-Game Serialisation")
+    print("=" * 50)
+
+    locks = GameLocks()
+    active = {'g1': 0, 'g2': 0}
+    overlap = {'g1': 0, 'g2': 0}
+    both = []
+    guard = threading.Lock()
+
+    def move(game_id, n):
+        with guard:
+            active[game_id] += 1
+            overlap[game_id] = max(overlap[game_id], active[game_id])
+            both.append(active['g1'] > 0 and active['g2'] > 0)
+        time.sleep(0.05)
+        with guard:
+            active[game_id] -= 1
+        return n
+
+    threads = [threading.Thread(target=locks.run, args=(game_id, ('move', n), lambda g=game_id, n=n: move(g, n)))
+               for n in range(3) for game_id in ('g1', 'g2')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert overlap == {'g1': 1, 'g2': 1}, "Moves on one game must not overlap"
+    assert any(both), "Different games should not block each other"
+    assert locks.stats()['games_locked'] == 0, "Unused locks are dropped"
+    assert locks.stats()['contended'] >= 2
+
+    print("✅ Test 1 PASSED: Moves serialised per game\n")
+
+def test_coalescing():
+    """Identical calls during a call in progress share its result (or its error)."""
+    print("=" * 50)
+    print("TEST 2: Coalescing")
+    print("=" * 50)
+
+    locks = GameLocks()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'moved'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(locks.run('g', 'ai-step', slow)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(locks.run('g', 'ai-step', slow)))
+                 for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while locks.stats()['coalesced'] < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(results) == [('moved', False)] + [('moved', True)] * 3
+
+    # Once the call finished, the same key runs again
+    assert locks.run('g', 'ai-step', lambda: 'again') == ('again', False)
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("illegal")
+    errors = []
+    def call():
+        try:
+            locks.run('g', 'play', failing)
+        except ValueError as e:
+            errors.append(str(e))
+    started.clear()
+    first = threading.Thread(target=call)
+    first.start()
+    started.wait(5)
+    call()
+    first.join()
+    assert errors == ['illegal', 'illegal']
+
+    print("✅ Test 2 PASSED: Duplicates coalesced\n")
+
+def run_all_tests():
+    """Run all game lock tests."""
+    tests = [
+        test_serialised_per_game,
+        test_coalescing
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ TEST FAILED: {e}\n")
+            failed += 1
+        except Exception as e:
+            print(f"❌ TEST ERROR: {e}\n")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"TEST SUMMARY: {passed} passed, {failed} failed")
+    print("=" * 50 + "\n")
+
+    return failed == 0
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,97 @@
+"""
+test_jobs.py - Tests for the bounded job queue
+"""
+import sys
+import threading
+
+from jobs import JobQueue, QueueFull, JobPending, DONE, FAILED
+
+def test_jobs_complete():
+    """Submitted jobs run on the workers and report their results."""
+    print("=" * 50)
+    print("TEST 1: Jobs Complete")
+    print("=" * 50)
+
+    queue = JobQueue(workers=2, max_queue=8)
+    submitted = [queue.submit(lambda i=i: i * i) for i in range(5)]
+    for i, job in enumerate(submitted):
+        assert job.wait(5), "Job should finish"
+        assert job.status == DONE and job.result == i * i
+        assert queue.get(job.id) is job
+
+    failing = queue.submit(lambda: 1 / 0)
+    failing.wait(5)
+    assert failing.status == FAILED and 'division' in failing.to_dict()['error']
+
+    stats = queue.stats()
+    print(f"  Stats: {stats}")
+    assert stats['completed'] == 5 and stats['failed'] == 1 and stats['queue_depth'] == 0
+
+    print("✅ Test 1 PASSED: Jobs complete\n")
+
+def test_queue_bounds():
+    """A full queue rejects work and a key has at most one pending job."""
+    print("=" * 50)
+    print("TEST 2: Queue Bounds")
+    print("=" * 50)
+
+    release = threading.Event()
+    queue = JobQueue(workers=1, max_queue=2)
+    running = queue.submit(release.wait, key='game-1')
+
+    try:
+        queue.submit(lambda: None, key='game-1')
+        assert False, "Second job for the same key should be refused"
+    except JobPending as e:
+        assert e.job is running
+
+    # The worker holds one job; two more fill the queue
+    for _ in range(50):
+        if queue.stats()['running'] == 1:
+            break
+        running.wait(0.01)
+    queue.submit(lambda: None)
+    queue.submit(lambda: None)
+    try:
+        queue.submit(lambda: None)
+        assert False, "Full queue should refuse the job"
+    except QueueFull:
+        pass
+    assert queue.stats()['rejected'] == 1 and queue.stats()['queue_depth'] == 2
+
+    release.set()
+    assert running.wait(5)
+    assert queue.submit(lambda: 'next', key='game-1').wait(5), "Key is free once its job finished"
+
+    print("✅ Test 2 PASSED: Queue bounds hold\n")
+
+def run_all_tests():
+    """Run all job queue tests."""
+    tests = [
+        test_jobs_complete,
+        test_queue_bounds
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ TEST FAILED: {e}\n")
+            failed += 1
+        except Exception as e:
+            print(f"❌ TEST ERROR: {e}\n")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"TEST SUMMARY: {passed} passed, {failed} failed")
+    print("=" * 50 + "\n")
+
+    return failed == 0
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,75 @@
+"""
+test_loadgen.py - Tests for the load generator
+"""
+import os
+import sys
+import warnings
+warnings.filterwarnings('ignore')
+
+os.environ.setdefault('QGO_PONDER', '0')
+
+from loadgen import percentile, run_load, serve_in_process
+
+def test_percentile():
+    """Nearest-rank percentiles of a sorted sample."""
+    print("=" * 50)
+    print("TEST 1: Percentiles")
+    print("=" * 50)
+
+    samples = list(range(1, 101))
+    assert percentile(samples, 0.50) == 50
+    assert percentile(samples, 0.95) == 95
+    assert percentile(samples, 0.99) == 99
+    assert percentile([7], 0.99) == 7
+    assert percentile([], 0.5) == 0.0
+
+    print("✅ Test 1 PASSED: Percentiles\n")
+
+def test_short_run():
+    """A short run against an in-process server plays both modes without errors."""
+    print("=" * 50)
+    print("TEST 2: Short Load Run")
+    print("=" * 50)
+
+    report = run_load(serve_in_process(), clients=2, duration=3, mode_a_share=0.5, seed=1)
+    routes = report['routes']
+    print(f"  {report['requests']} requests, {report['games_started']} games")
+    assert {'/start', '/ai-step', '/play', '/get_state'} <= set(routes), routes.keys()
+    for route, row in routes.items():
+        assert row['errors'] == 0, f"{route} had errors"
+        assert row['p50_ms'] <= row['p95_ms'] <= row['p99_ms'] <= row['max_ms']
+    assert report['requests'] == sum(row['requests'] for row in routes.values())
+
+    print("✅ Test 2 PASSED: Load run completed\n")
+
+def run_all_tests():
+    """Run all load generator tests."""
+
+    tests = [
+        test_percentile,
+        test_short_run
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ TEST FAILED: {e}\n")
+            failed += 1
+        except Exception as e:
+            print(f"❌ TEST ERROR: {e}\n")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"TEST SUMMARY: {passed} passed, {failed} failed")
+    print("=" * 50 + "\n")
+
+    return failed == 0
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,162 @@
+"""
+test_opening_book.py - Tests for the memory-mapped opening book
+"""
+import os
+import sys
+import tempfile
+import warnings
+warnings.filterwarnings('ignore')
+
+from game import GameState, ZIDAN_AI, RULES_AI, HUMAN
+from opening_book import OpeningBook, SYMMETRIES, build_book, canonical_key, enumerate_openings
+from rules_ai import RuleBasedAI
+from zidan_ai import ZidanAI
+
+BOOK_DEPTH = 3
+
+_book = None
+
+def get_book():
+    """Build a small book once for all tests."""
+    global _book
+    if _book is None:
+        path = os.path.join(tempfile.mkdtemp(), 'book.bin')
+        build_book(BOOK_DEPTH, path)
+        _book = OpeningBook(path)
+    return _book
+
+def test_symmetric_positions_share_key():
+    """Rotated and mirrored positions map to the same book key."""
+    print("=" * 50)
+    print("TEST 1: Symmetric Positions Share Key")
+    print("=" * 50)
+
+    game1 = GameState(mode='A')
+    game1.board[0][1] = ZIDAN_AI
+    game1.board[1][1] = RULES_AI
+
+    game2 = GameState(mode='A')  # rotated 90 degrees
+    game2.board[1][4] = ZIDAN_AI
+    game2.board[1][3] = RULES_AI
+
+    game3 = GameState(mode='A')  # mirrored left-right
+    game3.board[0][3] = ZIDAN_AI
+    game3.board[1][3] = RULES_AI
+
+    game4 = GameState(mode='B')  # same stones, other mode
+    game4.board[0][1] = ZIDAN_AI
+    game4.board[1][1] = RULES_AI
+
+    key1, _ = canonical_key(game1)
+    assert canonical_key(game2)[0] == key1, "Rotation should share key"
+    assert canonical_key(game3)[0] == key1, "Mirror should share key"
+    assert canonical_key(game4)[0] != key1, "Mode is part of the key"
+
+    print("✅ Test 1 PASSED: Symmetry reduction works\n")
+
+def test_rules_book_matches_live():
+    """RuleBasedAI picks the same move with and without the book."""
+    print("=" * 50)
+    print("TEST 2: RuleBasedAI Book Matches Live Scan")
+    print("=" * 50)
+
+    book = get_book()
+    checked = 0
+    for _, state in enumerate_openings('A', BOOK_DEPTH):
+        if state.current_player != RULES_AI:
+            continue
+        # Check every orientation so tie-breaking is exercised too
+        cells = [cell for row in state.board for cell in row]
+        for perm in SYMMETRIES:
+            game = GameState(mode='A')
+            game.board = [[cells[perm[r * 5 + c]] for c in range(5)] for r in range(5)]
+            live = RuleBasedAI(game, use_book=False).choose_move()
+            booked = RuleBasedAI(game, use_book=False)
+            booked.book = book
+            assert book.rules_scores(game) is not None, "Position should be in book"
+            assert booked.choose_move() == live, f"Mismatch on\n{game.print_board()}"
+            checked += 1
+
+    print(f"  Checked {checked} positions")
+    assert checked > 0
+    print("✅ Test 2 PASSED: Book moves match live moves\n")
+
+def test_zidan_book_hit():
+    """ZidanAI reuses stored counts and still picks its move live."""
+    print("=" * 50)
+    print("TEST 3: ZidanAI Book Hit")
+    print("=" * 50)
+
+    book = get_book()
+    game = GameState(mode='B')
+    game.try_move(1, 2, HUMAN)
+    game.next_turn()
+
+    zidan = ZidanAI(game, use_book=False)
+    zidan.book = book
+    result = zidan.choose_move()
+
+    print(f"  Classification: {result['classification']}, move: ({result['row']}, {result['col']})")
+    assert result['opening_book'], "Position should be served from the book"
+    assert sum(result['bell_counts'].values()) == 1024, "Counts should come from the book"
+    assert result['circuit_image'] is None and result['histogram_image'] is None
+
+    if result['classification'] == "WINNING":
+        expected = zidan.choose_aggressive_move()
+    else:
+        expected = zidan.choose_defensive_move()
+    assert (result['row'], result['col']) == expected[:2], "Move should follow the classification"
+
+    print("✅ Test 3 PASSED: ZidanAI served from book\n")
+
+def test_book_miss():
+    """Positions deeper than the book fall back to the full pipeline."""
+    print("=" * 50)
+    print("TEST 4: Book Miss Falls Back")
+    print("=" * 50)
+
+    book = get_book()
+    game = GameState(mode='A')
+    for r, c in [(0, 0), (4, 4), (0, 4), (4, 0), (2, 2), (1, 1)]:
+        game.try_move(r, c, game.current_player)
+        game.next_turn()
+
+    assert book.lookup(game) is None, "Deep position should not be in book"
+    rules = RuleBasedAI(game, use_book=False)
+    rules.book = book
+    assert rules.choose_move() == RuleBasedAI(game, use_book=False).choose_move()
+
+    print("✅ Test 4 PASSED: Book miss handled\n")
+
+def run_all_tests():
+    """Run all opening book tests."""
+    tests = [
+        test_symmetric_positions_share_key,
+        test_rules_book_matches_live,
+        test_zidan_book_hit,
+        test_book_miss
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ TEST FAILED: {e}\n")
+            failed += 1
+        except Exception as e:
+            print(f"❌ TEST ERROR: {e}\n")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"TEST SUMMARY: {passed} passed, {failed} failed")
+    print("=" * 50 + "\n")
+
+    return failed == 0
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
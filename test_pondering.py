@@ -0,0 +1,209 @@
+"""
+test_pondering.py - Tests for speculative AI decisions
+"""
+import os
+import sys
+import threading
+import warnings
+from concurrent.futures import wait
+warnings.filterwarnings('ignore')
+
+os.environ.setdefault('QGO_OPENING_BOOK', '')  # compute every decision (no book lookups)
+
+import zidan_ai
+from game import GameState, HUMAN, ZIDAN_AI
+from admission import AdmissionController
+from pondering import Ponderer
+
+def human_plays(game, row, col):
+    """Play the human move on game and hand the turn to ZidanAI."""
+    success, _, _, _ = game.try_move(row, col, HUMAN)
+    assert success
+    game.next_turn()
+
+def settle(ponderer, game_id):
+    """Wait for every speculative decision of a game to finish."""
+    wait(list(ponderer._sessions[game_id].futures.values()), timeout=120)
+
+def test_predicted_move_hit():
+    """The reply to a pondered human move is served from the background work."""
+    print("=" * 50)
+    print("TEST 1: Predicted Move Hit")
+    print("=" * 50)
+
+    ponderer = Ponderer(max_moves=2, max_workers=2)
+    game = GameState(mode='B')
+    ponderer.start('game-1', game)
+    assert len(ponderer._sessions['game-1'].futures) == 2
+    settle(ponderer, 'game-1')
+
+    row, col = ponderer.likely_moves(game)[0]
+    human_plays(game, row, col)
+    result = ponderer.take('game-1', game)
+    assert result is not None
+    print(f"  Human ({row}, {col}) -> ZidanAI ({result['row']}, {result['col']})")
+    assert ponderer.hits == 1 and ponderer.misses == 0
+    assert 'game-1' not in ponderer._sessions, "A take ends the game's session"
+
+    print("✅ Test 1 PASSED: Pondered reply served\n")
+
+def test_unpredicted_move_miss():
+    """A human move that was not pondered is a miss and cancels the rest."""
+    print("=" * 50)
+    print("TEST 2: Unpredicted Move Miss")
+    print("=" * 50)
+
+    ponderer = Ponderer(max_moves=1)
+    game = GameState(mode='B')
+    ponderer.start('game-1', game)
+    session = ponderer._sessions['game-1']
+    predicted = ponderer.likely_moves(game)[0]
+    other = next(move for move in game.get_legal_moves() if move != predicted)
+
+    human_plays(game, *other)
+    assert ponderer.take('game-1', game) is None
+    assert ponderer.hits == 0 and ponderer.misses == 1
+    assert session.cancelled.is_set()
+    assert ponderer.take('game-1', game) is None, "Nothing left to take"
+    wait(list(session.futures.values()), timeout=120)
+
+    print("✅ Test 2 PASSED: Miss detected\n")
+
+def test_cancel_and_eviction():
+    """cancel() and going over max_sessions stop a game's speculative work."""
+    print("=" * 50)
+    print("TEST 3: Cancellation and Eviction")
+    print("=" * 50)
+
+    ponderer = Ponderer(max_moves=3, max_sessions=1)
+    first = GameState(mode='B')
+    ponderer.start('game-1', first)
+    session = ponderer._sessions['game-1']
+    ponderer.cancel('game-1')
+    assert session.cancelled.is_set() and 'game-1' not in ponderer._sessions
+    wait(list(session.futures.values()), timeout=120)
+    assert sum(future.cancelled() for future in session.futures.values()) >= 2, "Queued work is dropped"
+
+    ponderer.start('game-1', first)
+    evicted = ponderer._sessions['game-1']
+    ponderer.start('game-2', GameState(mode='A'))
+    assert evicted.cancelled.is_set(), "The oldest game is evicted"
+    assert list(ponderer._sessions) == ['game-2']
+    assert ponderer.take('game-1', first) is None
+    wait(list(evicted.futures.values()), timeout=120)
+    settle(ponderer, 'game-2')
+
+    print("✅ Test 3 PASSED: Work cancelled\n")
+
+def test_failures_reported():
+    """A failing background decision is counted and reported, and is a miss."""
+    print("=" * 50)
+    print("TEST 4: Failures Reported")
+    print("=" * 50)
+
+    original = zidan_ai.ZidanAI.choose_move
+    def broken(self, *args, **kwargs):
+        raise RuntimeError("simulator unavailable")
+    zidan_ai.ZidanAI.choose_move = broken
+    try:
+        ponderer = Ponderer()
+        game = GameState(mode='A')
+        assert game.current_player == ZIDAN_AI
+        ponderer.start('game-1', game)
+        settle(ponderer, 'game-1')
+        assert ponderer.take('game-1', game) is None
+    finally:
+        zidan_ai.ZidanAI.choose_move = original
+    assert ponderer.errors == 1 and ponderer.misses == 1
+
+    print("✅ Test 4 PASSED: Failures reported\n")
+
+def test_admission_slots():
+    """Background ZidanAI decisions use only free admission slots."""
+    print("=" * 50)
+    print("TEST 5: Admission Slots")
+    print("=" * 50)
+
+    admission = AdmissionController(concurrency=1)
+    ponderer = Ponderer(admission=admission)
+    game = GameState(mode='A')
+
+    ticket = admission.acquire('request')
+    ponderer.start('game-1', game)
+    settle(ponderer, 'game-1')
+    assert ponderer.skipped == 1, "No free slot: the decision is skipped"
+    assert ponderer.claim('game-1', game) is None and ponderer.take('game-1', game) is None
+    admission.release(ticket)
+
+    ponderer.start('game-1', game)
+    settle(ponderer, 'game-1')
+    assert admission.stats()['running'] == 0, "The slot is released afterwards"
+    result = ponderer.claim('game-1', game)
+    assert result is not None and ponderer.hits == 1
+    assert 'game-1' not in ponderer._sessions
+
+    print("✅ Test 5 PASSED: Slots respected\n")
+
+def test_claim_waits_for_nothing():
+    """claim() serves only finished decisions and leaves unfinished work running."""
+    print("=" * 50)
+    print("TEST 6: Claim")
+    print("=" * 50)
+
+    ponderer = Ponderer(max_moves=1)
+    game = GameState(mode='B')
+    original = zidan_ai.ZidanAI.choose_move
+    release = threading.Event()
+    def blocked(self, *args, **kwargs):
+        release.wait(30)
+        return original(self, *args, **kwargs)
+    zidan_ai.ZidanAI.choose_move = blocked
+    try:
+        ponderer.start('game-1', game)
+        move = ponderer.likely_moves(game)[0]
+        assert ponderer.claim('game-1', game, move) is None, "Still computing"
+        assert 'game-1' in ponderer._sessions, "Work continues after a claim miss"
+    finally:
+        release.set()
+        zidan_ai.ZidanAI.choose_move = original
+    settle(ponderer, 'game-1')
+    assert ponderer.claim('game-1', game, (-1, 0)) is None, "Rejected human move"
+    result = ponderer.claim('game-1', game, move)
+    assert result is not None and ponderer.hits == 1 and ponderer.misses == 0
+
+    print("✅ Test 6 PASSED: Claims served\n")
+
+def run_all_tests():
+    """Run all pondering tests."""
+    tests = [
+        test_predicted_move_hit,
+        test_unpredicted_move_miss,
+        test_cancel_and_eviction,
+        test_failures_reported,
+        test_admission_slots,
+        test_claim_waits_for_nothing
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ TEST FAILED: {e}\n")
+            failed += 1
+        except Exception as e:
+            print(f"❌ TEST ERROR: {e}\n")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"TEST SUMMARY: {passed} passed, {failed} failed")
+    print("=" * 50 + "\n")
+
+    return failed == 0
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
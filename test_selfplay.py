@@ -0,0 +1,72 @@
+"""
+test_selfplay.py - Tests for the headless self-play runner
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from game import GameState
+
+WINNERS = ('ZidanAI', 'RuleBasedAI', 'Draw')
+
+def test_parallel_games():
+    """Games played on two worker processes are all written and counted."""
+    print("=" * 50)
+    print("TEST 1: Parallel Self-Play")
+    print("=" * 50)
+
+    # A fresh process, as from the command line: forking this one (with the
+    # threads other tests leave behind) could deadlock the pool
+    out_path = os.path.join(tempfile.mkdtemp(), 'selfplay.jsonl')
+    env = {**os.environ, 'QGO_OPENING_BOOK': ''}  # compute every decision (no book lookups)
+    completed = subprocess.run([sys.executable, 'selfplay.py', '--games', '4', '--workers', '2', '--out', out_path],
+                               cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                               capture_output=True, text=True, timeout=300)
+    assert completed.returncode == 0, completed.stderr
+    print(completed.stdout)
+    with open(out_path) as f:
+        records = [json.loads(line) for line in f]
+
+    assert sorted(record['game'] for record in records) == [0, 1, 2, 3], "One line per game"
+    for name in WINNERS:
+        count = sum(record['winner'] == name for record in records)
+        assert f"  {name}: {count} (" in completed.stdout, "Summary counts every game"
+    for record in records:
+        assert record['winner'] in WINNERS, "Every game is played to the end"
+        assert 0 < record['turns'] <= GameState().max_turns
+        assert len(record['move_times_ms']) == record['turns']
+        assert set(record['scores']) == {'ZidanAI', 'RuleBasedAI'}
+
+    print("✅ Test 1 PASSED: Results aggregated\n")
+
+def run_all_tests():
+    """Run all self-play tests."""
+    tests = [
+        test_parallel_games
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ TEST FAILED: {e}\n")
+            failed += 1
+        except Exception as e:
+            print(f"❌ TEST ERROR: {e}\n")
+            failed += 1
+
+    print("\n" + "=" * 50)
+    print(f"TEST SUMMARY: {passed} passed, {failed} failed")
+    print("=" * 50 + "\n")
+
+    return failed == 0
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
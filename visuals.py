@@ -0,0 +1,104 @@
+"""
+visuals.py - Cacheable renders of ZidanAI's circuit diagram and histogram
+
+Both pictures are pure functions of small inputs: the circuit of the
+feature triple, the histogram of the four Bell counts. Log entries carry
+URLs that encode those inputs instead of inline base64 PNGs; the server
+renders an image on its first request, keeps recent renders in an LRU
+cache and serves them as immutable resources with a strong ETag, so the
+browser cache (or a reverse proxy) answers repeats.
+"""
+import hashlib
+import threading
+from functools import lru_cache
+
+import metrics
+import zidan_ai
+from zidan_ai import ZidanAI
+
+# Bump when the drawings change so cached copies under old ETags are not reused
+RENDER_VERSION = 1
+
+# Inputs accepted from URLs; features stay small on a 5x5 board
+MAX_FEATURE = 100
+MAX_COUNT = 1 << 20
+
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+BELL_STATES = ('00', '01', '10', '11')
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+class RenderError(Exception):
+    """Drawing an image failed (raised, not returned, so failures are not cached)."""
+
+
+def _get_renderer():
+    """ZidanAI instance used only for building and drawing circuits."""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = ZidanAI(None, use_book=False)
+        return _renderer
+
+def circuit_params(features):
+    """(territory_delta, liberty_pressure, connectivity) from a result's features dict."""
+    return (int(features['territory_delta']),
+            int(features['liberty_pressure']),
+            int(features['connectivity']))
+
+def histogram_params(counts):
+    """Bell counts as a tuple of four ints (exact-mode probabilities are rounded)."""
+    return tuple(int(round(counts.get(state, 0))) for state in BELL_STATES)
+
+def check_circuit_params(params):
+    if len(params) != 3 or any(abs(value) > MAX_FEATURE for value in params):
+        raise ValueError("Feature out of range")
+
+def check_histogram_params(params):
+    if len(params) != 4 or any(not 0 <= value <= MAX_COUNT for value in params):
+        raise ValueError("Count out of range")
+
+def _timed_render(stage, draw):
+    """draw(), charged to stage in ZidanAI's per-process stage totals when
+    timing is enabled (renders happen here, not in choose_move, so their
+    times appear in stage_stats() and /metrics rather than in log entries).
+    """
+    timer = zidan_ai.StageTimer() if zidan_ai.TIMING_ENABLED else None
+    png = draw()
+    if timer is not None:
+        timer.mark(stage)
+        timer.record()
+    return png
+
+def etag(kind, params):
+    """Strong validator for an image: the render is a pure function of
+    (RENDER_VERSION, kind, params), so hashing those identifies the bytes.
+    """
+    key = f"{RENDER_VERSION}:{kind}:{','.join(map(str, params))}"
+    return hashlib.sha256(key.encode('ascii')).hexdigest()[:32]
+
+@lru_cache(maxsize=128)
+def circuit_png(params):
+    """PNG bytes of the circuit for a feature triple. Raises RenderError."""
+    check_circuit_params(params)
+    metrics.IMAGE_RENDERS.inc(kind='circuit')
+    renderer = _get_renderer()
+    png = _timed_render('render_circuit',
+                        lambda: renderer.render_circuit_png(renderer.build_quantum_circuit(params)))
+    if png is None:
+        raise RenderError(f"Could not draw the circuit for {params}")
+    return png
+
+@lru_cache(maxsize=128)
+def histogram_png(params):
+    """PNG bytes of the histogram for (c00, c01, c10, c11). Raises RenderError."""
+    check_histogram_params(params)
+    metrics.IMAGE_RENDERS.inc(kind='histogram')
+    png = _timed_render('render_histogram',
+                        lambda: _get_renderer().render_histogram_png(dict(zip(BELL_STATES, params))))
+    if png is None:
+        raise RenderError(f"Could not draw the histogram for {params}")
+    return png
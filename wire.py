@@ -0,0 +1,91 @@
+"""
+wire.py - Compact response encoding and HTTP compression
+
+Compact format (opt-in, see app.wire_format):
+  - board: 25-character string of cell values, row-major ('0' empty,
+    '1' ZidanAI, '2' RuleBasedAI, '3' Human)
+  - scores: {player: [territory, liberties, connectivity]} (total is
+    territory*2 + liberties + connectivity*3)
+  - game_log entries: the print_board() snapshot is replaced by
+    "board": 1; clients rebuild it by replaying moves and captures onto
+    the board of the previous entry (an empty board for entry 0)
+  - "format": "compact" marks the payload
+
+The compact payload can be sent as JSON or, if the msgpack package is
+installed, as MessagePack.
+"""
+import gzip
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_MIMETYPES = ('application/json', MSGPACK_MIMETYPE, 'text/html')
+
+
+def board_string(board):
+    """Row-major board as a string of cell digits."""
+    return ''.join(str(cell) for row in board for cell in row)
+
+def compact_scores(scores):
+    return {player: [s['territory'], s['liberties'], s['connectivity']]
+            for player, s in scores.items()}
+
+def compact_entry(entry):
+    entry = dict(entry)
+    if 'board' in entry:
+        entry['board'] = 1
+    if 'scores' in entry:
+        entry['scores'] = compact_scores(entry['scores'])
+    return entry
+
+def compact_payload(payload):
+    """Compact form of a game response (fields other than board, scores and game_log pass through)."""
+    payload = dict(payload)
+    if isinstance(payload.get('board'), list):
+        payload['board'] = board_string(payload['board'])
+    if isinstance(payload.get('scores'), dict):
+        payload['scores'] = compact_scores(payload['scores'])
+    if 'game_log' in payload:
+        payload['game_log'] = [compact_entry(entry) for entry in payload['game_log']]
+    payload['format'] = 'compact'
+    return payload
+
+def dumps(payload, use_msgpack=False):
+    """Encode a payload; returns (bytes, mimetype)."""
+    if use_msgpack:
+        return msgpack.packb(payload, use_bin_type=True), MSGPACK_MIMETYPE
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8'), 'application/json'
+
+def loads(data, mimetype):
+    """Decode bytes produced by dumps()."""
+    if mimetype == MSGPACK_MIMETYPE:
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+def choose_encoding(accept_encodings):
+    """Best supported content coding from a werkzeug Accept-Encoding header, or None."""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
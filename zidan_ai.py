@@ -6,20 +6,132 @@ warnings.filterwarnings('ignore')
 
 import numpy as np
 from qiskit import QuantumCircuit, transpile
+from qiskit.quantum_info import Statevector
 from qiskit_aer import AerSimulator
 import matplotlib
 matplotlib.use('Agg')  # Non-interactive backend
 import matplotlib.pyplot as plt
 import io
+import os
 import base64
+import threading
+import time
+from opening_book import get_default_book
+import metrics
+
+# pyplot keeps global figure state, so renders from background threads are serialised
+_render_lock = threading.Lock()
+
+# Nominal shot count used to express exact probabilities as counts
+EXACT_SHOTS = 1024
+
+# Per-stage timing of choose_move (QGO_ZIDAN_TIMING=1, or set TIMING_ENABLED).
+# When off, no timer is created and each stage boundary costs one None check.
+TIMING_ENABLED = os.environ.get('QGO_ZIDAN_TIMING') == '1'
+_stage_totals = {}  # stage -> [count, wall seconds, cpu seconds]
+_stage_lock = threading.Lock()
+
+class StageTimer:
+    """Lap timer: each mark() charges the wall and thread CPU time since the
+    previous mark to the named stage.
+    """
+    
+    def __init__(self):
+        self.stages = {}
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+    
+    def mark(self, stage):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        self.stages[stage] = (wall - self._wall, cpu - self._cpu)
+        self._wall, self._cpu = wall, cpu
+    
+    def as_dict(self):
+        """{stage: {'wall_ms', 'cpu_ms'}} for the result dict and log entry."""
+        return {stage: {'wall_ms': round(wall * 1000, 3), 'cpu_ms': round(cpu * 1000, 3)}
+                for stage, (wall, cpu) in self.stages.items()}
+    
+    def record(self):
+        """Add this decision's stages to the per-process totals."""
+        with _stage_lock:
+            for stage, (wall, cpu) in self.stages.items():
+                totals = _stage_totals.setdefault(stage, [0, 0.0, 0.0])
+                totals[0] += 1
+                totals[1] += wall
+                totals[2] += cpu
+
+def stage_stats():
+    """Per-process stage totals: {stage: {'count', 'wall_s', 'cpu_s', 'mean_wall_ms', 'mean_cpu_ms'}}."""
+    with _stage_lock:
+        return {stage: {
+            'count': count,
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'mean_wall_ms': round(wall / count * 1000, 3),
+            'mean_cpu_ms': round(cpu / count * 1000, 3)
+        } for stage, (count, wall, cpu) in _stage_totals.items()}
+
+def reset_stage_stats():
+    with _stage_lock:
+        _stage_totals.clear()
+
+# Degradation levels of choose_move under a deadline, from full quality to cheapest:
+# fewer shots, exact statevector probabilities, no images, and finally a
+# classical classification with no circuit at all
+FULL = 'full'
+REDUCED_SHOTS = 'reduced_shots'
+EXACT = 'exact'
+NO_IMAGES = 'no_images'
+HEURISTIC = 'heuristic'
+DEGRADATION_LEVELS = (FULL, REDUCED_SHOTS, EXACT, NO_IMAGES, HEURISTIC)
+
+REDUCED_SHOT_COUNT = 128
+
+# Running estimates (seconds) of the costs the deadline planner weighs, updated
+# from every decision; the defaults are typical single-core figures
+_cost_estimates = {'base': 0.01, 'exact': 0.005, 'render': 0.3}
+_cost_lock = threading.Lock()
+COST_SMOOTHING = 0.2
+
+def _default_shots_cost(shots):
+    # Transpiling dominates; sampling adds a little per shot
+    return 0.12 + 0.03 * shots / 1024
+
+def _observe_cost(key, seconds, default=0.0):
+    with _cost_lock:
+        estimate = _cost_estimates.get(key, default)
+        _cost_estimates[key] = estimate + COST_SMOOTHING * (seconds - estimate)
+
+def cost_estimates():
+    """Current estimates: 'base', 'exact', 'render' and 'shots:<n>' for each shot count seen."""
+    with _cost_lock:
+        return dict(_cost_estimates)
+
+def simulation_cost(costs, shots):
+    if shots is None:
+        return costs['exact']
+    return costs.get(f'shots:{shots}', _default_shots_cost(shots))
+
+def images_skipped(level):
+    """Whether a decision at this degradation level comes without images."""
+    return DEGRADATION_LEVELS.index(level) >= DEGRADATION_LEVELS.index(NO_IMAGES)
 
 class ZidanAI:
     """Quantum-powered strategic AI using Bell state measurements."""
     
-    def __init__(self, game_state):
+    def __init__(self, game_state, use_book=True, shots=1024, timing=None):
+        """
+        shots: measurement shots per circuit, or None for exact (noise-free)
+        probabilities, which makes the classification deterministic
+        timing: record per-stage timings in choose_move (default: TIMING_ENABLED)
+        """
         self.game_state = game_state
+        self.timing = TIMING_ENABLED if timing is None else timing
+        self._timer = None
         self.player = 1  # ZIDAN_AI
+        self.shots = shots
         self.backend = AerSimulator()
+        self.book = get_default_book() if use_book else None
     
     def extract_features(self):
         """
@@ -93,14 +205,39 @@ class ZidanAI:
         
         return qc
     
-    def run_quantum_circuit(self, qc):
-        """Execute circuit and return measurement counts."""
+    def run_quantum_circuit(self, qc, shots=-1):
+        """Execute circuit and return measurement counts.
+        shots: overrides self.shots for this run (None = exact)
+        """
+        if shots == -1:
+            shots = self.shots
+        start = time.perf_counter()
+        if shots is None:
+            metrics.SIMULATOR_RUNS.inc(method='exact')
+            counts = self.exact_counts(qc)
+            _observe_cost('exact', time.perf_counter() - start)
+            return counts
+        metrics.SIMULATOR_RUNS.inc(method='shots')
+        metrics.SIMULATOR_SHOTS.inc(shots)
         transpiled_qc = transpile(qc, self.backend)
-        job = self.backend.run(transpiled_qc, shots=1024)
+        if self._timer is not None:
+            self._timer.mark('transpile')
+        job = self.backend.run(transpiled_qc, shots=shots)
         result = job.result()
         counts = result.get_counts()
+        _observe_cost(f'shots:{shots}', time.perf_counter() - start, _default_shots_cost(shots))
         return counts
     
+    def exact_counts(self, qc):
+        """
+        Compute the ancilla measurement distribution from the statevector.
+        Returns expected counts over EXACT_SHOTS (rounded to cancel float noise).
+        """
+        state = Statevector(qc.remove_final_measurements(inplace=False))
+        probs = state.probabilities_dict(qargs=[3, 4])
+        return {bits: float(round(probs.get(bits, 0.0) * EXACT_SHOTS, 6))
+                for bits in ['00', '01', '10', '11']}
+    
     def calculate_entanglement_score(self, counts):
         """
         Calculate entanglement score S from Bell measurements.
@@ -134,6 +271,35 @@ class ZidanAI:
         
         return classification, confidence
     
+    def heuristic_score(self, features):
+        """
+        Classical stand-in for the entanglement score, used when there is no
+        time for a circuit: the game's score formula (territory*2 + liberties
+        + connectivity*3) applied to the feature deltas, squashed to [-1, 1].
+        """
+        territory_delta, liberty_pressure, connectivity = features
+        return float(np.tanh((2 * territory_delta + liberty_pressure + 3 * connectivity) / 10.0))
+    
+    def plan_degradation(self, deadline, render_images):
+        """Least degraded level whose estimated cost fits before the deadline."""
+        remaining = deadline - time.perf_counter()
+        costs = cost_estimates()
+        for level in DEGRADATION_LEVELS[:-1]:
+            cost = costs['base'] + simulation_cost(costs, self._shots_for(level))
+            if render_images and not images_skipped(level):
+                cost += costs['render']
+            if cost <= remaining:
+                return level
+        return HEURISTIC
+    
+    def _shots_for(self, level):
+        """Shot count (None = exact) a degradation level simulates with."""
+        if level == FULL or self.shots is None:
+            return self.shots
+        if level == REDUCED_SHOTS:
+            return min(self.shots, REDUCED_SHOT_COUNT)
+        return None
+    
     def choose_aggressive_move(self):
         """Choose aggressive move (maximize territory/connectivity)."""
         legal_moves = self.game_state.get_legal_moves()
@@ -199,68 +365,131 @@ class ZidanAI:
         
         return best_move[0], best_move[1], "Defensive: block opponent/preserve liberties"
     
-    def generate_circuit_image(self, qc):
-        """Generate circuit diagram as base64 encoded image."""
+    def render_circuit_png(self, qc):
+        """Render the circuit diagram as PNG bytes (None if drawing fails)."""
         try:
-            fig = qc.draw('mpl', output='mpl')
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', bbox_inches='tight', dpi=100)
-            buf.seek(0)
-            img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-            plt.close(fig)
-            return img_base64
+            with _render_lock:
+                fig = qc.draw(output='mpl')
+                buf = io.BytesIO()
+                fig.savefig(buf, format='png', bbox_inches='tight', dpi=100)
+                plt.close(fig)
+            return buf.getvalue()
         except Exception as e:
             return None
     
-    def generate_histogram_image(self, counts):
-        """Generate histogram of measurement results as base64 encoded image."""
+    def render_histogram_png(self, counts):
+        """Render the measurement histogram as PNG bytes (None if drawing fails)."""
         try:
-            fig, ax = plt.subplots(figsize=(6, 4))
-            states = ['00', '01', '10', '11']
-            values = [counts.get(state, 0) for state in states]
-            ax.bar(states, values, color=['blue', 'orange', 'green', 'red'])
-            ax.set_xlabel('Bell States')
-            ax.set_ylabel('Counts')
-            ax.set_title('Quantum Measurement Results')
-            ax.grid(axis='y', alpha=0.3)
-            
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', bbox_inches='tight', dpi=100)
-            buf.seek(0)
-            img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-            plt.close(fig)
-            return img_base64
+            with _render_lock:
+                fig, ax = plt.subplots(figsize=(6, 4))
+                states = ['00', '01', '10', '11']
+                values = [counts.get(state, 0) for state in states]
+                ax.bar(states, values, color=['blue', 'orange', 'green', 'red'])
+                ax.set_xlabel('Bell States')
+                ax.set_ylabel('Counts')
+                ax.set_title('Quantum Measurement Results')
+                ax.grid(axis='y', alpha=0.3)
+                
+                buf = io.BytesIO()
+                fig.savefig(buf, format='png', bbox_inches='tight', dpi=100)
+                plt.close(fig)
+            return buf.getvalue()
         except Exception as e:
             return None
     
-    def choose_move(self):
+    def generate_circuit_image(self, qc):
+        """Generate circuit diagram as base64 encoded image."""
+        png = self.render_circuit_png(qc)
+        return base64.b64encode(png).decode('utf-8') if png else None
+    
+    def generate_histogram_image(self, counts):
+        """Generate histogram of measurement results as base64 encoded image."""
+        png = self.render_histogram_png(counts)
+        return base64.b64encode(png).decode('utf-8') if png else None
+    
+    def choose_move(self, render_images=True, deadline=None):
         """
         Main decision-making pipeline.
-        Returns: dict with move info, quantum analysis, and visualizations
+        render_images: False skips the circuit and histogram renders (images are None)
+        deadline: time.perf_counter() value to finish by; when the estimated
+        cost does not fit, the decision degrades (see DEGRADATION_LEVELS)
+        Returns: dict with move info, quantum analysis, visualizations and the
+        'degradation' level used (plus per-stage 'timings' when timing is enabled)
         """
+        timer = self._timer = StageTimer() if self.timing else None
+        start = time.perf_counter()
+        simulated = 0.0
+        
         # Extract features
         features = self.extract_features()
         territory_delta, liberty_pressure, connectivity = features
+        if timer is not None:
+            timer.mark('features')
         
-        # Build and run quantum circuit
-        qc = self.build_quantum_circuit(features)
-        counts = self.run_quantum_circuit(qc)
+        # Opening positions reuse the measurement counts stored in the book
+        # (exact mode always computes its own probabilities)
+        use_book = self.book is not None and self.shots is not None
+        counts = self.book.zidan_counts(self.game_state) if use_book else None
+        from_book = counts is not None
+        if from_book:
+            metrics.OPENING_BOOK_HITS.inc()
+        if timer is not None and use_book:
+            timer.mark('book')
         
-        # Calculate entanglement score
-        S, bell_probs = self.calculate_entanglement_score(counts)
+        level = FULL
+        if deadline is not None and not from_book:
+            level = self.plan_degradation(deadline, render_images)
+        
+        # Build and run quantum circuit
+        if level == HEURISTIC:
+            counts = bell_probs = None
+            S = self.heuristic_score(features)
+        else:
+            if not from_book:
+                qc = self.build_quantum_circuit(features)
+                if timer is not None:
+                    timer.mark('circuit')
+                simulate_start = time.perf_counter()
+                counts = self.run_quantum_circuit(qc, self._shots_for(level))
+                simulated = time.perf_counter() - simulate_start
+                if timer is not None:
+                    timer.mark('simulate')
+            
+            # Calculate entanglement score
+            S, bell_probs = self.calculate_entanglement_score(counts)
         
         # Classify state
         classification, confidence = self.classify_state(S)
+        if timer is not None:
+            timer.mark('classify')
         
         # Choose move based on classification
         if classification == "WINNING":
             row, col, strategy = self.choose_aggressive_move()
         else:
             row, col, strategy = self.choose_defensive_move()
+        if timer is not None:
+            timer.mark('move')
+        _observe_cost('base', time.perf_counter() - start - simulated)
         
-        # Generate visualizations
-        circuit_img = self.generate_circuit_image(qc)
-        histogram_img = self.generate_histogram_image(counts)
+        # Generate visualizations (skipped for book moves, and when the deadline
+        # leaves no room for them)
+        if render_images and not images_skipped(level) and deadline is not None \
+                and deadline - time.perf_counter() < cost_estimates()['render']:
+            level = NO_IMAGES
+        if from_book or not render_images or images_skipped(level):
+            circuit_img = None
+            histogram_img = None
+        else:
+            render_start = time.perf_counter()
+            circuit_img = self.generate_circuit_image(qc)
+            if timer is not None:
+                timer.mark('render_circuit')
+            histogram_img = self.generate_histogram_image(counts)
+            if timer is not None:
+                timer.mark('render_histogram')
+            _observe_cost('render', time.perf_counter() - render_start)
+        metrics.ZIDAN_DECISIONS.inc(level=level)
         
         # Compile results
         result = {
@@ -279,7 +508,14 @@ class ZidanAI:
             'strategy': strategy,
             'circuit_image': circuit_img,
             'histogram_image': histogram_img,
+            'opening_book': from_book,
+            'degradation': level,
             'rationale': f"{classification} (conf={confidence:.1f}%): {strategy}"
         }
         
+        if timer is not None:
+            timer.record()
+            result['timings'] = timer.as_dict()
+            self._timer = None
+        
         return result